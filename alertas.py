@@ -0,0 +1,285 @@
+"""Detecção de anomalias nos indicadores de PO, incremental sobre os agregados diários.
+
+A cada sincronização (nova versão das abas de um espaço), `agendar_verificacao`
+dispara em segundo plano a verificação dos dias completos que ainda não foram
+verificados, mais os últimos 7 já verificados (registros lançados com atraso ou
+editados mudam esses dias; os alertas deles são refeitos). Só esses dias e a
+janela de histórico de que a linha de base precisa são calculados: o custo não
+cresce com o histórico. Cada indicador é
+comparado com a sua linha de base:
+
+    z-score móvel   indicador dos últimos 7 dias contra as 8 semanas anteriores
+    sazonal         valor do dia contra o mesmo dia da semana nas 8 semanas anteriores
+
+Os alertas (só na direção ruim de cada indicador) ficam num SQLite local e
+aparecem na barra lateral do app. Também pode rodar agendado (cron), fora do app:
+    python alertas.py --arquivos exportacao/ --espaco "Squad A"
+
+Configuração por variável de ambiente:
+    PO_ALERTAS_ARQUIVO=alertas_po.sqlite3   arquivo do banco (vazio desliga os alertas); relativo a PO_DADOS_DIR
+    PO_DADOS_DIR=<diretório do app>         diretório dos arquivos de dados locais
+    PO_ALERTAS_LIMIAR_Z=3                   |z| a partir do qual o dia vira alerta
+"""
+import argparse
+import contextlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rastreamento import executar_no_contexto, span
+from tendencias import metricas
+
+ARQUIVO_PADRAO = 'alertas_po.sqlite3'
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+LIMIAR_Z = 3.0
+JANELA_INDICADOR = 7
+JANELAS_BASE = 8
+SEMANAS_SAZONAIS = 8
+MIN_PONTOS_BASE = 4
+DIAS_PRIMEIRA_VERIFICACAO = 90
+MAX_VERSOES_AGENDADAS = 256
+
+# Indicador -> (título, unidade, método da linha de base, direção ruim: -1 queda, +1 alta)
+INDICADORES_ALERTA = {
+    'taxa_aplicacao': ("Taxa de aplicação de melhorias", "%", 'zscore', -1),
+    'taxa_presenca': ("Taxa de presença", "%", 'zscore', -1),
+    'horas_reuniao': ("Horas em reunião", "h", 'sazonal', 1),
+    'docs_por_hora': ("Documentos por hora", "docs/h", 'zscore', -1),
+    'cobertura_criterios': ("Cobertura de critérios de aceite", "%", 'zscore', -1),
+    'cobertura_template': ("Cobertura de template padronizado", "%", 'zscore', -1)
+}
+
+COLUNAS = ['espaco', 'dia', 'indicador', 'valor', 'media', 'desvio', 'z', 'metodo', 'criado_em']
+
+_CRIAR_TABELAS = """
+CREATE TABLE IF NOT EXISTS alertas (
+    espaco TEXT NOT NULL,
+    dia TEXT NOT NULL,
+    indicador TEXT NOT NULL,
+    valor REAL,
+    media REAL,
+    desvio REAL,
+    z REAL,
+    metodo TEXT,
+    criado_em TEXT NOT NULL,
+    PRIMARY KEY (espaco, dia, indicador)
+);
+CREATE TABLE IF NOT EXISTS progresso (
+    espaco TEXT PRIMARY KEY,
+    ultimo_dia TEXT NOT NULL
+);
+"""
+_LOCK = threading.Lock()
+_INICIALIZADOS = set()
+_COM_FALHA = set()  # arquivos que não puderam ser gravados: os alertas ficam desligados para eles
+
+# ==================== ARMAZENAMENTO ====================
+def caminho_banco(caminho=None):
+    """Arquivo do banco: parâmetro, variável de ambiente ou o padrão (None se desligado).
+
+    O nome relativo vale a partir de PO_DADOS_DIR (ou do diretório do app), nunca do
+    diretório corrente de quem iniciou o processo.
+    """
+    if caminho is None:
+        arquivo = os.getenv('PO_ALERTAS_ARQUIVO', ARQUIVO_PADRAO)
+        caminho = os.path.join(os.getenv('PO_DADOS_DIR') or DIRETORIO_APP, arquivo) if arquivo else None
+    if not caminho or caminho in _COM_FALHA:
+        return None
+    return caminho
+
+def _desligar(caminho, erro):
+    """Registra a falha de acesso ao banco e desliga os alertas para esse arquivo"""
+    with _LOCK:
+        if caminho in _COM_FALHA:
+            return
+        _COM_FALHA.add(caminho)
+    print(f"⚠️ Alertas desligados: não foi possível usar {caminho} ({erro})")
+
+@contextlib.contextmanager
+def _conexao(caminho):
+    conexao = sqlite3.connect(caminho, timeout=5)
+    try:
+        with _LOCK:
+            if caminho not in _INICIALIZADOS:
+                conexao.execute("PRAGMA journal_mode=WAL")
+                conexao.executescript(_CRIAR_TABELAS)
+                _INICIALIZADOS.add(caminho)
+        with conexao:
+            yield conexao
+    finally:
+        conexao.close()
+
+def ultimo_dia_verificado(espaco, caminho=None):
+    """Último dia já verificado do espaço (Timestamp) ou None"""
+    caminho = caminho_banco(caminho)
+    if not caminho:
+        return None
+    with _conexao(caminho) as conexao:
+        linha = conexao.execute("SELECT ultimo_dia FROM progresso WHERE espaco = ?", (espaco,)).fetchone()
+    return pd.Timestamp(linha[0]) if linha else None
+
+def registrar_verificacao(espaco, alertas, primeiro_dia, ultimo_dia, caminho=None):
+    """Substitui os alertas de [primeiro_dia, ultimo_dia] e avança o ponto de verificação na mesma transação"""
+    caminho = caminho_banco(caminho)
+    if not caminho:
+        return False
+    criado_em = datetime.now().isoformat(timespec='seconds')
+    with _conexao(caminho) as conexao:
+        # Alertas que deixaram de valer na janela reverificada saem; os que continuam são regravados
+        conexao.execute(
+            "DELETE FROM alertas WHERE espaco = ? AND dia BETWEEN ? AND ?",
+            (espaco, primeiro_dia.strftime('%Y-%m-%d'), ultimo_dia.strftime('%Y-%m-%d'))
+        )
+        conexao.executemany(
+            f"INSERT OR REPLACE INTO alertas ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})",
+            [(espaco, alerta['dia'].strftime('%Y-%m-%d'), alerta['indicador'], alerta['valor'], alerta['media'],
+              alerta['desvio'], alerta['z'], alerta['metodo'], criado_em) for alerta in alertas]
+        )
+        conexao.execute(
+            "INSERT INTO progresso (espaco, ultimo_dia) VALUES (?, ?) ON CONFLICT(espaco) DO UPDATE SET ultimo_dia = excluded.ultimo_dia",
+            (espaco, ultimo_dia.strftime('%Y-%m-%d'))
+        )
+    return True
+
+def carregar_alertas(espaco, desde=None, caminho=None):
+    """Alertas do espaço (a partir de `desde`), do dia mais recente para o mais antigo"""
+    caminho = caminho_banco(caminho)
+    if not caminho or not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS)
+    consulta, parametros = "SELECT * FROM alertas WHERE espaco = ?", [espaco]
+    if desde is not None:
+        consulta += " AND dia >= ?"
+        parametros.append(pd.Timestamp(desde).strftime('%Y-%m-%d'))
+    try:
+        with _conexao(caminho) as conexao:
+            alertas = pd.read_sql_query(consulta + " ORDER BY dia DESC, indicador", conexao, params=parametros)
+    except (sqlite3.Error, OSError) as e:
+        _desligar(caminho, e)
+        return pd.DataFrame(columns=COLUNAS)
+    alertas['dia'] = pd.to_datetime(alertas['dia'])
+    return alertas
+
+# ==================== DETECÇÃO ====================
+def indicadores_diarios(diario):
+    """Indicadores de cada dia: janela de 7 dias para os z-scores, o valor do próprio dia para os sazonais"""
+    moveis = metricas(diario.rolling(JANELA_INDICADOR, min_periods=JANELA_INDICADOR).sum())
+    do_dia = metricas(diario)
+    return pd.DataFrame({
+        indicador: (do_dia if metodo == 'sazonal' else moveis)[indicador]
+        for indicador, (_, _, metodo, _) in INDICADORES_ALERTA.items()
+    }, index=diario.index)
+
+def _linha_de_base(valores, metodo):
+    """(média, desvio, pontos) da linha de base de cada dia, só com períodos anteriores ao do próprio dia"""
+    # Janelas de 7 dias sem sobreposição (as sobrepostas são quase iguais e subestimam o desvio);
+    # no sazonal, o mesmo dia da semana nas semanas anteriores
+    passo, periodos = (7, SEMANAS_SAZONAIS) if metodo == 'sazonal' else (JANELA_INDICADOR, JANELAS_BASE)
+    anteriores = pd.concat([valores.shift(passo * periodo) for periodo in range(1, periodos + 1)], axis=1)
+    return anteriores.mean(axis=1), anteriores.std(axis=1), anteriores.count(axis=1)
+
+def detectar_anomalias(indicadores, dias, limiar_z=None):
+    """Alertas dos `dias` avaliados: |z| acima do limiar na direção ruim do indicador"""
+    limiar_z = limiar_z or float(os.getenv('PO_ALERTAS_LIMIAR_Z', LIMIAR_Z))
+    alertas = []
+    for indicador, (_, _, metodo, direcao) in INDICADORES_ALERTA.items():
+        valores = indicadores[indicador]
+        media, desvio, pontos = _linha_de_base(valores, metodo)
+        z = (valores - media) / desvio.where(desvio > 1e-9)
+        anomalos = z.index.isin(dias) & (pontos >= MIN_PONTOS_BASE).to_numpy() & (np.sign(z) == direcao).to_numpy() & (z.abs() >= limiar_z).to_numpy()
+        for dia in z.index[anomalos]:
+            alertas.append({
+                'dia': dia, 'indicador': indicador, 'valor': float(valores[dia]), 'media': float(media[dia]),
+                'desvio': float(desvio[dia]), 'z': float(z[dia]), 'metodo': metodo
+            })
+    return alertas
+
+def verificar_alertas(espaco, diario, hoje=None, caminho=None):
+    """Verifica os dias completos ainda não verificados do espaço e os últimos já verificados; devolve os alertas desses dias"""
+    caminho = caminho_banco(caminho)
+    if not caminho or diario.empty:
+        return []
+    try:
+        return _verificar(espaco, diario, hoje, caminho)
+    except (sqlite3.Error, OSError) as e:
+        # Roda em segundo plano: sem banco gravável, avisa uma vez e desliga em vez de falhar a cada sincronização
+        _desligar(caminho, e)
+        return []
+
+def _verificar(espaco, diario, hoje, caminho):
+    with span("alertas.verificar", espaco=espaco) as atributos:
+        # Só dias fechados: o de hoje ainda recebe registros
+        ultimo_completo = (pd.Timestamp(hoje) if hoje is not None else pd.Timestamp.now()).normalize() - pd.Timedelta(days=1)
+        fim = min(diario.index.max(), ultimo_completo)
+        inicio = ultimo_dia_verificado(espaco, caminho)
+        inicio = inicio + pd.Timedelta(days=1) if inicio is not None else fim - pd.Timedelta(days=DIAS_PRIMEIRA_VERIFICACAO - 1)
+        # A janela final é sempre refeita: a sincronização pode ter trazido registros desses dias
+        inicio = min(inicio, fim - pd.Timedelta(days=JANELA_INDICADOR - 1))
+        # Histórico suficiente para as linhas de base dos dias verificados, e nada além disso
+        historico = max(JANELA_INDICADOR * (JANELAS_BASE + 1), 7 * SEMANAS_SAZONAIS)
+        recorte = diario.loc[inicio - pd.Timedelta(days=historico):fim]
+        dias = pd.date_range(inicio, fim, freq='D')
+        alertas = detectar_anomalias(indicadores_diarios(recorte), dias)
+        registrar_verificacao(espaco, alertas, inicio, fim, caminho)
+        atributos['dias'] = len(dias)
+        atributos['alertas'] = len(alertas)
+        return alertas
+
+# ==================== AGENDAMENTO ====================
+_EXECUTOR = None
+_AGENDADAS = OrderedDict()  # (espaço, versão dos dados) já verificadas ou em verificação
+_LOCK_AGENDA = threading.Lock()
+
+def agendar_verificacao(espaco, diario):
+    """Dispara a verificação em segundo plano uma vez por versão dos dados do espaço (uma por sincronização)"""
+    global _EXECUTOR
+    if not caminho_banco() or diario.empty:
+        return None
+    chave = (espaco, diario.attrs.get('versao'))
+    with _LOCK_AGENDA:
+        if chave in _AGENDADAS:
+            return _AGENDADAS[chave]
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alertas")
+        # Um worker só: verificações do mesmo espaço nunca correm juntas sobre o mesmo ponto de verificação
+        futuro = _AGENDADAS[chave] = _EXECUTOR.submit(executar_no_contexto(verificar_alertas), espaco, diario)
+        while len(_AGENDADAS) > MAX_VERSOES_AGENDADAS:
+            _AGENDADAS.popitem(last=False)
+    return futuro
+
+def aguardar_verificacoes(timeout=None):
+    """Espera as verificações em segundo plano terminarem (encerramento do processo, testes e benchmarks)"""
+    with _LOCK_AGENDA:
+        pendentes = list(_AGENDADAS.values())
+    wait(pendentes, timeout)
+
+def descrever_alerta(alerta):
+    """Frase curta do alerta para a interface"""
+    titulo, unidade, _, _ = INDICADORES_ALERTA[alerta['indicador']]
+    sentido = "caiu" if alerta['z'] < 0 else "subiu"
+    return (f"**{titulo}** {sentido} para {alerta['valor']:.1f} {unidade} em {alerta['dia']:%d/%m} "
+            f"(esperado ~{alerta['media']:.1f}, z={alerta['z']:+.1f})")
+
+# ==================== EXECUÇÃO AGENDADA ====================
+if __name__ == "__main__":
+    from relatorios_lote import carregar_de_arquivos, carregar_do_sheets
+    from tendencias import agregados_diarios
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument('--arquivos', help="diretório com os CSVs exportados, um por aba")
+    fonte.add_argument('--planilha', help="URL da planilha no Google Sheets")
+    parser.add_argument('--credenciais', help="JSON da conta de serviço (com --planilha)")
+    parser.add_argument('--espaco', default="Principal", help="espaço (planilha) ao qual os alertas pertencem")
+    args = parser.parse_args()
+
+    dados = carregar_de_arquivos(args.arquivos) if args.arquivos else carregar_do_sheets(args.planilha, args.credenciais)
+    alertas = verificar_alertas(args.espaco, agregados_diarios(dados))
+    for alerta in alertas:
+        print("🚨 " + descrever_alerta(alerta).replace("**", ""))
+    print(f"✅ {len(alertas)} alerta(s) nos dias verificados de {args.espaco}")
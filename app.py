@@ -1,15 +1,32 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import gspread
-import plotly.graph_objects as go 
-import plotly.express as px
 from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
 import os
-from assistente_po import consultar_assistente_po
+from assistente_po import preparar_relatorio_po
+from assistente_streamlit import consultar_assistente, conversa_da_sessao, conversar_assistente
+from provedores_llm import MODELOS
+from busca_texto import rotulos_correspondentes, tabela_resultados, tokenizar
+from functools import partial
+from espacos import CacheEspacos, ler_espacos, obter_conexao
+from planilhas import ESCOPOS, ClientePlanilhas, CotaEsgotada, LIMITES_LATENCIA_MS, TIMEOUT_S, status_http
+from telemetria_llm import carregar_chamadas, resumo_por_modelo
+from rastreamento import iniciar_trace, span, rastrear, medir, resumo_trace, duracao_total_ms, exportar_trace
+from datas import COLUNAS_PERIODO, converter_datas, tipar_aba
+from graficos import obter_figuras, versao_dados, figura_pizza, figura_barras, figura_linhas, figura_mapa_calor
+from tendencias import (
+    JANELAS_MOVEIS, FREQUENCIAS, AGREGADORES_DIARIOS, combinar_agregados,
+    metricas_moveis, metricas_por_periodo, mapa_dia_semana, serie_priorizacao, comparativo_espacos,
+    SomasAcumuladas, comparar_periodos, periodo_anterior
+)
+from produtividade import PESOS_PADRAO, analisar_produtividade
+from alertas import agendar_verificacao, carregar_alertas, descrever_alerta
 
 # ==================== CONSTANTES ====================
 SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/12Nn4aRW_-yVTB1itRrY0Ae1mhETVTXwZiRzezAzwRcQ/edit'
+DIAS_ALERTAS_RECENTES = 14
 
 # ==================== CONFIGURAÇÃO ====================
 st.set_page_config(
@@ -19,8 +36,18 @@ st.set_page_config(
 )
 
 # ==================== HELPER FUNCTIONS (Conexão) ====================
-def get_google_sheet():
-    """Função auxiliar para conectar ao Google Sheets"""
+def planilhas_configuradas():
+    """{espaço: url} das planilhas servidas por este deploy (uma por PO ou squad)"""
+    return ler_espacos(st.secrets['planilhas'] if 'planilhas' in st.secrets else None, SPREADSHEET_URL)
+
+def espaco_atual():
+    """Espaço (planilha) escolhido nesta sessão; o primeiro configurado por padrão"""
+    espacos = planilhas_configuradas()
+    escolhido = st.session_state.get('espaco')
+    return escolhido if escolhido in espacos else next(iter(espacos))
+
+def autorizar_google():
+    """Cliente gspread autorizado com a conta de serviço dos secrets (None sem credenciais)"""
     # Tenta encontrar a chave correta nos secrets
     service_account_info = None
     if 'relatorio_set_out_account' in st.secrets:
@@ -32,41 +59,87 @@ def get_google_sheet():
         st.error("❌ Credenciais do Google Sheets não configuradas")
         return None
         
-    scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    creds = Credentials.from_service_account_info(service_account_info, scopes=scope)
-    client = gspread.authorize(creds)
-    return client.open_by_url(SPREADSHEET_URL)
+    with span("sheets.auth"):
+        creds = Credentials.from_service_account_info(service_account_info, scopes=ESCOPOS)
+        client = gspread.authorize(creds)
+        client.set_timeout(TIMEOUT_S)
+    return client
+
+def get_google_sheet(espaco=None):
+    """Função auxiliar para conectar ao Google Sheets"""
+    espaco = espaco or espaco_atual()
+    # Uma conexão por espaço, autorizada uma vez e reaproveitada entre leituras
+    client = obter_conexao(espaco, autorizar_google)
+    if client is None:
+        return None
+    return client.open_by_url(planilhas_configuradas()[espaco])
 
-def carregar_dados_aba(nome_aba, coluna_data=None):
-    """Função genérica para carregar dados de qualquer aba"""
+@st.cache_resource
+def obter_cliente_planilhas(espaco):
+    """Cliente de cada espaço: a cota e as métricas de uma planilha valem para todas as sessões"""
+    return ClientePlanilhas()
+
+@st.cache_resource
+def obter_cache_espacos():
+    """Armazém do processo (abas, recortes e agregados), com namespace e limite de memória por espaço"""
+    return CacheEspacos()
+
+def carregar_dados_aba(nome_aba, colunas_data=None, espaco=None):
+    """Função genérica para carregar dados de qualquer aba, já com as colunas de data tipadas"""
+    espaco = espaco or espaco_atual()
     try:
-        spreadsheet = get_google_sheet()
-        if not spreadsheet: return pd.DataFrame()
+        # O snapshot é o frame tipado que ainda está no cache: nenhuma cópia fora do limite de memória
+        dados, momento_snapshot = obter_cliente_planilhas(espaco).ler_registros(
+            partial(get_google_sheet, espaco), nome_aba, ultima_boa=partial(obter_cache_espacos().ultima_versao, espaco, nome_aba)
+        )
+        if momento_snapshot:
+            # Mantém a versão da leitura original e reaproveita as figuras
+            lido_em = datetime.fromtimestamp(dados.attrs['versao'])
+            st.warning(f"⚠️ Google Sheets indisponível ou sem cota: exibindo {nome_aba} lido às {lido_em.strftime('%H:%M:%S')}")
+            return dados
+        with span("ingest.dataframe", aba=nome_aba) as atributos:
+            df = pd.DataFrame(dados)
+            atributos.update(medir(df))
         
-        aba = spreadsheet.worksheet(nome_aba)
-        dados = aba.get_all_records()
-        df = pd.DataFrame(dados)
+        if not df.empty:
+            with span("ingest.tipagem", aba=nome_aba):
+                tipar_aba(df, nome_aba, colunas_data)
         
-        if not df.empty and coluna_data and coluna_data in df.columns:
-            df[coluna_data] = pd.to_datetime(df[coluna_data], dayfirst=True, errors='coerce')
-            
+        # Token de versão: muda a cada leitura da planilha e invalida as figuras em cache
+        df.attrs['versao'] = datetime.now().timestamp()
+        # Recortes herdam os attrs: com menos linhas que a carga, o índice de busca sabe que não é a aba inteira
+        df.attrs['linhas_carregadas'] = len(df)
+        df.attrs['espaco'] = espaco
         return df
+    except CotaEsgotada as e:
+        st.warning(f"⏳ Cota do Google Sheets esgotada ao carregar {nome_aba}: {e}")
+        return pd.DataFrame()
+    except gspread.exceptions.WorksheetNotFound:
+        st.error(f"❌ Aba {nome_aba} não encontrada na planilha")
+        return pd.DataFrame()
+    except gspread.exceptions.APIError as e:
+        st.error(f"❌ Google Sheets recusou a leitura de {nome_aba} (HTTP {status_http(e)}): {e}")
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"❌ Erro ao carregar {nome_aba}: {e}")
         return pd.DataFrame()
 
 def salvar_registro_generico(nome_aba, linha_dados, mensagem_sucesso):
     """Função genérica para salvar registros"""
+    espaco = espaco_atual()
     try:
-        spreadsheet = get_google_sheet()
-        if not spreadsheet: return False
-        
-        aba = spreadsheet.worksheet(nome_aba)
-        aba.append_row(linha_dados)
+        if not obter_cliente_planilhas(espaco).acrescentar_linha(partial(get_google_sheet, espaco), nome_aba, linha_dados):
+            return False
         
         st.success(mensagem_sucesso)
-        st.cache_data.clear()
+        obter_cache_espacos().limpar(espaco)
         return True
+    except CotaEsgotada as e:
+        st.error(f"⏳ Cota do Google Sheets esgotada; o registro não foi salvo em {nome_aba}. Tente novamente em instantes ({e})")
+        return False
+    except gspread.exceptions.APIError as e:
+        st.error(f"❌ Google Sheets recusou a gravação em {nome_aba} (HTTP {status_http(e)}): {e}")
+        return False
     except Exception as e:
         st.error(f"❌ Erro ao salvar em {nome_aba}: {e}")
         return False
@@ -75,34 +148,145 @@ def salvar_registro_generico(nome_aba, linha_dados, mensagem_sucesso):
 def create_sidebar():
     st.sidebar.title("🎛️ Controle de Dados")
     
+    espacos = planilhas_configuradas()
+    if len(espacos) > 1:
+        st.sidebar.selectbox("🗂️ Planilha (PO/Squad)", list(espacos), key="espaco")
+    
     # Botão para forçar atualização
     if st.sidebar.button("🔄 Atualizar Dados do Google Sheets", key="btn_atualizar_dados"):
-        st.cache_data.clear()
+        obter_cache_espacos().limpar(espaco_atual())
         st.success("✅ Cache limpo! Os dados serão atualizados na próxima leitura.")
         st.rerun()
     
     st.sidebar.markdown("---")
     st.sidebar.info("💡 Clique no botão acima para atualizar os dados diretamente do Google Sheets")
+    st.sidebar.text_input("🔎 Busca global", key="busca_global", placeholder="Nome, descrição, decisões, observações...")
+    st.sidebar.checkbox("⏱️ Mostrar tempos desta execução", key="mostrar_tempos")
+
+def painel_tempos(trace):
+    """Painel opcional na sidebar com a quebra de tempo dos spans do rerun atual"""
+    if not st.session_state.get('mostrar_tempos'):
+        return
+    with st.sidebar.expander("⏱️ Tempos desta execução", expanded=True):
+        st.caption(f"Total medido: {duracao_total_ms(trace):.0f} ms")
+        linhas = resumo_trace(trace)
+        if linhas:
+            st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+        else:
+            st.info("Nenhuma etapa medida nesta execução")
+
+def painel_alertas():
+    """Agenda a verificação de anomalias da versão atual dos dados e lista os alertas recentes na sidebar"""
+    espaco = espaco_atual()
+    agendar_verificacao(espaco, carregar_agregados_diarios(espaco))
+    alertas = carregar_alertas(espaco, desde=datetime.now() - timedelta(days=DIAS_ALERTAS_RECENTES))
+    if alertas.empty:
+        return
+    with st.sidebar.expander(f"🚨 Alertas ({len(alertas)})"):
+        for alerta in alertas.to_dict('records'):
+            st.markdown(f"- {descrever_alerta(alerta)}")
+
+def painel_busca_global(consulta):
+    """Resultados da busca global em todas as abas, acima da página atual"""
+    frames = {
+        'melhorias': carregar_melhorias(),
+        'cerimonias': carregar_cerimonias(),
+        'documentos': carregar_documentos(),
+        'demandas': carregar_demandas()
+    }
+    with span("busca.global") as atributos:
+        resultados = tabela_resultados(consulta, frames)
+        atributos['linhas'] = len(resultados)
+    with st.expander(f"🔎 {len(resultados)} resultado(s) para \"{consulta}\"", expanded=True):
+        if resultados.empty:
+            st.info("Nenhum registro encontrado. A busca ignora acentos e aceita o início das palavras.")
+        else:
+            st.dataframe(resultados, hide_index=True, use_container_width=True)
+
+def mostrar_grafico(fig):
+    """Renderiza a figura medindo a serialização do plotly"""
+    with span("plotly.render"):
+        st.plotly_chart(fig, use_container_width=True)
 
 # ==================== FUNÇÕES DE FILTRO ====================
+def selecionar_linhas(dados, *mascaras):
+    """Indexa o frame uma única vez pela conjunção das máscaras.
+
+    Sem máscara, ou quando todas as linhas passam, devolve o próprio frame (sem cópia):
+    o resultado pode ser o frame em cache, então é somente leitura.
+    """
+    if not mascaras:
+        return dados
+    mascara = np.logical_and.reduce([np.asarray(m, dtype=bool) for m in mascaras])
+    if mascara.all():
+        return dados
+    return dados[mascara]
+
+@rastrear("filtro.data")
 def aplicar_filtro_data(df, coluna_data, data_inicio, data_fim):
     """Aplica filtro de data em um DataFrame de forma robusta"""
     if df.empty:
         return df
     
-    # Converter para datetime se ainda não for
-    if df[coluna_data].dtype == 'object':
-        df[coluna_data] = pd.to_datetime(df[coluna_data], dayfirst=True, errors='coerce')
-    
-    # Remover linhas onde a data é inválida
-    df_validas = df.dropna(subset=[coluna_data]).copy()
+    # As datas chegam tipadas do carregamento; a conversão só atua em frames vindos de outra origem
+    if not pd.api.types.is_datetime64_any_dtype(df[coluna_data]):
+        df = df.assign(**{coluna_data: converter_datas(df[coluna_data])})
     
     # Garantir que data_inicio e data_fim sejam datetime
     inicio = pd.to_datetime(data_inicio).normalize()
     fim = pd.to_datetime(data_fim).normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
     
-    mask = (df_validas[coluna_data] >= inicio) & (df_validas[coluna_data] <= fim)
-    return df_validas.loc[mask]
+    # Datas inválidas (NaT) falham nas duas comparações: saem junto, sem um dropna à parte
+    datas = df[coluna_data]
+    return selecionar_linhas(df, (datas >= inicio) & (datas <= fim))
+
+@rastrear("filtro.melhorias")
+def filtrar_melhorias(dados, status_filter, impacto_filter, aplicada_filter):
+    """Filtros da página de melhorias"""
+    if dados.empty:
+        return dados
+    mascaras = []
+    if status_filter: mascaras.append(dados['status'].isin(status_filter))
+    if impacto_filter: mascaras.append(dados['impacto'].isin(impacto_filter))
+    if aplicada_filter != "Todos":
+        valor_filtro = "SIM" if aplicada_filter == "SIM" else "NÃO"
+        mascaras.append(dados['melhoria_aplicada'] == valor_filtro)
+    return selecionar_linhas(dados, *mascaras)
+
+@rastrear("filtro.cerimonias")
+def filtrar_cerimonias(dados, tipo_filter, presente_filter, nome_filter):
+    """Filtros da página de cerimônias"""
+    if dados.empty:
+        return dados
+    mascaras = []
+    if tipo_filter: mascaras.append(dados['tipo'].isin(tipo_filter))
+    if presente_filter != "Todos": mascaras.append(dados['presente'] == presente_filter)
+    dados = selecionar_linhas(dados, *mascaras)
+    if not nome_filter:
+        return dados
+    # Trecho no meio do nome ("view", "ing") ou consulta sem termos ("d", "de"): como antes, por substring
+    no_nome = dados['nome'].str.contains(nome_filter, case=False, na=False, regex=False)
+    if not tokenizar(nome_filter):
+        return selecionar_linhas(dados, no_nome)
+    # A busca textual, mais cara, só pontua as linhas que sobraram dos outros filtros
+    return selecionar_linhas(dados, dados.index.isin(rotulos_correspondentes('cerimonias', dados, nome_filter)) | no_nome.to_numpy())
+
+@rastrear("filtro.documentos")
+def filtrar_documentos(dados, tipo_doc_filter, status_doc_filter):
+    """Filtros da página de documentos"""
+    if dados.empty:
+        return dados
+    mascaras = []
+    if tipo_doc_filter: mascaras.append(dados['tipo_documento'].isin(tipo_doc_filter))
+    if status_doc_filter: mascaras.append(dados['status'].isin(status_doc_filter))
+    return selecionar_linhas(dados, *mascaras)
+
+@rastrear("filtro.demandas")
+def filtrar_demandas(dados, status_filter):
+    """Filtros da página de demandas"""
+    if dados.empty or not status_filter:
+        return dados
+    return selecionar_linhas(dados, dados['status'].isin(status_filter))
 
 def criar_filtros_sidebar():
     """Cria filtros globais na sidebar"""
@@ -159,20 +343,96 @@ def criar_filtros_sidebar():
     if data_fim != st.session_state.data_fim:
         st.session_state.data_fim = data_fim
     
+    if st.sidebar.checkbox("🔁 Comparar com o período anterior", key="comparar_periodos"):
+        anterior_inicio, anterior_fim = periodo_anterior(data_inicio, data_fim)
+        st.sidebar.caption(f"Período anterior: {anterior_inicio.strftime('%d/%m/%Y')} a {anterior_fim.strftime('%d/%m/%Y')}")
+    
     return data_inicio, data_fim
 
 # ==================== FUNÇÕES DE CARREGAMENTO ====================
-@st.cache_data(ttl=300)
-def carregar_melhorias():
-    return carregar_dados_aba("melhorias", "data_proposta")
+def carregar_aba_em_cache(nome_aba, espaco=None):
+    """Aba do espaço pelo cache compartilhado (TTL de 5 min); leituras com erro não entram no cache"""
+    espaco = espaco or espaco_atual()
+    return obter_cache_espacos().obter(
+        espaco, nome_aba, partial(carregar_dados_aba, nome_aba, espaco=espaco),
+        guardar=lambda df: 'versao' in df.attrs
+    )
+
+@rastrear("cache.melhorias")
+def carregar_melhorias(espaco=None):
+    return carregar_aba_em_cache("melhorias", espaco)
+
+@rastrear("cache.cerimonias")
+def carregar_cerimonias(espaco=None):
+    return carregar_aba_em_cache("cerimonias_reunioes", espaco)
+
+@rastrear("cache.documentos")
+def carregar_documentos(espaco=None):
+    return carregar_aba_em_cache("documentos_criterios", espaco)
 
-@st.cache_data(ttl=300)
-def carregar_cerimonias():
-    return carregar_dados_aba("cerimonias_reunioes", "data")
+@rastrear("cache.demandas")
+def carregar_demandas(espaco=None):
+    return carregar_aba_em_cache("demandas", espaco)
 
-@st.cache_data(ttl=300)
-def carregar_documentos():
-    return carregar_dados_aba("documentos_criterios", "data")
+@rastrear("agregacao.diaria_aba")
+def agregado_diario_aba(categoria, dados, espaco):
+    """Agregado diário de uma aba, recalculado só quando a versão dos dados dessa aba muda"""
+    calcular = partial(AGREGADORES_DIARIOS[categoria], dados)
+    if versao_dados(dados) is None:
+        return calcular()
+    # No armazém do processo: uma cópia para todas as sessões, sem serializar a cada leitura
+    return obter_cache_espacos().obter(espaco, ('agregado', categoria, versao_dados(dados)), calcular)
+
+@rastrear("agregacao.diaria")
+def carregar_agregados_diarios(espaco=None):
+    """Combina os agregados diários em cache de todas as abas num único frame indexado por dia"""
+    espaco = espaco or espaco_atual()
+    dados = {
+        'melhorias': carregar_melhorias(espaco),
+        'cerimonias': carregar_cerimonias(espaco),
+        'documentos': carregar_documentos(espaco),
+        'demandas': carregar_demandas(espaco)
+    }
+    versao = tuple(versao_dados(df) for df in dados.values())
+
+    def combinar():
+        diario = combinar_agregados([agregado_diario_aba(categoria, df, espaco) for categoria, df in dados.items()])
+        diario.attrs['versao'] = versao
+        return diario
+
+    if None in versao:
+        return combinar()
+    # O frame combinado cobre todo o histórico: montado uma vez por versão, não a cada rerun
+    return obter_cache_espacos().obter(espaco, ('diario', versao), combinar)
+
+def somas_acumuladas(espaco=None):
+    """Somas prefixadas do agregado diário do espaço, uma por versão dos dados"""
+    espaco = espaco or espaco_atual()
+    diario = carregar_agregados_diarios(espaco)
+    if None in versao_dados(diario):
+        return SomasAcumuladas(diario)
+    return obter_cache_espacos().obter(espaco, ('acumuladas', versao_dados(diario)), partial(SomasAcumuladas, diario))
+
+def comparacao_periodo(data_inicio, data_fim, filtros_ativos=False, anterior=None):
+    """Indicadores do período e do anterior equivalente para os deltas dos cartões (None fora do modo comparação).
+
+    Os agregados diários não conhecem os filtros das páginas: com algum ativo não há delta.
+    `anterior` (início, fim) substitui o período anterior calculado por `periodo_anterior`.
+    """
+    if not st.session_state.get('comparar_periodos'):
+        return None
+    if filtros_ativos:
+        st.caption("🔁 Comparação com o período anterior indisponível com filtros da página ativos")
+        return None
+    with span("comparacao.periodos"):
+        return comparar_periodos(somas_acumuladas(), data_inicio, data_fim, anterior)
+
+def variacao(comparacao, coluna, formato="{:+.1f}"):
+    """Delta de um cartão (atual - anterior) já formatado; None sem comparação ou sem valor nos dois períodos"""
+    if comparacao is None:
+        return None
+    diferenca = comparacao.at['atual', coluna] - comparacao.at['anterior', coluna]
+    return None if pd.isna(diferenca) else formato.format(diferenca)
 
 # ==================== FUNÇÕES DE SALVAR ====================
 def salvar_melhoria(dados):
@@ -216,6 +476,87 @@ def salvar_documento(dados):
     ]
     return salvar_registro_generico("documentos_criterios", nova_linha, "✅ Documento salvo com sucesso!")
 
+def salvar_demanda(dados):
+    nova_linha = [
+        dados['data_avaliacao'].strftime('%d/%m/%Y'),
+        dados['periodo'],
+        dados['total_historias'],
+        dados['historias_prioridade_definida'],
+        dados['historias_criterio_aceite'],
+        dados['status'],
+        dados['observacoes']
+    ]
+    return salvar_registro_generico("demandas", nova_linha, "✅ Avaliação de demandas salva com sucesso!")
+
+# ==================== FIGURAS DOS DASHBOARDS ====================
+def figuras_melhorias(dados):
+    aplicadas = int((dados['melhoria_aplicada'] == 'SIM').sum())
+    return {
+        'aplicacao': figura_pizza(['Aplicadas', 'Pendentes'], [aplicadas, len(dados) - aplicadas], "Taxa de Aplicação de Melhorias")
+    }
+
+def figuras_cerimonias(dados):
+    tipo_count = dados['tipo'].value_counts()
+    tempo_por_tipo = dados.groupby('tipo')['duracao_minutos'].sum()
+    return {
+        'tipo': figura_pizza(tipo_count.index, tipo_count.values, "Distribuição por Tipo"),
+        'tempo': figura_barras(tempo_por_tipo.index, tempo_por_tipo.values, "Tempo Total por Tipo (minutos)", "tipo", "duracao_minutos")
+    }
+
+def figuras_documentos(dados):
+    tipo_count = dados['tipo_documento'].value_counts()
+    tempo_por_tipo = dados.groupby('tipo_documento')['tempo_minutos'].mean()
+    return {
+        'tipo': figura_pizza(tipo_count.index, tipo_count.values, "Distribuição por Tipo de Documento"),
+        'tempo': figura_barras(tempo_por_tipo.index, tempo_por_tipo.values, "Tempo Médio por Tipo (minutos)", "tipo_documento", "tempo_minutos")
+    }
+
+TITULOS_MAPA_CALOR = {
+    'documentos': "Documentos",
+    'minutos_documentos': "Minutos em documentação",
+    'minutos_reuniao': "Minutos em reunião",
+    'cerimonias_total': "Cerimônias/Reuniões",
+    'melhorias_propostas': "Melhorias propostas"
+}
+
+def figuras_tendencias(diario, janela, agrupamento, data_inicio, data_fim, coluna_mapa):
+    inicio = pd.to_datetime(data_inicio).normalize()
+    fim = pd.to_datetime(data_fim).normalize()
+    
+    # Janelas móveis usam o histórico completo, para que o início do período já tenha janela cheia
+    if agrupamento in FREQUENCIAS:
+        metricas = metricas_por_periodo(diario, FREQUENCIAS[agrupamento])
+    else:
+        metricas = metricas_moveis(diario, janela)
+    metricas = metricas.loc[inicio:fim]
+    sufixo = f"({agrupamento.lower()})" if agrupamento in FREQUENCIAS else f"(janela de {janela} dias)"
+    
+    return {
+        'taxas': figura_linhas(metricas.index, {
+            'Taxa de aplicação de melhorias': metricas['taxa_aplicacao'],
+            'Taxa de presença': metricas['taxa_presenca'],
+            'Taxa de priorização': metricas['taxa_priorizacao']
+        }, f"Taxas {sufixo}", "%"),
+        'horas': figura_linhas(metricas.index, {'Horas em reunião': metricas['horas_reuniao']}, f"Horas em Reunião {sufixo}", "horas"),
+        'docs': figura_linhas(metricas.index, {'Documentos por hora': metricas['docs_por_hora']}, f"Documentos por Hora {sufixo}", "docs/hora"),
+        'mapa': figura_mapa_calor(mapa_dia_semana(diario.loc[inicio:fim], coluna_mapa), f"{TITULOS_MAPA_CALOR[coluna_mapa]} por Dia da Semana", TITULOS_MAPA_CALOR[coluna_mapa])
+    }
+
+def figuras_demandas(dados):
+    # Série de taxas pré-agregada por dia de avaliação (mesmo agregado usado nas tendências)
+    serie = serie_priorizacao(AGREGADORES_DIARIOS['demandas'](dados))
+    historias = dados[['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']].sum()
+    return {
+        'evolucao': figura_linhas(serie.index, {
+            'Taxa de priorização': serie['taxa_priorizacao'],
+            'Taxa de critério de aceite': serie['taxa_criterio']
+        }, "Evolução da Priorização por Avaliação", "%"),
+        'historias': figura_barras(
+            ['Total', 'Com prioridade', 'Com critério de aceite'], historias.values,
+            "Histórias Avaliadas no Período", None, "histórias"
+        )
+    }
+
 # ==================== PÁGINA MELHORIAS ====================
 def pagina_melhorias(data_inicio, data_fim):
     st.header("💡 Sistema de Melhorias")
@@ -236,28 +577,25 @@ def pagina_melhorias(data_inicio, data_fim):
     else:
         dados = dados_brutos
         
-    if not dados.empty:
-        if status_filter: dados = dados[dados['status'].isin(status_filter)]
-        if impacto_filter: dados = dados[dados['impacto'].isin(impacto_filter)]
-        if aplicada_filter != "Todos":
-            valor_filtro = "SIM" if aplicada_filter == "SIM" else "NÃO"
-            dados = dados[dados['melhoria_aplicada'] == valor_filtro]
+    dados = filtrar_melhorias(dados, status_filter, impacto_filter, aplicada_filter)
     
     tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "➕ Nova Melhoria", "📋 Dados"])
     
     with tab1:
         if len(dados) > 0:
             total = len(dados)
-            aplicadas = len(dados[dados['melhoria_aplicada'] == 'SIM'])
+            aplicadas = int((dados['melhoria_aplicada'] == 'SIM').sum())
             taxa = (aplicadas / total * 100) if total > 0 else 0
         
+            comparacao = comparacao_periodo(data_inicio, data_fim, filtros_ativos=bool(status_filter or impacto_filter or aplicada_filter != "Todos"))
             col1, col2, col3 = st.columns(3)
-            col1.metric("Total Melhorias", total)
-            col2.metric("Aplicadas", aplicadas)
-            col3.metric("Taxa", f"{taxa:.1f}%")
+            col1.metric("Total Melhorias", total, delta=variacao(comparacao, 'melhorias_propostas', "{:+.0f}"))
+            col2.metric("Aplicadas", aplicadas, delta=variacao(comparacao, 'melhorias_aplicadas', "{:+.0f}"))
+            col3.metric("Taxa", f"{taxa:.1f}%", delta=variacao(comparacao, 'taxa_aplicacao', "{:+.1f} p.p."))
         
-            fig = px.pie(names=['Aplicadas', 'Pendentes'], values=[aplicadas, total - aplicadas], title="Taxa de Aplicação de Melhorias")
-            st.plotly_chart(fig, use_container_width=True)
+            chave = ('melhorias', data_inicio, data_fim, tuple(status_filter), tuple(impacto_filter), aplicada_filter, versao_dados(dados_brutos))
+            figuras = obter_figuras(chave, figuras_melhorias, dados)
+            mostrar_grafico(figuras['aplicacao'])
             
             filtros_ativos = []
             if status_filter: filtros_ativos.append(f"Status: {', '.join(status_filter)}")
@@ -310,8 +648,8 @@ def pagina_melhorias(data_inicio, data_fim):
         st.subheader("📋 Dados Completos")
         if not dados.empty:
             st.dataframe(dados, use_container_width=True)
-            csv = dados.to_csv(index=False)
-            st.download_button(label="📥 Download CSV", data=csv, file_name="melhorias.csv", mime="text/csv")
+            # O CSV só é gerado no clique: sem cópia em texto da tabela inteira a cada rerun
+            st.download_button(label="📥 Download CSV", data=partial(dados.to_csv, index=False), file_name="melhorias.csv", mime="text/csv")
         else:
             st.info("📝 Nenhum dado disponível")
 
@@ -326,7 +664,7 @@ def pagina_cerimonias(data_inicio, data_fim):
         with col2:
             presente_filter = st.selectbox("Presença", ["Todos", "SIM", "NÃO"], key="filtro_presenca_cerimonias")
         with col3:
-            nome_filter = st.text_input("Filtrar por nome", key="filtro_nome_cerimonias")
+            nome_filter = st.text_input("Buscar por nome ou texto", key="filtro_nome_cerimonias", help="Sem acentos e por prefixo: 'plan' encontra Planning")
     
     dados_brutos = carregar_cerimonias()
     
@@ -335,36 +673,33 @@ def pagina_cerimonias(data_inicio, data_fim):
     else:
         dados = dados_brutos
 
-    if not dados.empty:
-        if tipo_filter: dados = dados[dados['tipo'].isin(tipo_filter)]
-        if presente_filter != "Todos": dados = dados[dados['presente'] == presente_filter]
-        if nome_filter: dados = dados[dados['nome'].str.contains(nome_filter, case=False, na=False)]
+    dados = filtrar_cerimonias(dados, tipo_filter, presente_filter, nome_filter)
 
     tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "➕ Novo Registro", "📋 Dados"])
     
     with tab1:
         if len(dados) > 0:
             total_registros = len(dados)
-            presencas = len(dados[dados['presente'] == 'SIM'])
+            presencas = int((dados['presente'] == 'SIM').sum())
             taxa_presenca = (presencas / total_registros * 100) if total_registros > 0 else 0
             total_minutos = dados['duracao_minutos'].sum()
             horas_totais = total_minutos / 60
             
+            comparacao = comparacao_periodo(data_inicio, data_fim, filtros_ativos=bool(tipo_filter or presente_filter != "Todos" or nome_filter))
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total Registros", total_registros)
-            col2.metric("Presenças", presencas)
-            col3.metric("Taxa Presença", f"{taxa_presenca:.1f}%")
-            col4.metric("Horas em Reunião", f"{horas_totais:.1f}h")
+            col1.metric("Total Registros", total_registros, delta=variacao(comparacao, 'cerimonias_total', "{:+.0f}"))
+            col2.metric("Presenças", presencas, delta=variacao(comparacao, 'cerimonias_presentes', "{:+.0f}"))
+            col3.metric("Taxa Presença", f"{taxa_presenca:.1f}%", delta=variacao(comparacao, 'taxa_presenca', "{:+.1f} p.p."))
+            col4.metric("Horas em Reunião", f"{horas_totais:.1f}h", delta=variacao(comparacao, 'horas_reuniao', "{:+.1f}h"), delta_color="inverse")
+            
+            chave = ('cerimonias', data_inicio, data_fim, tuple(tipo_filter), presente_filter, nome_filter, versao_dados(dados_brutos))
+            figuras = obter_figuras(chave, figuras_cerimonias, dados)
             
             col1, col2 = st.columns(2)
             with col1:
-                tipo_count = dados['tipo'].value_counts()
-                fig_tipo = px.pie(names=tipo_count.index, values=tipo_count.values, title="Distribuição por Tipo")
-                st.plotly_chart(fig_tipo, use_container_width=True)
+                mostrar_grafico(figuras['tipo'])
             with col2:
-                tempo_por_tipo = dados.groupby('tipo')['duracao_minutos'].sum().reset_index()
-                fig_tempo = px.bar(tempo_por_tipo, x='tipo', y='duracao_minutos', title="Tempo Total por Tipo (minutos)")
-                st.plotly_chart(fig_tempo, use_container_width=True)
+                mostrar_grafico(figuras['tempo'])
         else:
             st.info("Nenhuma cerimônia ou reunião encontrada no período selecionado.")
 
@@ -422,38 +757,36 @@ def pagina_documentos(data_inicio, data_fim):
     else:
         dados = dados_brutos
         
-    if not dados.empty:
-        if tipo_doc_filter: dados = dados[dados['tipo_documento'].isin(tipo_doc_filter)]
-        if status_doc_filter: dados = dados[dados['status'].isin(status_doc_filter)]
+    dados = filtrar_documentos(dados, tipo_doc_filter, status_doc_filter)
     
     tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "➕ Novo Documento", "📋 Dados"])
     
     with tab1:
         if len(dados) > 0:
             total_documentos = len(dados)
-            docs_criterios = len(dados[dados['critérios_aceite'] == 'SIM'])
-            docs_templates = len(dados[dados['template_padronizado'] == 'SIM'])
+            docs_criterios = int((dados['critérios_aceite'] == 'SIM').sum())
+            docs_templates = int((dados['template_padronizado'] == 'SIM').sum())
             tempo_total = dados['tempo_minutos'].sum()
             tempo_medio = tempo_total / total_documentos if total_documentos > 0 else 0
             
             taxa_criterios = (docs_criterios / total_documentos * 100) if total_documentos > 0 else 0
             taxa_templates = (docs_templates / total_documentos * 100) if total_documentos > 0 else 0
             
+            comparacao = comparacao_periodo(data_inicio, data_fim, filtros_ativos=bool(tipo_doc_filter or status_doc_filter))
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total Documentos", total_documentos)
-            col2.metric("Taxa Critérios", f"{taxa_criterios:.1f}%")
-            col3.metric("Taxa Templates", f"{taxa_templates:.1f}%")
-            col4.metric("Tempo Médio", f"{tempo_medio:.0f} min")
+            col1.metric("Total Documentos", total_documentos, delta=variacao(comparacao, 'documentos', "{:+.0f}"))
+            col2.metric("Taxa Critérios", f"{taxa_criterios:.1f}%", delta=variacao(comparacao, 'cobertura_criterios', "{:+.1f} p.p."))
+            col3.metric("Taxa Templates", f"{taxa_templates:.1f}%", delta=variacao(comparacao, 'cobertura_template', "{:+.1f} p.p."))
+            col4.metric("Tempo Médio", f"{tempo_medio:.0f} min", delta=variacao(comparacao, 'tempo_medio_documento', "{:+.0f} min"), delta_color="off")
+            
+            chave = ('documentos', data_inicio, data_fim, tuple(tipo_doc_filter), tuple(status_doc_filter), versao_dados(dados_brutos))
+            figuras = obter_figuras(chave, figuras_documentos, dados)
             
             col1, col2 = st.columns(2)
             with col1:
-                tipo_count = dados['tipo_documento'].value_counts()
-                fig_tipo = px.pie(names=tipo_count.index, values=tipo_count.values, title="Distribuição por Tipo de Documento")
-                st.plotly_chart(fig_tipo, use_container_width=True)
+                mostrar_grafico(figuras['tipo'])
             with col2:
-                tempo_por_tipo = dados.groupby('tipo_documento')['tempo_minutos'].mean().reset_index()
-                fig_tempo = px.bar(tempo_por_tipo, x='tipo_documento', y='tempo_minutos', title="Tempo Médio por Tipo (minutos)")
-                st.plotly_chart(fig_tempo, use_container_width=True)
+                mostrar_grafico(figuras['tempo'])
             
             st.subheader("⏱️ Análise de Produtividade")
             horas_totais = tempo_total / 60
@@ -461,9 +794,9 @@ def pagina_documentos(data_inicio, data_fim):
             horas_por_dia = horas_totais / dias_trabalho if dias_trabalho > 0 else 0
             
             col1, col2, col3 = st.columns(3)
-            col1.metric("Horas Totais", f"{horas_totais:.1f}h")
-            col2.metric("Dias com Documentação", dias_trabalho)
-            col3.metric("Média Diária", f"{horas_por_dia:.1f}h/dia")
+            col1.metric("Horas Totais", f"{horas_totais:.1f}h", delta=variacao(comparacao, 'horas_documentos', "{:+.1f}h"))
+            col2.metric("Dias com Documentação", dias_trabalho, delta=variacao(comparacao, 'dias_documentacao', "{:+.0f}"))
+            col3.metric("Média Diária", f"{horas_por_dia:.1f}h/dia", delta=variacao(comparacao, 'horas_por_dia_documentacao', "{:+.1f}h/dia"))
         else:
             st.info("Nenhum documento registrado no período/filtros selecionados")
         
@@ -501,28 +834,274 @@ def pagina_documentos(data_inicio, data_fim):
         else:
             st.info("Nenhum documento disponível")
 
-# ==================== FUNÇÂO IA =========================
-def pagina_ia_assistente(data_inicio, data_fim):
-    st.header("🤖 Assistente de IA - Análise de PO")
+# ==================== PÁGINA DEMANDAS ====================
+def pagina_demandas(data_inicio, data_fim):
+    st.header("🎯 Priorização de Demandas")
+    
+    dados_brutos = carregar_demandas()
+    
+    with st.expander("🔍 Filtros", expanded=False):
+        opcoes_status = sorted(dados_brutos['status'].dropna().unique()) if 'status' in dados_brutos.columns else []
+        status_filter = st.multiselect("Status", opcoes_status, default=[], key="filtro_status_demandas")
+    
+    if not dados_brutos.empty and data_inicio and data_fim and 'data_avaliacao' in dados_brutos.columns:
+        dados = aplicar_filtro_data(dados_brutos, 'data_avaliacao', data_inicio, data_fim)
+    else:
+        dados = dados_brutos
+    
+    dados = filtrar_demandas(dados, status_filter)
+    
+    tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "➕ Nova Avaliação", "📋 Dados"])
+    
+    with tab1:
+        colunas_historias = ['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']
+        if len(dados) > 0 and not all(col in dados.columns for col in colunas_historias):
+            st.warning(f"⚠️ A aba demandas não tem as colunas de histórias ({', '.join(colunas_historias)})")
+        elif len(dados) > 0:
+            total_historias = dados['total_historias'].sum()
+            com_prioridade = dados['historias_prioridade_definida'].sum()
+            com_criterio = dados['historias_criterio_aceite'].sum()
+            taxa_prioridade = (com_prioridade / total_historias * 100) if total_historias > 0 else 0
+            taxa_criterio = (com_criterio / total_historias * 100) if total_historias > 0 else 0
+            
+            comparacao = comparacao_periodo(data_inicio, data_fim, filtros_ativos=bool(status_filter))
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Avaliações", len(dados), delta=variacao(comparacao, 'avaliacoes', "{:+.0f}"))
+            col2.metric("Histórias Avaliadas", f"{total_historias:.0f}", delta=variacao(comparacao, 'total_historias', "{:+.0f}"))
+            col3.metric("Taxa Priorização", f"{taxa_prioridade:.1f}%", delta=variacao(comparacao, 'taxa_priorizacao', "{:+.1f} p.p."))
+            col4.metric("Taxa Critério de Aceite", f"{taxa_criterio:.1f}%", delta=variacao(comparacao, 'taxa_criterio_historias', "{:+.1f} p.p."))
+            
+            chave = ('demandas', data_inicio, data_fim, tuple(status_filter), versao_dados(dados_brutos))
+            figuras = obter_figuras(chave, figuras_demandas, dados)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                mostrar_grafico(figuras['evolucao'])
+            with col2:
+                mostrar_grafico(figuras['historias'])
+        else:
+            if dados_brutos.empty:
+                st.info("📝 Nenhuma avaliação de demandas registrada")
+            else:
+                st.info("🔍 Nenhuma avaliação encontrada com os filtros aplicados")
+    
+    with tab2:
+        with st.form(key="form_demanda"):
+            col1, col2 = st.columns(2)
+            with col1:
+                data_avaliacao = st.date_input("Data da Avaliação", datetime.now(), key="data_demanda")
+                periodo = st.text_input("Período", placeholder="Sprint 12, Semana 34...", key="periodo_demanda")
+                total_historias = st.number_input("Total de Histórias", min_value=0, value=10, key="total_historias_demanda")
+                status = st.selectbox("Status", ["Em andamento", "Concluída"], key="status_demanda")
+            with col2:
+                historias_prioridade = st.number_input("Histórias com Prioridade Definida", min_value=0, value=0, key="prioridade_demanda")
+                historias_criterio = st.number_input("Histórias com Critério de Aceite", min_value=0, value=0, key="criterio_demanda")
+                observacoes = st.text_area("Observações", key="observacoes_demanda")
+            
+            if st.form_submit_button("💾 Salvar Avaliação", key="btn_salvar_demanda"):
+                if historias_prioridade > total_historias or historias_criterio > total_historias:
+                    st.error("❌ As histórias com prioridade/critério não podem passar do total de histórias")
+                else:
+                    dados_form = {
+                        'data_avaliacao': data_avaliacao,
+                        'periodo': periodo,
+                        'total_historias': total_historias,
+                        'historias_prioridade_definida': historias_prioridade,
+                        'historias_criterio_aceite': historias_criterio,
+                        'status': status,
+                        'observacoes': observacoes
+                    }
+                    if salvar_demanda(dados_form):
+                        st.rerun()
+    
+    with tab3:
+        if not dados.empty:
+            st.dataframe(dados, use_container_width=True)
+        else:
+            st.info("Nenhum dado disponível")
+
+# ==================== PÁGINA TENDÊNCIAS ====================
+def pagina_tendencias(data_inicio, data_fim):
+    st.header("📈 Tendências dos Indicadores")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        agrupamento = st.selectbox("Agrupamento", ["Janela móvel", "Semanal", "Mensal"], key="agrupamento_tendencias")
+    with col2:
+        janela = st.selectbox("Janela móvel (dias)", JANELAS_MOVEIS, index=1, key="janela_tendencias", disabled=agrupamento in FREQUENCIAS)
+    with col3:
+        coluna_mapa = st.selectbox("Mapa de calor", list(TITULOS_MAPA_CALOR), format_func=TITULOS_MAPA_CALOR.get, key="mapa_tendencias")
+    
+    diario = carregar_agregados_diarios()
+    if diario.empty:
+        st.info("📝 Nenhum registro disponível para calcular tendências")
+        return
+    
+    # Indicadores da janela móvel que termina no fim do período selecionado
+    atual = metricas_moveis(diario, janela).loc[:pd.to_datetime(data_fim).normalize()]
+    if not atual.empty:
+        ultimo = atual.iloc[-1].fillna(0)
+        # No modo comparação, a janela que termina no fim do período contra a janela imediatamente anterior
+        fim_janela = atual.index[-1]
+        # Explícito: uma janela que cubra meses inteiros não pode virar "os mesmos meses antes"
+        inicio_janela = fim_janela - pd.Timedelta(days=janela - 1)
+        comparacao = comparacao_periodo(
+            inicio_janela, fim_janela, anterior=(inicio_janela - pd.Timedelta(days=janela), inicio_janela - pd.Timedelta(days=1))
+        )
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(f"Taxa Aplicação ({janela}d)", f"{ultimo['taxa_aplicacao']:.1f}%", delta=variacao(comparacao, 'taxa_aplicacao', "{:+.1f} p.p."))
+        col2.metric(f"Taxa Presença ({janela}d)", f"{ultimo['taxa_presenca']:.1f}%", delta=variacao(comparacao, 'taxa_presenca', "{:+.1f} p.p."))
+        col3.metric(f"Horas em Reunião ({janela}d)", f"{ultimo['horas_reuniao']:.1f}h", delta=variacao(comparacao, 'horas_reuniao', "{:+.1f}h"), delta_color="inverse")
+        col4.metric(f"Docs/Hora ({janela}d)", f"{ultimo['docs_por_hora']:.2f}", delta=variacao(comparacao, 'docs_por_hora', "{:+.2f}"))
+    
+    chave = ('tendencias', data_inicio, data_fim, janela, agrupamento, coluna_mapa, versao_dados(diario))
+    construtor = partial(figuras_tendencias, janela=janela, agrupamento=agrupamento, data_inicio=data_inicio, data_fim=data_fim, coluna_mapa=coluna_mapa)
+    figuras = obter_figuras(chave, construtor, diario)
+    
+    mostrar_grafico(figuras['taxas'])
+    col1, col2 = st.columns(2)
+    with col1:
+        mostrar_grafico(figuras['horas'])
+    with col2:
+        mostrar_grafico(figuras['docs'])
+    mostrar_grafico(figuras['mapa'])
+    
+    widget_dias_produtivos(diario, data_inicio, data_fim)
+
+# ==================== PÁGINA COMPARATIVO ====================
+INDICADORES_COMPARATIVO = {
+    'taxa_aplicacao': ("Taxa de Aplicação de Melhorias", "%"),
+    'taxa_presenca': ("Taxa de Presença", "%"),
+    'horas_reuniao': ("Horas em Reunião", "horas"),
+    'docs_por_hora': ("Documentos por Hora", "docs/h"),
+    'taxa_priorizacao': ("Taxa de Priorização", "%"),
+    'taxa_criterio_historias': ("Taxa de Critério de Aceite", "%")
+}
+
+def pagina_comparativo(data_inicio, data_fim):
+    st.header("🏢 Comparativo entre Planilhas")
+    
+    espacos = list(planilhas_configuradas())
+    if len(espacos) < 2:
+        st.info("📝 Só há uma planilha configurada. Cadastre outras em [planilhas] no secrets.toml ou em PO_PLANILHAS para comparar POs e squads.")
     
-    dados_disponiveis = {
+    # Só os agregados diários de cada espaço entram na comparação, nunca os registros brutos
+    with span("comparativo.agregados", espacos=len(espacos)):
+        comparativo = comparativo_espacos({espaco: carregar_agregados_diarios(espaco) for espaco in espacos}, data_inicio, data_fim)
+    
+    st.dataframe(comparativo.rename(columns={
+        'melhorias_propostas': 'melhorias', 'cerimonias_total': 'cerimônias', 'total_historias': 'histórias',
+        **{coluna: titulo for coluna, (titulo, _) in INDICADORES_COMPARATIVO.items()}
+    }).round(1), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    for posicao, (coluna, (titulo, unidade)) in enumerate(INDICADORES_COMPARATIVO.items()):
+        with (col1 if posicao % 2 == 0 else col2):
+            mostrar_grafico(figura_barras(comparativo.index, comparativo[coluna].fillna(0).values, titulo, "Planilha", unidade))
+
+def figuras_produtividade(diario, pesos, data_inicio, data_fim):
+    produtividade = analisar_produtividade(diario.loc[pd.to_datetime(data_inicio).normalize():pd.to_datetime(data_fim).normalize()], pesos)
+    dia_semana = produtividade['dia_semana']
+    return {
+        'top': produtividade['top'],
+        'dia_semana': figura_barras(dia_semana.index, dia_semana['media'].fillna(0), "Pontuação Média por Dia da Semana", "dia da semana", "pontuação")
+    }
+
+def widget_dias_produtivos(diario, data_inicio, data_fim):
+    st.subheader("🏆 Dias Mais Produtivos")
+    
+    with st.expander("⚖️ Pesos da pontuação", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            peso_documentos = st.number_input("Por documento", min_value=0.0, value=PESOS_PADRAO['documentos'], step=0.5, key="peso_documentos")
+        with col2:
+            peso_horas = st.number_input("Por hora trabalhada", min_value=0.0, value=PESOS_PADRAO['minutos'] * 60, step=0.5, key="peso_horas")
+        with col3:
+            peso_cerimonias = st.number_input("Por cerimônia (presente)", min_value=0.0, value=PESOS_PADRAO['cerimonias'], step=0.5, key="peso_cerimonias")
+        with col4:
+            peso_melhorias = st.number_input("Por melhoria proposta", min_value=0.0, value=PESOS_PADRAO['melhorias'], step=0.5, key="peso_melhorias")
+    
+    pesos = {'documentos': peso_documentos, 'minutos': peso_horas / 60, 'cerimonias': peso_cerimonias, 'melhorias': peso_melhorias}
+    chave = ('produtividade', data_inicio, data_fim, tuple(pesos.values()), versao_dados(diario))
+    resultado = obter_figuras(chave, partial(figuras_produtividade, pesos=pesos, data_inicio=data_inicio, data_fim=data_fim), diario)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if resultado['top'].empty:
+            st.info("Nenhuma atividade registrada no período selecionado.")
+        else:
+            top = resultado['top'].rename(columns={
+                'documentos': 'Documentos', 'minutos': 'Minutos', 'cerimonias': 'Cerimônias',
+                'melhorias': 'Melhorias', 'pontuacao': 'Pontuação'
+            })
+            top.index = top.index.strftime('%d/%m/%Y')
+            st.dataframe(top.round(1), use_container_width=True)
+    with col2:
+        mostrar_grafico(resultado['dia_semana'])
+
+# ==================== FUNÇÂO IA =========================
+def filtrar_periodo_em_cache(categoria, df, data_inicio, data_fim):
+    """Aba filtrada pelo período, compartilhada entre reruns e sessões pelo armazém (somente leitura)"""
+    return obter_cache_espacos().obter(
+        df.attrs.get('espaco') or espaco_atual(), ('periodo', categoria, versao_dados(df), data_inicio, data_fim),
+        partial(aplicar_filtro_data, df, COLUNAS_PERIODO[categoria], data_inicio, data_fim),
+        guardar=lambda recorte: recorte is not df  # período cobrindo a aba toda: é a própria aba, já guardada
+    )
+
+def carregar_dados_periodo(data_inicio, data_fim):
+    """As quatro abas filtradas pelo período; o mesmo filtro sobre os mesmos dados é feito uma vez só"""
+    dados = {
         'melhorias': carregar_melhorias(),
         'cerimonias': carregar_cerimonias(),
-        'documentos': carregar_documentos()
+        'documentos': carregar_documentos(),
+        'demandas': carregar_demandas()
     }
+    for categoria, df in dados.items():
+        if df.empty or COLUNAS_PERIODO[categoria] not in df.columns or not (data_inicio and data_fim):
+            continue
+        if versao_dados(df) is None:  # sem versão não há como saber se o filtro guardado ainda vale
+            dados[categoria] = aplicar_filtro_data(df, COLUNAS_PERIODO[categoria], data_inicio, data_fim)
+        else:
+            dados[categoria] = filtrar_periodo_em_cache(categoria, df, data_inicio, data_fim)
+    return dados
+
+def painel_conversa(dados_disponiveis, tipo_modelo):
+    """Chat com o histórico da sessão: o contexto de dados vai uma vez e cada pergunta envia só o que é novo"""
+    conversa = conversa_da_sessao()
+    col1, col2 = st.columns([4, 1])
+    with col2:
+        if st.button("🧹 Nova conversa", key="btn_nova_conversa"):
+            conversa.limpar()
+    with col1:
+        if conversa.turnos:
+            st.caption(
+                f"💬 {len(conversa.turnos)} perguntas · tokens enviados {conversa.tokens['prompt']} "
+                f"({conversa.tokens['cache']} do contexto em cache)"
+                + (f" · {conversa.resumidos} perguntas antigas resumidas" if conversa.resumidos else "")
+            )
     
-    for categoria, df in dados_disponiveis.items():
-        if not df.empty:
-            coluna_data = None
-            if categoria == 'melhorias' and 'data_proposta' in df.columns:
-                coluna_data = 'data_proposta'
-            elif categoria == 'cerimonias' and 'data' in df.columns:
-                coluna_data = 'data'
-            elif categoria == 'documentos' and 'data' in df.columns:
-                coluna_data = 'data'
-            
-            if coluna_data and data_inicio and data_fim:
-                dados_disponiveis[categoria] = aplicar_filtro_data(df, coluna_data, data_inicio, data_fim)
+    for turno in conversa.turnos:
+        with st.chat_message("user"):
+            st.markdown(turno.pergunta)
+        with st.chat_message("assistant"):
+            st.markdown(turno.resposta)
+    
+    pergunta = st.chat_input("Pergunte sobre seus dados de PO...", key="chat_ia")
+    if pergunta and pergunta.strip():
+        with st.chat_message("user"):
+            st.markdown(pergunta)
+        with st.chat_message("assistant"):
+            with st.spinner("🤖 Analisando..."):
+                resposta = conversar_assistente(pergunta, dados_disponiveis, tipo_modelo)
+            st.markdown(resposta)
+
+def pagina_ia_assistente(data_inicio, data_fim):
+    st.header("🤖 Assistente de IA - Análise de PO")
+    
+    dados_disponiveis = carregar_dados_periodo(data_inicio, data_fim)
+    # Enquanto o usuário digita, as seções que independem da pergunta e a indexação da busca
+    # já rodam em segundo plano; o clique em Analisar só calcula o que é específico da pergunta
+    preparar_relatorio_po(dados_disponiveis)
     
     st.markdown("""
     ### 💬 Faça perguntas sobre seus dados de Product Ownership
@@ -533,32 +1112,183 @@ def pagina_ia_assistente(data_inicio, data_fim):
     - "Analise minha produtividade nos últimos 30 dias"
     """)
     
-    pergunta = st.text_area("Sua pergunta:", placeholder="Ex: Analise minha eficiência na documentação e sugira melhorias...", height=100, key="pergunta_ia")
-    
-    if st.button("🔍 Analisar com IA", type="primary", key="btn_analisar_ia"):
-        if pergunta.strip():
-            with st.spinner("🤖 Analisando dados e gerando insights..."):
-                try:
-                    gemini_key = st.secrets['gemini']['api_key']
-                except:
-                    gemini_key = None
-                    st.warning("⚠️ Chave Gemini não encontrada nos secrets")
-                
-                resposta = consultar_assistente_po(pergunta=pergunta, dados_disponiveis=dados_disponiveis, gemini_key=gemini_key)
-                
-            st.markdown("---")
-            st.markdown("### 📊 Resposta da Análise")
-            st.markdown(resposta)
-        else:
-            st.warning("⚠️ Por favor, digite uma pergunta para análise.")
+    tipo_modelo = st.selectbox("Modelo", list(MODELOS), key="modelo_ia", help="O modelo local responde offline, sem IA generativa")
+    modo = st.radio(
+        "Modo", ["Pergunta única", "Conversa"], horizontal=True, key="modo_ia",
+        help="Na conversa, os dados vão ao modelo uma vez e as perguntas seguintes enviam só o histórico e a pergunta nova"
+    )
+    
+    if modo == "Conversa":
+        painel_conversa(dados_disponiveis, tipo_modelo)
+    else:
+        pergunta = st.text_area("Sua pergunta:", placeholder="Ex: Analise minha eficiência na documentação e sugira melhorias...", height=100, key="pergunta_ia")
+        
+        if st.button("🔍 Analisar com IA", type="primary", key="btn_analisar_ia"):
+            if pergunta.strip():
+                with st.spinner("🤖 Analisando dados e gerando insights..."):
+                    resposta = consultar_assistente(pergunta, dados_disponiveis, tipo_modelo)
+                    
+                st.markdown("---")
+                st.markdown("### 📊 Resposta da Análise")
+                st.markdown(resposta)
+            else:
+                st.warning("⚠️ Por favor, digite uma pergunta para análise.")
 
     st.markdown("---")
     st.subheader("📈 Dados Disponíveis para Análise")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1: st.metric("Melhorias", len(dados_disponiveis['melhorias']))
     with col2: st.metric("Cerimônias", len(dados_disponiveis['cerimonias']))
     with col3: st.metric("Documentos", len(dados_disponiveis['documentos']))
+    with col4: st.metric("Avaliações de Demandas", len(dados_disponiveis['demandas']))
+
+# ==================== PÁGINA ADMINISTRAÇÃO ====================
+def rotulos_latencia():
+    return [f"≤{limite} ms" for limite in LIMITES_LATENCIA_MS] + [f">{LIMITES_LATENCIA_MS[-1]} ms"]
+
+PERIODOS_TELEMETRIA = {"Últimas 24 horas": 1, "Últimos 7 dias": 7, "Últimos 30 dias": 30, "Tudo": None}
+
+def pagina_administracao():
+    st.header("🛠️ Administração")
+    
+    tab1, tab2, tab3 = st.tabs(["📗 Google Sheets", "🗂️ Espaços e Cache", "🤖 Assistente IA"])
+    with tab1:
+        painel_sheets()
+    with tab2:
+        painel_espacos()
+    with tab3:
+        painel_telemetria_llm()
+
+def painel_espacos():
+    """Memória, acertos, remoções, cargas compartilhadas e versões em uso do armazém e cota de cada espaço (planilha)"""
+    cache = obter_cache_espacos().metricas()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Memória em Cache", f"{cache['total_mb']:.1f} MB", help=f"Limite total: {cache['limite_mb']:.0f} MB")
+    col2.metric("Limite por Espaço", f"{cache['limite_espaco_mb']:.0f} MB")
+    col3.metric("Espaços Configurados", len(planilhas_configuradas()))
+    
+    linhas = []
+    for espaco in planilhas_configuradas():
+        estatisticas = cache['espacos'].get(espaco, {})
+        consultas = estatisticas.get('acertos', 0) + estatisticas.get('faltas', 0)
+        cota = obter_cliente_planilhas(espaco).metricas()
+        linhas.append({
+            'espaço': espaco,
+            'abas em cache': estatisticas.get('entradas', 0),
+            'memória (MB)': round(estatisticas.get('mb', 0.0), 1),
+            'taxa de acerto': f"{estatisticas.get('acertos', 0) / consultas * 100:.0f}%" if consultas else "-",
+            'remoções (LRU)': estatisticas.get('remocoes', 0),
+            'expiradas': estatisticas.get('expiradas', 0),
+            'vencidas servidas': estatisticas.get('vencidas_servidas', 0),
+            'esperas': estatisticas.get('esperas', 0),
+            'versões em uso': estatisticas.get('versoes_em_uso', 0),
+            'retidas': estatisticas.get('retidas', 0),
+            'req. último minuto': f"{cota['requisicoes_ultimo_minuto']}/{cota['cota_por_minuto']}",
+            'erros 429': cota['totais']['erros_429']
+        })
+    st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+
+def painel_sheets():
+    """Cota, latência e erros das chamadas ao Google Sheets do espaço atual neste processo"""
+    espaco = espaco_atual()
+    if len(planilhas_configuradas()) > 1:
+        st.caption(f"🗂️ Planilha: **{espaco}**")
+    metricas = obter_cliente_planilhas(espaco).metricas()
+    totais = metricas['totais']
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Requisições no Último Minuto", f"{metricas['requisicoes_ultimo_minuto']}/{metricas['cota_por_minuto']}")
+    col2.metric("Total de Requisições", totais['requisicoes'])
+    col3.metric("Novas Tentativas", totais['tentativas_repetidas'])
+    col4.metric("Erros 429", totais['erros_429'])
+    col5.metric("Snapshots Servidos", totais['snapshots_servidos'])
+    
+    if metricas['pausado_por_s'] > 0:
+        st.warning(f"⏳ Chamadas pausadas por mais {metricas['pausado_por_s']:.1f}s após um 429")
+    if totais['respostas_lentas']:
+        st.info(f"🐢 {totais['respostas_lentas']} resposta(s) acima de 5 s desde o início do processo")
+    
+    operacoes = metricas['operacoes']
+    if not operacoes:
+        st.info("📭 Nenhuma chamada ao Google Sheets registrada neste processo ainda")
+        return
+    
+    st.subheader("⏱️ Latência por Operação")
+    st.dataframe(pd.DataFrame([
+        {'operação': nome, 'chamadas': e['chamadas'], 'erros': e['erros'],
+         'p50 (ms)': round(e['p50_ms'], 1), 'p95 (ms)': round(e['p95_ms'], 1), 'máx (ms)': round(e['max_ms'], 1)}
+        for nome, e in operacoes.items()
+    ]), hide_index=True, use_container_width=True)
+    
+    operacao = st.selectbox("Histograma da operação", ["Todas"] + list(operacoes), key="admin_operacao")
+    if operacao == "Todas":
+        histograma = [sum(valores) for valores in zip(*(e['histograma'] for e in operacoes.values()))]
+    else:
+        histograma = operacoes[operacao]['histograma']
+    mostrar_grafico(figura_barras(rotulos_latencia(), histograma, f"Distribuição de Latência - {operacao}", "Faixa", "Chamadas"))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("💾 Última Leitura Boa por Aba")
+        if metricas['leituras']:
+            st.dataframe(pd.DataFrame(
+                [{'aba': aba, 'lido em': quando.strftime('%d/%m/%Y %H:%M:%S')} for aba, quando in metricas['leituras'].items()]
+            ), hide_index=True, use_container_width=True)
+        else:
+            st.info("Nenhuma leitura boa ainda")
+    with col2:
+        st.subheader("📜 Eventos Recentes")
+        if metricas['eventos']:
+            st.dataframe(pd.DataFrame(metricas['eventos'][::-1]), hide_index=True, use_container_width=True)
+        else:
+            st.info("✅ Nenhum erro ou nova tentativa registrada")
+
+def painel_telemetria_llm():
+    """Latência, tokens, custo, cache e fallback das consultas ao assistente"""
+    periodo = st.selectbox("Período", list(PERIODOS_TELEMETRIA), key="admin_periodo_llm")
+    dias = PERIODOS_TELEMETRIA[periodo]
+    chamadas = carregar_chamadas(desde=datetime.now() - timedelta(days=dias) if dias else None)
+    
+    if chamadas.empty:
+        st.info("📭 Nenhuma consulta ao assistente registrada no período")
+        return
+    
+    respondidas = chamadas[~chamadas['fallback']]
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("Consultas", len(chamadas))
+    col2.metric("Latência p50", f"{respondidas['latencia_llm_ms'].quantile(0.5) / 1000:.1f}s" if len(respondidas) else "-")
+    col3.metric("Latência p95", f"{respondidas['latencia_llm_ms'].quantile(0.95) / 1000:.1f}s" if len(respondidas) else "-")
+    col4.metric("Custo Estimado", f"US$ {chamadas['custo_usd'].sum():.4f}")
+    col5.metric("Taxa de Cache", f"{respondidas['cache_hit'].mean() * 100:.0f}%" if len(respondidas) else "-")
+    col6.metric("Taxa de Fallback", f"{chamadas['fallback'].mean() * 100:.0f}%")
+    
+    st.subheader("🤖 Por Modelo")
+    st.dataframe(resumo_por_modelo(chamadas).round(
+        {'p50_ms': 0, 'p95_ms': 0, 'p95_total_ms': 0, 'tokens_prompt_medio': 0, 'tokens_resposta_medio': 0,
+         'custo_total_usd': 4, 'custo_medio_usd': 5, 'taxa_cache': 1, 'taxa_fallback': 1}
+    ), hide_index=True, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        mostrar_grafico(figura_linhas(
+            respondidas['momento'],
+            {'Gemini': respondidas['latencia_llm_ms'], 'Total': respondidas['latencia_total_ms']},
+            "Latência por Consulta", "ms"
+        ))
+    with col2:
+        mostrar_grafico(figura_linhas(
+            respondidas['momento'],
+            {'Prompt': respondidas['tokens_prompt'], 'Resposta': respondidas['tokens_resposta']},
+            "Tokens por Consulta", "tokens"
+        ))
+    
+    motivos = chamadas.loc[chamadas['fallback'], 'motivo_fallback'].value_counts()
+    if not motivos.empty:
+        mostrar_grafico(figura_barras(motivos.index, motivos.values, "Motivos de Fallback", "Motivo", "Consultas"))
+    
+    st.subheader("📜 Últimas Consultas")
+    st.dataframe(chamadas.tail(20).iloc[::-1], hide_index=True, use_container_width=True)
 
 def obter_data_mais_antiga():
     """Verifica em todos os dataframes qual é a data mais antiga registrada"""
@@ -578,6 +1308,11 @@ def obter_data_mais_antiga():
     if not df.empty and 'data' in df.columns:
         min_val = df['data'].min()
         if pd.notnull(min_val): datas_minimas.append(min_val)
+    
+    df = carregar_demandas()
+    if not df.empty and 'data_avaliacao' in df.columns:
+        min_val = df['data_avaliacao'].min()
+        if pd.notnull(min_val): datas_minimas.append(min_val)
             
     if datas_minimas:
         return min(datas_minimas)
@@ -585,6 +1320,16 @@ def obter_data_mais_antiga():
 
 # ==================== MENU PRINCIPAL ====================
 def main():
+    trace = iniciar_trace("rerun")
+    try:
+        # As versões lidas neste rerun ficam em uso (não saem do armazém) até ele terminar
+        with obter_cache_espacos().leitura():
+            executar_app()
+        painel_tempos(trace)
+    finally:
+        exportar_trace(trace)
+
+def executar_app():
     if 'data_inicio' not in st.session_state:
         st.session_state.data_inicio = datetime.now() - timedelta(days=30)
     if 'data_fim' not in st.session_state:
@@ -593,6 +1338,10 @@ def main():
     create_sidebar()
     
     st.title("📊 Sistema PO - Indicadores Estratégicos")
+    
+    busca = st.session_state.get('busca_global', '').strip()
+    if busca:
+        painel_busca_global(busca)
 
     data_inicio, data_fim = criar_filtros_sidebar()
            
@@ -602,9 +1351,11 @@ def main():
     if data_antiga:
         st.sidebar.success(f"📅 **Registros a partir de:**\n{data_antiga.strftime('%d/%m/%Y')}")
 
+    painel_alertas()
+
     menu = st.sidebar.selectbox(
         "Navegação",
-        ["💡 Melhorias", "📅 Cerimônias", "📋 Documentos", "🤖 Assistente IA"],
+        ["💡 Melhorias", "📅 Cerimônias", "📋 Documentos", "🎯 Demandas", "📈 Tendências", "🏢 Comparativo", "🤖 Assistente IA", "🛠️ Administração"],
         key="menu_principal"
     )
     
@@ -614,8 +1365,16 @@ def main():
         pagina_cerimonias(data_inicio, data_fim)
     elif menu == "📋 Documentos":
         pagina_documentos(data_inicio, data_fim)
+    elif menu == "🎯 Demandas":
+        pagina_demandas(data_inicio, data_fim)
+    elif menu == "📈 Tendências":
+        pagina_tendencias(data_inicio, data_fim)
+    elif menu == "🏢 Comparativo":
+        pagina_comparativo(data_inicio, data_fim)
     elif menu == "🤖 Assistente IA":
         pagina_ia_assistente(data_inicio, data_fim)
+    elif menu == "🛠️ Administração":
+        pagina_administracao()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,112 +1,163 @@
-import google.generativeai as genai
 import pandas as pd
 from datetime import datetime
 import numpy as np
 import os
-import streamlit as st
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
+from datas import converter_datas
+from tendencias import DIAS_SEMANA, agregados_diarios, agregar_demandas_por_dia, serie_priorizacao
+from produtividade import analisar_produtividade
+from rastreamento import span, rastrear, executar_no_contexto
+from telemetria_llm import registrar_chamada, estimar_custo
+from busca_texto import tokenizar, registros_relevantes, formatar_registros, sincronizar_frames
+from provedores_llm import MODELOS, PROVEDORES, resolver_modelo, obter_provedor
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
-def consultar_assistente_po(pergunta, dados_disponiveis, tipo_modelo="Gemini Pro", gemini_key=None):
+# ==================== PROMPT ====================
+# Partes fixas do prompt, comuns à pergunta única e ao contexto das conversas (conversa_po)
+PAPEL_PO = "VOCÊ: Especialista em Product Ownership, Agile methodologies e análise de performance de PO"
+
+CONTEXTO_AREAS_PO = """CONTEXTO DAS ÁREAS DE DADOS:
+- MELHORIAS: melhoria_id, data_proposta, melhoria_proposta, descricao_detalhada, beneficio_esperado, melhoria_aplicada, data_aplicacao, status, impacto
+- CERIMÔNIAS: data, tipo, nome, presente, duracao_minutos, participantes, objetivo, decisoes_acoes, resultado
+- DEMANDAS: data_avaliacao, periodo, total_historias, historias_prioridade_definida, historias_criterio_aceite, status, observacoes
+- DOCUMENTOS: data, tipo_documento, nome_documento, tempo_minutos, critérios_aceite, template_padronizado, status, observacoes
+"""
+
+INSTRUCOES_PO = """NOVAS INSTRUÇÕES ESPECÍFICAS:
+- Para perguntas sobre "dia mais produtivo", analise: documentos produzidos, tempo gasto, cerimônias participadas, melhorias propostas
+- Calcule eficiência: documentos por hora, tempo médio por documento, taxa de conclusão
+- Identifique padrões: dias da semana mais produtivos, relação entre tempo gasto e qualidade
+- Analise qualidade: critérios de aceite, uso de templates, resultados das cerimônias
+- Compare performance entre diferentes tipos de atividades
+- Dê respostas específicas com datas, números concretos e métricas calculadas
+- Sugira melhorias baseadas em padrões identificados nos dados
+- Use os registros relevantes para citar exemplos concretos (decisões, resultados, observações)
+"""
+
+FORMATO_RESPOSTA_PO = """FORMATO DA RESPOSTA:
+## 🎯 Resposta Direta
+[Responda diretamente à pergunta com dados específicos]
+
+## 📊 Análise Detalhada
+[Métricas calculadas, datas específicas, comparações]
+
+## 🔍 Insights Identificados
+[Padrões, correlações, comportamentos observados]
+
+## 💡 Recomendações Práticas
+[Sugestões baseadas nos dados para melhorar performance]
+"""
+
+def mensagem_pergunta(pergunta, registros_texto):
+    """Parte do prompt que muda a cada pergunta: registros relevantes e a própria pergunta"""
+    return (
+        "REGISTROS MAIS RELEVANTES PARA A PERGUNTA (busca nos textos livres):\n"
+        f"{registros_texto or 'Nenhum registro com texto relacionado à pergunta'}\n\n"
+        f"PERGUNTA DO USUÁRIO: {pergunta}"
+    )
+
+# ==================== CONSULTA ====================
+def consultar_assistente_po(pergunta, dados_disponiveis, tipo_modelo="Gemini Pro", gemini_key=None, avisar=print):
     """
     Função principal do assistente para análise de dados de Product Owner.
+    
+    Não depende do Streamlit: a interface passa a chave (ver assistente_streamlit)
+    e a função `avisar` que exibe os avisos; fora dela os avisos vão para o console.
     """
+    inicio = time.perf_counter()
+    # Modelo definido logo no início para a telemetria registrar também os fallbacks
+    provedor_nome, modelo = resolver_modelo(tipo_modelo)
     
     # 🆕 BUSCA SEGURA DA CHAVE - ORDEM DE PRIORIDADE:
-    # 1. Parâmetro da função (gemini_key)
+    # 1. Parâmetro da função (gemini_key; no app, vem dos secrets do Streamlit)
     # 2. Variável de ambiente (.env)
-    # 3. Secrets do Streamlit (se disponível)
     
     if not gemini_key:
         gemini_key = os.getenv('GEMINI_API_KEY')
     
-    # Se ainda não encontrou e está no Streamlit, tenta secrets
-    if not gemini_key and hasattr(st, 'secrets'):
-        try:
-            gemini_key = st.secrets.get('GEMINI_API_KEY')
-        except:
-            pass
-    
-    # 1. VERIFICAÇÃO CRÍTICA DA CHAVE
-    if not gemini_key:
+    # 1. VERIFICAÇÃO CRÍTICA DA CHAVE (o provedor local não precisa de chave)
+    if not gemini_key and PROVEDORES[provedor_nome].requer_chave:
         error_msg = "❌ Chave da API Gemini não encontrada. Verifique seu arquivo .env ou configurações."
         print(error_msg)
-        st.warning("Modo fallback ativado - usando análise local sem IA")
-        return analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        avisar("Modo fallback ativado - usando análise local sem IA")
+        resposta = analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, fallback=True, motivo_fallback="sem chave",
+            latencia_total_ms=(time.perf_counter() - inicio) * 1000
+        )
+        return resposta
     
-    # 2. CONFIGURAÇÃO E EXECUÇÃO DA IA
+    # 2. EXECUÇÃO DA IA
     try:
-        genai.configure(api_key=gemini_key)
-        
         # 3. VERIFICAÇÃO DOS DADOS
         if not dados_disponiveis or all(df.empty for df in dados_disponiveis.values()):
             return "❌ Não há dados disponíveis para análise com os filtros atuais."
         
-        print(f"🔍 Consultando Gemini para análise de PO: {pergunta}")
-        
-        # 4. Escolher modelo - VERSÕES CORRETAS
-        if "Pro" in tipo_modelo:
-            modelo_gemini = "gemini-2.5-pro"
-        else:
-            modelo_gemini = "gemini-2.0-flash" 
+        print(f"🔍 Consultando {provedor_nome} para análise de PO ({modelo}): {pergunta}")
 
-        # 5. Criar relatório COMPLETO específico para PO
-        relatorio_completo = criar_relatorio_po_completo(dados_disponiveis, pergunta)
+        # 4. Seções do relatório disparadas em paralelo; a busca e o provedor andam enquanto elas calculam
+        montar_relatorio = iniciar_relatorio_po(dados_disponiveis, pergunta)
 
-        # 6. Configurar e chamar o modelo
-        model = genai.GenerativeModel(modelo_gemini)
+        # 5. Registros cujos textos livres mais se relacionam com a pergunta (BM25, top-k)
+        with span("busca.registros_relevantes") as atributos:
+            encontrados = registros_relevantes(pergunta, dados_disponiveis)
+            registros_texto = formatar_registros(encontrados, dados_disponiveis)
+            atributos['registros'] = len(encontrados)
 
-        # 7. Prompt ESPECIALIZADO EM ANÁLISE DE PO
-        prompt = f"""
-        VOCÊ: Especialista em Product Ownership, Agile methodologies e análise de performance de PO
+        # 6. Cliente de longa duração: configurado só na primeira pergunta do processo
+        with span("llm.obter_provedor", provedor=provedor_nome, modelo=modelo):
+            provedor = obter_provedor(provedor_nome, modelo, gemini_key if PROVEDORES[provedor_nome].requer_chave else None)
 
-        DADOS COMPLETOS DISPONÍVEIS:
-        {relatorio_completo}
+        with span("relatorio.aguardar_secoes"):
+            relatorio_completo = montar_relatorio()
 
-        PERGUNTA DO USUÁRIO: {pergunta}
-
-        CONTEXTO DAS ÁREAS DE DADOS:
-        - MELHORIAS: melhoria_id, data_proposta, melhoria_proposta, descricao_detalhada, beneficio_esperado, melhoria_aplicada, data_aplicacao, status, impacto
-        - CERIMÔNIAS: data, tipo, nome, presente, duracao_minutos, participantes, objetivo, decisoes_acoes, resultado
-        - DEMANDAS: data_avaliacao, periodo, total_historias, historias_prioridade_definida, historias_criterio_aceite, status, observacoes
-        - DOCUMENTOS: data, tipo_documento, nome_documento, tempo_minutos, critérios_aceite, template_padronizado, status, observacoes
-
-        NOVAS INSTRUÇÕES ESPECÍFICAS:
-        - Para perguntas sobre "dia mais produtivo", analise: documentos produzidos, tempo gasto, cerimônias participadas, melhorias propostas
-        - Calcule eficiência: documentos por hora, tempo médio por documento, taxa de conclusão
-        - Identifique padrões: dias da semana mais produtivos, relação entre tempo gasto e qualidade
-        - Analise qualidade: critérios de aceite, uso de templates, resultados das cerimônias
-        - Compare performance entre diferentes tipos de atividades
-        - Dê respostas específicas com datas, números concretos e métricas calculadas
-        - Sugira melhorias baseadas em padrões identificados nos dados
-
-        FORMATO DA RESPOSTA:
-        ## 🎯 Resposta Direta
-        [Responda diretamente à pergunta com dados específicos]
-
-        ## 📊 Análise Detalhada
-        [Métricas calculadas, datas específicas, comparações]
+        # 7. Prompt ESPECIALIZADO EM ANÁLISE DE PO
+        prompt = f"""
+{PAPEL_PO}
 
-        ## 🔍 Insights Identificados
-        [Padrões, correlações, comportamentos observados]
+DADOS COMPLETOS DISPONÍVEIS:
+{relatorio_completo}
 
-        ## 💡 Recomendações Práticas
-        [Sugestões baseadas nos dados para melhorar performance]
+{mensagem_pergunta(pergunta, registros_texto)}
 
-        RESPOSTA:
-        """
-        
-        # ✅ AQUI ENTRA O PEDAÇO QUE VOCÊ PERGUNTOU:
-        # Resto da sua lógica de chamada à API...
-        response = model.generate_content(prompt)
-        return response.text
+{CONTEXTO_AREAS_PO}
+{INSTRUCOES_PO}
+{FORMATO_RESPOSTA_PO}
+RESPOSTA:
+"""
+        
+        bytes_prompt = len(prompt.encode('utf-8'))
+        with span("llm.generate_content", modelo=modelo, bytes_prompt=bytes_prompt) as atributos:
+            inicio_llm = time.perf_counter()
+            resposta = provedor.gerar(prompt)
+            latencia_llm_ms = (time.perf_counter() - inicio_llm) * 1000
+            atributos['bytes_resposta'] = len(resposta.texto.encode('utf-8'))
+        
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, bytes_prompt=bytes_prompt,
+            latencia_llm_ms=latencia_llm_ms, latencia_total_ms=(time.perf_counter() - inicio) * 1000,
+            tokens_prompt=resposta.tokens_prompt, tokens_resposta=resposta.tokens_resposta, tokens_cache=resposta.tokens_cache,
+            custo_usd=estimar_custo(modelo, resposta.tokens_prompt, resposta.tokens_resposta, resposta.tokens_cache),
+            cache_hit=resposta.tokens_cache > 0
+        )
+        return resposta.texto
         
     except Exception as e:
         error_msg = f"❌ Erro na consulta à IA: {str(e)}"
         print(error_msg)
-        return analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        resposta = analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, fallback=True, motivo_fallback=type(e).__name__,
+            latencia_total_ms=(time.perf_counter() - inicio) * 1000
+        )
+        return resposta
 
 # ✅ FORA DA FUNÇÃO PRINCIPAL - TESTE TEMPORÁRIO
 # Teste temporário - depois remova
@@ -120,340 +171,524 @@ def testar_chave():
         print("❌ Chave NÃO encontrada no .env")
         return False
 
-# Execute este teste uma vez
-testar_chave()
-
-def criar_relatorio_po_completo(dados_disponiveis, pergunta):
+@rastrear("relatorio")
+def criar_relatorio_po_completo(dados_disponiveis, pergunta, pesos_produtividade=None):
     """Cria relatório MEGA COMPLETO para análise de Product Ownership"""
+    return iniciar_relatorio_po(dados_disponiveis, pergunta, pesos_produtividade)()
+
+def _dias(serie):
+    """Dia (datetime64 à meia-noite) de cada registro; NaT fica fora dos groupbys"""
+    return converter_datas(serie).dt.normalize()
+
+def _produtividade_cerimonias(dados_disponiveis):
+    """Dias com mais cerimônias e com mais tempo em reuniões"""
+    relatorio = ""
+    if 'cerimonias' in dados_disponiveis and not dados_disponiveis['cerimonias'].empty:
+        df_cerimonias = dados_disponiveis['cerimonias']
+        if 'data' in df_cerimonias.columns:
+            try:
+                dias = _dias(df_cerimonias['data'])
+                if dias.notna().any():
+                    # Dias com mais cerimônias
+                    cerimonias_por_dia = df_cerimonias.groupby(dias).size()
+                    if len(cerimonias_por_dia) > 0:
+                        dia_mais_cerimonias = cerimonias_por_dia.idxmax().date()
+                        qtd_mais_cerimonias = cerimonias_por_dia.max()
+                        relatorio += f"• Dia com mais cerimônias: {dia_mais_cerimonias} ({qtd_mais_cerimonias} cerimônias)\n"
+
+                    # Tempo total por dia
+                    if 'duracao_minutos' in df_cerimonias.columns:
+                        tempo_por_dia = df_cerimonias['duracao_minutos'].groupby(dias).sum()
+                        if len(tempo_por_dia) > 0:
+                            dia_mais_tempo = tempo_por_dia.idxmax().date()
+                            tempo_max = tempo_por_dia.max()
+                            relatorio += f"• Dia com mais tempo em reuniões: {dia_mais_tempo} ({tempo_max}min = {tempo_max/60:.1f}h)\n"
+            except Exception as e:
+                relatorio += f"• Erro na análise de cerimônias: {str(e)}\n"
+    return relatorio
+
+def _produtividade_documentos(dados_disponiveis):
+    """Dias com mais documentos, mais tempo em documentação e maior eficiência"""
+    relatorio = ""
+    if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
+        df_documentos = dados_disponiveis['documentos']
+        if 'data' in df_documentos.columns:
+            try:
+                dias = _dias(df_documentos['data'])
+                if dias.notna().any():
+                    # Dias com mais documentos
+                    documentos_por_dia = df_documentos.groupby(dias).size()
+                    if len(documentos_por_dia) > 0:
+                        dia_mais_documentos = documentos_por_dia.idxmax().date()
+                        qtd_mais_documentos = documentos_por_dia.max()
+                        relatorio += f"• Dia com mais documentos: {dia_mais_documentos} ({qtd_mais_documentos} documentos)\n"
+
+                    # Tempo de documentação por dia
+                    if 'tempo_minutos' in df_documentos.columns:
+                        tempo_doc_por_dia = df_documentos['tempo_minutos'].groupby(dias).sum()
+                        if len(tempo_doc_por_dia) > 0:
+                            dia_mais_tempo_doc = tempo_doc_por_dia.idxmax().date()
+                            tempo_doc_max = tempo_doc_por_dia.max()
+                            relatorio += f"• Dia com mais tempo em documentação: {dia_mais_tempo_doc} ({tempo_doc_max}min = {tempo_doc_max/60:.1f}h)\n"
+
+                            # Calcular produtividade por dia (documentos + tempo)
+                            produtividade_por_dia = df_documentos.groupby(dias).agg({
+                                'tempo_minutos': 'sum',
+                                'nome_documento': 'count'
+                            })
+                            produtividade_por_dia['eficiencia'] = produtividade_por_dia['nome_documento'] / (produtividade_por_dia['tempo_minutos'] / 60)  # docs por hora
+
+                            dia_mais_eficiente = produtividade_por_dia['eficiencia'].idxmax().date()
+                            eficiencia_max = produtividade_por_dia['eficiencia'].max()
+                            relatorio += f"• Dia mais eficiente em documentação: {dia_mais_eficiente} ({eficiencia_max:.1f} docs/hora)\n"
+            except Exception as e:
+                relatorio += f"• Erro na análise de documentos: {str(e)}\n"
+    return relatorio
+
+def _produtividade_melhorias(dados_disponiveis):
+    """Dia com mais melhorias propostas"""
+    relatorio = ""
+    if 'melhorias' in dados_disponiveis and not dados_disponiveis['melhorias'].empty:
+        df_melhorias = dados_disponiveis['melhorias']
+        if 'data_proposta' in df_melhorias.columns:
+            try:
+                dias = _dias(df_melhorias['data_proposta'])
+                if dias.notna().any():
+                    melhorias_por_dia = df_melhorias.groupby(dias).size()
+                    if len(melhorias_por_dia) > 0:
+                        dia_mais_melhorias = melhorias_por_dia.idxmax().date()
+                        qtd_mais_melhorias = melhorias_por_dia.max()
+                        relatorio += f"• Dia com mais melhorias propostas: {dia_mais_melhorias} ({qtd_mais_melhorias} melhorias)\n"
+            except Exception as e:
+                relatorio += f"• Erro na análise de melhorias: {str(e)}\n"
+    return relatorio
+
+def _produtividade_geral(dados_disponiveis, pesos_produtividade=None):
+    """🆕 DIA MAIS PRODUTIVO GERAL (pontuação de todos os dias) e média por dia da semana"""
+    relatorio = ""
+    try:
+        produtividade = analisar_produtividade(agregados_diarios(dados_disponiveis), pesos_produtividade)
+        top = produtividade['top']
+        if not top.empty:
+            dia_mais_produtivo = top.index[0]
+            melhor = top.iloc[0]
+            relatorio += (
+                f"🎯 DIA MAIS PRODUTIVO GERAL: {dia_mais_produtivo.date()} (score: {melhor['pontuacao']:.1f} = "
+                f"{melhor['documentos']:.0f} documentos, {melhor['minutos']:.0f} min trabalhados, "
+                f"{melhor['cerimonias']:.0f} cerimônias com presença, {melhor['melhorias']:.0f} melhorias)\n"
+            )
+            relatorio += "• Top dias mais produtivos:\n"
+            for dia, linha in top.iterrows():
+                relatorio += f"  - {dia.date()} ({DIAS_SEMANA[dia.dayofweek]}): score {linha['pontuacao']:.1f}\n"
+
+            relatorio += "• Produtividade média por dia da semana:\n"
+            for dia_semana, linha in produtividade['dia_semana'].dropna(subset=['media']).iterrows():
+                relatorio += f"  - {dia_semana}: score médio {linha['media']:.1f} ({linha['dias_ativos']:.0f} dias ativos)\n"
+    except Exception as e:
+        relatorio += f"• Erro no cálculo do dia mais produtivo: {str(e)}\n"
+    return relatorio
+
+def _partes_produtividade(dados_disponiveis, pesos_produtividade=None):
+    """Partes independentes da seção de produtividade, na ordem de exibição"""
+    return [
+        ('cerimonias', partial(_produtividade_cerimonias, dados_disponiveis)),
+        ('documentos', partial(_produtividade_documentos, dados_disponiveis)),
+        ('melhorias', partial(_produtividade_melhorias, dados_disponiveis)),
+        ('geral', partial(_produtividade_geral, dados_disponiveis, pesos_produtividade))
+    ]
+
+def _secao_produtividade(dados_disponiveis, pesos_produtividade=None):
+    """Análise diária: destaques por categoria e ranking de dias pelo motor de pontuação"""
+    partes = _partes_produtividade(dados_disponiveis, pesos_produtividade)
+    return "📅 ANÁLISE DIÁRIA DETALHADA (Produtividade):\n" + "".join(parte() for _, parte in partes) + "\n"
+
+def _secao_qualidade(dados_disponiveis):
+    """Critérios de aceite e templates, no geral e por tipo de documento"""
+    relatorio = "🎯 ANÁLISE DE QUALIDADE:\n"
+
+    if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
+        df_docs = dados_disponiveis['documentos']
+        if 'critérios_aceite' in df_docs.columns and 'template_padronizado' in df_docs.columns:
+            com_criterios = (df_docs['critérios_aceite'] == 'SIM').sum()
+            com_template = (df_docs['template_padronizado'] == 'SIM').sum()
+            total_docs = len(df_docs)
+
+            relatorio += f"• Documentos com critérios de aceite: {com_criterios}/{total_docs} ({com_criterios/total_docs*100:.1f}%)\n"
+            relatorio += f"• Documentos com template padronizado: {com_template}/{total_docs} ({com_template/total_docs*100:.1f}%)\n"
+
+            # Qualidade por tipo de documento
+            if 'tipo_documento' in df_docs.columns:
+                qualidade_por_tipo = df_docs.groupby('tipo_documento').agg({
+                    'critérios_aceite': lambda x: (x == 'SIM').sum(),
+                    'template_padronizado': lambda x: (x == 'SIM').sum(),
+                    'nome_documento': 'count'
+                })
+                relatorio += "• Qualidade por tipo de documento:\n"
+                for tipo in qualidade_por_tipo.index:
+                    total = qualidade_por_tipo.loc[tipo, 'nome_documento']
+                    criterios = qualidade_por_tipo.loc[tipo, 'critérios_aceite']
+                    templates = qualidade_por_tipo.loc[tipo, 'template_padronizado']
+                    relatorio += f"  - {tipo}: {criterios}/{total} critérios, {templates}/{total} templates\n"
+
+    relatorio += "\n"
     
-    relatorio = "=== ANÁLISE COMPLETA DE DADOS DE PRODUCT OWNERSHIP ===\n\n"
-    pergunta_lower = pergunta.lower()
-    
-    # 🆕 ANÁLISE DIÁRIA DETALHADA PARA PERGUNTAS SOBRE PRODUTIVIDADE
-    if any(palavra in pergunta_lower for palavra in ['dia', 'diário', 'produtividade', 'produtivo', 'produziu', 'melhor dia']):
-        relatorio += "📅 ANÁLISE DIÁRIA DETALHADA (Produtividade):\n"
-        
-        dias_analisados = {}
-        
-        # Analisar produtividade por dia em CERIMÔNIAS
-        if 'cerimonias' in dados_disponiveis and not dados_disponiveis['cerimonias'].empty:
-            df_cerimonias = dados_disponiveis['cerimonias'].copy()
-            if 'data' in df_cerimonias.columns:
-                try:
-                    df_cerimonias['data'] = pd.to_datetime(df_cerimonias['data'], errors='coerce')
-                    df_cerimonias = df_cerimonias.dropna(subset=['data'])
-                    
-                    if not df_cerimonias.empty:
-                        # Dias com mais cerimônias
-                        cerimonias_por_dia = df_cerimonias.groupby(df_cerimonias['data'].dt.date).size()
-                        if len(cerimonias_por_dia) > 0:
-                            dia_mais_cerimonias = cerimonias_por_dia.idxmax()
-                            qtd_mais_cerimonias = cerimonias_por_dia.max()
-                            relatorio += f"• Dia com mais cerimônias: {dia_mais_cerimonias} ({qtd_mais_cerimonias} cerimônias)\n"
-                            dias_analisados[dia_mais_cerimonias] = dias_analisados.get(dia_mais_cerimonias, 0) + qtd_mais_cerimonias
-                        
-                        # Tempo total por dia
-                        if 'duracao_minutos' in df_cerimonias.columns:
-                            tempo_por_dia = df_cerimonias.groupby(df_cerimonias['data'].dt.date)['duracao_minutos'].sum()
-                            if len(tempo_por_dia) > 0:
-                                dia_mais_tempo = tempo_por_dia.idxmax()
-                                tempo_max = tempo_por_dia.max()
-                                relatorio += f"• Dia com mais tempo em reuniões: {dia_mais_tempo} ({tempo_max}min = {tempo_max/60:.1f}h)\n"
-                except Exception as e:
-                    relatorio += f"• Erro na análise de cerimônias: {str(e)}\n"
-        
-        # Analisar produtividade por dia em DOCUMENTOS
-        if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
-            df_documentos = dados_disponiveis['documentos'].copy()
-            if 'data' in df_documentos.columns:
-                try:
-                    df_documentos['data'] = pd.to_datetime(df_documentos['data'], errors='coerce')
-                    df_documentos = df_documentos.dropna(subset=['data'])
-                    
-                    if not df_documentos.empty:
-                        # Dias com mais documentos
-                        documentos_por_dia = df_documentos.groupby(df_documentos['data'].dt.date).size()
-                        if len(documentos_por_dia) > 0:
-                            dia_mais_documentos = documentos_por_dia.idxmax()
-                            qtd_mais_documentos = documentos_por_dia.max()
-                            relatorio += f"• Dia com mais documentos: {dia_mais_documentos} ({qtd_mais_documentos} documentos)\n"
-                            dias_analisados[dia_mais_documentos] = dias_analisados.get(dia_mais_documentos, 0) + qtd_mais_documentos * 2  # Peso maior para documentos
-                        
-                        # Tempo de documentação por dia
-                        if 'tempo_minutos' in df_documentos.columns:
-                            tempo_doc_por_dia = df_documentos.groupby(df_documentos['data'].dt.date)['tempo_minutos'].sum()
-                            if len(tempo_doc_por_dia) > 0:
-                                dia_mais_tempo_doc = tempo_doc_por_dia.idxmax()
-                                tempo_doc_max = tempo_doc_por_dia.max()
-                                relatorio += f"• Dia com mais tempo em documentação: {dia_mais_tempo_doc} ({tempo_doc_max}min = {tempo_doc_max/60:.1f}h)\n"
-                                
-                                # Calcular produtividade por dia (documentos + tempo)
-                                produtividade_por_dia = df_documentos.groupby(df_documentos['data'].dt.date).agg({
-                                    'tempo_minutos': 'sum',
-                                    'nome_documento': 'count'
-                                })
-                                produtividade_por_dia['eficiencia'] = produtividade_por_dia['nome_documento'] / (produtividade_por_dia['tempo_minutos'] / 60)  # docs por hora
-                                
-                                dia_mais_eficiente = produtividade_por_dia['eficiencia'].idxmax()
-                                eficiencia_max = produtividade_por_dia['eficiencia'].max()
-                                relatorio += f"• Dia mais eficiente em documentação: {dia_mais_eficiente} ({eficiencia_max:.1f} docs/hora)\n"
-                except Exception as e:
-                    relatorio += f"• Erro na análise de documentos: {str(e)}\n"
-        
-        # Analisar MELHORIAS por dia
-        if 'melhorias' in dados_disponiveis and not dados_disponiveis['melhorias'].empty:
-            df_melhorias = dados_disponiveis['melhorias'].copy()
-            if 'data_proposta' in df_melhorias.columns:
+    return relatorio
+
+def _secao_priorizacao(dados_disponiveis):
+    """Priorização e critérios de aceite das histórias avaliadas em demandas"""
+    relatorio = "📈 ANÁLISE DE PRIORIZAÇÃO DE DEMANDAS:\n"
+
+    if 'demandas' in dados_disponiveis and not dados_disponiveis['demandas'].empty:
+        df_demandas = dados_disponiveis['demandas']
+        if all(col in df_demandas.columns for col in ['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']):
+            total_historias = df_demandas['total_historias'].sum()
+            com_prioridade = df_demandas['historias_prioridade_definida'].sum()
+            com_criterio = df_demandas['historias_criterio_aceite'].sum()
+
+            relatorio += f"• Total de histórias: {total_historias}\n"
+            relatorio += f"• Histórias com prioridade definida: {com_prioridade} ({com_prioridade/total_historias*100:.1f}%)\n"
+            relatorio += f"• Histórias com critério de aceite: {com_criterio} ({com_criterio/total_historias*100:.1f}%)\n"
+
+            # Evolução temporal (série de taxas por dia de avaliação, já agregada)
+            if 'data_avaliacao' in df_demandas.columns:
                 try:
-                    df_melhorias['data_proposta'] = pd.to_datetime(df_melhorias['data_proposta'], errors='coerce')
-                    df_melhorias = df_melhorias.dropna(subset=['data_proposta'])
-                    
-                    if not df_melhorias.empty:
-                        melhorias_por_dia = df_melhorias.groupby(df_melhorias['data_proposta'].dt.date).size()
-                        if len(melhorias_por_dia) > 0:
-                            dia_mais_melhorias = melhorias_por_dia.idxmax()
-                            qtd_mais_melhorias = melhorias_por_dia.max()
-                            relatorio += f"• Dia com mais melhorias propostas: {dia_mais_melhorias} ({qtd_mais_melhorias} melhorias)\n"
-                            dias_analisados[dia_mais_melhorias] = dias_analisados.get(dia_mais_melhorias, 0) + qtd_mais_melhorias
-                except Exception as e:
-                    relatorio += f"• Erro na análise de melhorias: {str(e)}\n"
-        
-        # 🆕 DETERMINAR DIA MAIS PRODUTIVO GERAL
-        if dias_analisados:
-            dia_mais_produtivo = max(dias_analisados, key=dias_analisados.get)
-            relatorio += f"🎯 DIA MAIS PRODUTIVO GERAL: {dia_mais_produtivo} (score: {dias_analisados[dia_mais_produtivo]})\n"
-        
-        relatorio += "\n"
+                    serie = serie_priorizacao(agregar_demandas_por_dia(df_demandas))
 
-    # 🆕 ANÁLISE ESPECÍFICA POR TIPO DE PERGUNTA
-    if any(palavra in pergunta_lower for palavra in ['qualidade', 'critério', 'template', 'padronização']):
-        relatorio += "🎯 ANÁLISE DE QUALIDADE:\n"
-        
-        if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
-            df_docs = dados_disponiveis['documentos']
-            if 'critérios_aceite' in df_docs.columns and 'template_padronizado' in df_docs.columns:
-                com_criterios = (df_docs['critérios_aceite'] == 'SIM').sum()
-                com_template = (df_docs['template_padronizado'] == 'SIM').sum()
-                total_docs = len(df_docs)
-                
-                relatorio += f"• Documentos com critérios de aceite: {com_criterios}/{total_docs} ({com_criterios/total_docs*100:.1f}%)\n"
-                relatorio += f"• Documentos com template padronizado: {com_template}/{total_docs} ({com_template/total_docs*100:.1f}%)\n"
-                
-                # Qualidade por tipo de documento
-                if 'tipo_documento' in df_docs.columns:
-                    qualidade_por_tipo = df_docs.groupby('tipo_documento').agg({
-                        'critérios_aceite': lambda x: (x == 'SIM').sum(),
-                        'template_padronizado': lambda x: (x == 'SIM').sum(),
-                        'nome_documento': 'count'
-                    })
-                    relatorio += "• Qualidade por tipo de documento:\n"
-                    for tipo in qualidade_por_tipo.index:
-                        total = qualidade_por_tipo.loc[tipo, 'nome_documento']
-                        criterios = qualidade_por_tipo.loc[tipo, 'critérios_aceite']
-                        templates = qualidade_por_tipo.loc[tipo, 'template_padronizado']
-                        relatorio += f"  - {tipo}: {criterios}/{total} critérios, {templates}/{total} templates\n"
-        
-        relatorio += "\n"
+                    if len(serie) > 1:
+                        taxa_pri_inicial = serie['taxa_priorizacao'].iloc[0]
+                        taxa_pri_final = serie['taxa_priorizacao'].iloc[-1]
+                        evolucao_pri = taxa_pri_final - taxa_pri_inicial
 
-    if any(palavra in pergunta_lower for palavra in ['priorização', 'prioridade', 'demandas', 'histórias']):
-        relatorio += "📈 ANÁLISE DE PRIORIZAÇÃO DE DEMANDAS:\n"
-        
-        if 'demandas' in dados_disponiveis and not dados_disponiveis['demandas'].empty:
-            df_demandas = dados_disponiveis['demandas']
-            if all(col in df_demandas.columns for col in ['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']):
-                total_historias = df_demandas['total_historias'].sum()
-                com_prioridade = df_demandas['historias_prioridade_definida'].sum()
-                com_criterio = df_demandas['historias_criterio_aceite'].sum()
-                
-                relatorio += f"• Total de histórias: {total_historias}\n"
-                relatorio += f"• Histórias com prioridade definida: {com_prioridade} ({com_prioridade/total_historias*100:.1f}%)\n"
-                relatorio += f"• Histórias com critério de aceite: {com_criterio} ({com_criterio/total_historias*100:.1f}%)\n"
-                
-                # Evolução temporal
-                if 'data_avaliacao' in df_demandas.columns:
-                    try:
-                        df_temp = df_demandas.copy()
-                        df_temp['data_avaliacao'] = pd.to_datetime(df_temp['data_avaliacao'], errors='coerce')
-                        df_temp = df_temp.dropna(subset=['data_avaliacao'])
-                        df_temp = df_temp.sort_values('data_avaliacao')
-                        
-                        if len(df_temp) > 1:
-                            primeira_avaliacao = df_temp.iloc[0]
-                            ultima_avaliacao = df_temp.iloc[-1]
-                            
-                            taxa_pri_inicial = primeira_avaliacao['historias_prioridade_definida'] / primeira_avaliacao['total_historias'] * 100
-                            taxa_pri_final = ultima_avaliacao['historias_prioridade_definida'] / ultima_avaliacao['total_historias'] * 100
-                            evolucao_pri = taxa_pri_final - taxa_pri_inicial
-                            
-                            relatorio += f"• Evolução da priorização: {evolucao_pri:+.1f}% (de {taxa_pri_inicial:.1f}% para {taxa_pri_final:.1f}%)\n"
-                    except:
-                        pass
-        
-        relatorio += "\n"
+                        relatorio += f"• Evolução da priorização: {evolucao_pri:+.1f}% (de {taxa_pri_inicial:.1f}% para {taxa_pri_final:.1f}%)\n"
+                        relatorio += "• Taxas nas últimas avaliações:\n"
+                        for dia, linha in serie.tail(5).iterrows():
+                            relatorio += f"  - {dia.date()}: priorização {linha['taxa_priorizacao']:.1f}%, critério de aceite {linha['taxa_criterio']:.1f}% ({linha['total_historias']:.0f} histórias)\n"
+                except:
+                    pass
 
+    relatorio += "\n"
+    
+    return relatorio
+
+def _secao_melhorias(dados_disponiveis):
+    """Status, impacto, taxa e tempo médio de aplicação das melhorias"""
+    relatorio = ""
+    
     # ANÁLISE DE MELHORIAS DETALHADA
     if 'melhorias' in dados_disponiveis and not dados_disponiveis['melhorias'].empty:
         df_melhorias = dados_disponiveis['melhorias']
         relatorio += "💡 ANÁLISE DETALHADA DE MELHORIAS:\n"
         relatorio += f"• Total de melhorias: {len(df_melhorias)}\n"
-        
+
         if 'status' in df_melhorias.columns:
             status_counts = df_melhorias['status'].value_counts()
             relatorio += "• Distribuição por status:\n"
             for status, count in status_counts.items():
                 percentual = (count / len(df_melhorias)) * 100
                 relatorio += f"  - {status}: {count} ({percentual:.1f}%)\n"
-        
+
         if 'impacto' in df_melhorias.columns:
             impacto_counts = df_melhorias['impacto'].value_counts()
             relatorio += "• Impacto das melhorias:\n"
             for impacto, count in impacto_counts.items():
                 percentual = (count / len(df_melhorias)) * 100
                 relatorio += f"  - {impacto}: {count} ({percentual:.1f}%)\n"
-        
+
         if 'melhoria_aplicada' in df_melhorias.columns:
-            aplicadas = len(df_melhorias[df_melhorias['melhoria_aplicada'] == 'SIM'])
+            aplicadas = int((df_melhorias['melhoria_aplicada'] == 'SIM').sum())
             taxa_aplicacao = (aplicadas / len(df_melhorias) * 100) if len(df_melhorias) > 0 else 0
             relatorio += f"• Taxa de aplicação: {taxa_aplicacao:.1f}%\n"
-            
+
             # Tempo médio para aplicação
             if 'data_proposta' in df_melhorias.columns and 'data_aplicacao' in df_melhorias.columns:
                 try:
-                    df_temp = df_melhorias.copy()
-                    df_temp['data_proposta'] = pd.to_datetime(df_temp['data_proposta'], errors='coerce')
-                    df_temp['data_aplicacao'] = pd.to_datetime(df_temp['data_aplicacao'], errors='coerce')
-                    df_temp = df_temp.dropna(subset=['data_proposta', 'data_aplicacao'])
-                    if not df_temp.empty:
-                        df_temp['dias_para_aplicar'] = (df_temp['data_aplicacao'] - df_temp['data_proposta']).dt.days
-                        tempo_medio_aplicacao = df_temp['dias_para_aplicar'].mean()
+                    # Só as duas colunas: a diferença já é NaN onde falta uma das datas
+                    dias_para_aplicar = (
+                        converter_datas(df_melhorias['data_aplicacao']) - converter_datas(df_melhorias['data_proposta'])
+                    ).dt.days.dropna()
+                    if not dias_para_aplicar.empty:
+                        tempo_medio_aplicacao = dias_para_aplicar.mean()
                         relatorio += f"• Tempo médio para aplicação: {tempo_medio_aplicacao:.1f} dias\n"
                 except:
                     pass
-        
+
         relatorio += "\n"
+    
+    return relatorio
 
+def _secao_cerimonias(dados_disponiveis):
+    """Tipos, presença, duração e resultados das cerimônias"""
+    relatorio = ""
+    
     # ANÁLISE DE CERIMÔNIAS DETALHADA
     if 'cerimonias' in dados_disponiveis and not dados_disponiveis['cerimonias'].empty:
         df_cerimonias = dados_disponiveis['cerimonias']
         relatorio += "📅 ANÁLISE DETALHADA DE CERIMÔNIAS:\n"
         relatorio += f"• Total de registros: {len(df_cerimonias)}\n"
-        
+
         if 'tipo' in df_cerimonias.columns:
             tipo_counts = df_cerimonias['tipo'].value_counts()
             relatorio += "• Tipos de cerimônias:\n"
             for tipo, count in tipo_counts.items():
                 percentual = (count / len(df_cerimonias)) * 100
                 relatorio += f"  - {tipo}: {count} ({percentual:.1f}%)\n"
-        
+
         if 'presente' in df_cerimonias.columns:
-            presentes = len(df_cerimonias[df_cerimonias['presente'] == 'SIM'])
+            presentes = int((df_cerimonias['presente'] == 'SIM').sum())
             taxa_presenca = (presentes / len(df_cerimonias) * 100) if len(df_cerimonias) > 0 else 0
             relatorio += f"• Taxa de presença: {taxa_presenca:.1f}%\n"
-        
+
         if 'duracao_minutos' in df_cerimonias.columns:
             tempo_total = df_cerimonias['duracao_minutos'].sum()
             tempo_medio = tempo_total / len(df_cerimonias) if len(df_cerimonias) > 0 else 0
             relatorio += f"• Tempo total em reuniões: {tempo_total} min ({tempo_total/60:.1f} h)\n"
             relatorio += f"• Duração média: {tempo_medio:.1f} min\n"
-            
+
             # Duração por tipo de cerimônia
             if 'tipo' in df_cerimonias.columns:
                 duracao_por_tipo = df_cerimonias.groupby('tipo')['duracao_minutos'].mean().round(1)
                 relatorio += "• Duração média por tipo:\n"
                 for tipo, duracao in duracao_por_tipo.items():
                     relatorio += f"  - {tipo}: {duracao} min\n"
-        
+
         # Análise de resultados
         if 'resultado' in df_cerimonias.columns:
-            resultados_nao_vazios = df_cerimonias[df_cerimonias['resultado'].notna() & (df_cerimonias['resultado'] != '')]
-            relatorio += f"• Cerimônias com resultado registrado: {len(resultados_nao_vazios)}/{len(df_cerimonias)}\n"
-        
+            resultados_nao_vazios = int((df_cerimonias['resultado'].notna() & (df_cerimonias['resultado'] != '')).sum())
+            relatorio += f"• Cerimônias com resultado registrado: {resultados_nao_vazios}/{len(df_cerimonias)}\n"
+
         relatorio += "\n"
+    
+    return relatorio
 
+def _secao_documentos(dados_disponiveis):
+    """Tipos, tempo, velocidade, critérios, templates e status dos documentos"""
+    relatorio = ""
+    
     # ANÁLISE DE DOCUMENTOS DETALHADA
     if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
         df_documentos = dados_disponiveis['documentos']
         relatorio += "📋 ANÁLISE DETALHADA DE DOCUMENTAÇÃO:\n"
         relatorio += f"• Total de documentos: {len(df_documentos)}\n"
-        
+
         if 'tipo_documento' in df_documentos.columns:
             tipo_counts = df_documentos['tipo_documento'].value_counts()
             relatorio += "• Tipos de documentos:\n"
             for tipo, count in tipo_counts.items():
                 percentual = (count / len(df_documentos)) * 100
                 relatorio += f"  - {tipo}: {count} ({percentual:.1f}%)\n"
-        
+
         if 'tempo_minutos' in df_documentos.columns:
             tempo_total = df_documentos['tempo_minutos'].sum()
             tempo_medio = tempo_total / len(df_documentos) if len(df_documentos) > 0 else 0
             relatorio += f"• Tempo total em documentação: {tempo_total} min ({tempo_total/60:.1f} h)\n"
             relatorio += f"• Tempo médio por documento: {tempo_medio:.1f} min\n"
-            
+
             # Tempo por tipo de documento
             if 'tipo_documento' in df_documentos.columns:
                 tempo_por_tipo = df_documentos.groupby('tipo_documento')['tempo_minutos'].mean().round(1)
                 relatorio += "• Tempo médio por tipo:\n"
                 for tipo, tempo in tempo_por_tipo.items():
                     relatorio += f"  - {tipo}: {tempo} min\n"
-            
+
             # Eficiência em documentação
             docs_por_hora = len(df_documentos) / (tempo_total / 60) if tempo_total > 0 else 0
             relatorio += f"• Velocidade de documentação: {docs_por_hora:.1f} documentos/hora\n"
-        
+
         if 'critérios_aceite' in df_documentos.columns:
-            com_criterios = len(df_documentos[df_documentos['critérios_aceite'] == 'SIM'])
+            com_criterios = int((df_documentos['critérios_aceite'] == 'SIM').sum())
             taxa_criterios = (com_criterios / len(df_documentos) * 100) if len(df_documentos) > 0 else 0
             relatorio += f"• Documentos com critérios claros: {taxa_criterios:.1f}%\n"
-        
+
         if 'template_padronizado' in df_documentos.columns:
-            com_template = len(df_documentos[df_documentos['template_padronizado'] == 'SIM'])
+            com_template = int((df_documentos['template_padronizado'] == 'SIM').sum())
             taxa_template = (com_template / len(df_documentos) * 100) if len(df_documentos) > 0 else 0
             relatorio += f"• Uso de templates: {taxa_template:.1f}%\n"
-        
+
         if 'status' in df_documentos.columns:
             status_counts = df_documentos['status'].value_counts()
             relatorio += "• Status dos documentos:\n"
             for status, count in status_counts.items():
                 percentual = (count / len(df_documentos)) * 100
                 relatorio += f"  - {status}: {count} ({percentual:.1f}%)\n"
-        
+
         relatorio += "\n"
+    
+    return relatorio
 
+def _secao_resumo(dados_disponiveis):
+    """Resumo executivo com volumes e métricas-chave"""
     # RESUMO EXECUTIVO PARA IA
-    relatorio += "\n=== RESUMO EXECUTIVO PARA ANÁLISE IA ===\n"
-    
+    relatorio = "\n=== RESUMO EXECUTIVO PARA ANÁLISE IA ===\n"
+
     totais = {}
     for categoria, df in dados_disponiveis.items():
         if not df.empty:
             totais[categoria] = len(df)
-    
+
     relatorio += f"• Volume total de dados: {sum(totais.values())} registros\n"
     for categoria, total in totais.items():
         relatorio += f"• {categoria.title()}: {total} registros\n"
-    
+
     # Métricas chave de performance
     relatorio += "\n📈 MÉTRICAS-CHAVE DE PERFORMANCE:\n"
-    
+
     if 'melhorias' in dados_disponiveis and not dados_disponiveis['melhorias'].empty:
         df_mel = dados_disponiveis['melhorias']
         if 'melhoria_aplicada' in df_mel.columns:
-            aplicadas = len(df_mel[df_mel['melhoria_aplicada'] == 'SIM'])
+            aplicadas = int((df_mel['melhoria_aplicada'] == 'SIM').sum())
             relatorio += f"• Melhorias aplicadas: {aplicadas}/{len(df_mel)}\n"
-    
+
     if 'cerimonias' in dados_disponiveis and not dados_disponiveis['cerimonias'].empty:
         df_cer = dados_disponiveis['cerimonias']
         if 'presente' in df_cer.columns:
-            presentes = len(df_cer[df_cer['presente'] == 'SIM'])
+            presentes = int((df_cer['presente'] == 'SIM').sum())
             relatorio += f"• Presença em cerimônias: {presentes}/{len(df_cer)}\n"
-    
+
     if 'documentos' in dados_disponiveis and not dados_disponiveis['documentos'].empty:
         df_doc = dados_disponiveis['documentos']
         if 'critérios_aceite' in df_doc.columns:
-            com_criterios = len(df_doc[df_doc['critérios_aceite'] == 'SIM'])
+            com_criterios = int((df_doc['critérios_aceite'] == 'SIM').sum())
             relatorio += f"• Docs com critérios: {com_criterios}/{len(df_doc)}\n"
     
     return relatorio
 
+# ==================== SEÇÕES EM PARALELO ====================
+# Termos (sem acento, palavras inteiras de `tokenizar`) que tornam cada seção relevante
+# para a pergunta: 'dia' não casa com "diagnóstico" nem com "média". As temáticas só
+# entram quando citadas; as de categoria entram quando citadas ou, se a pergunta não
+# citar categoria nem tema algum, todas. O resumo entra sempre.
+PALAVRAS_SECOES_TEMATICAS = {
+    'produtividade': {'dia', 'dias', 'diario', 'diaria', 'produtividade', 'produtivo', 'produtiva', 'produziu'},
+    'qualidade': {'qualidade', 'criterio', 'criterios', 'template', 'templates', 'padronizacao'},
+    'priorizacao': {'priorizacao', 'prioridade', 'prioridades', 'demanda', 'demandas', 'historia', 'historias'}
+}
+PALAVRAS_SECOES_CATEGORIA = {
+    'melhorias': {'melhoria', 'melhorias', 'aplicada', 'aplicadas', 'aplicado', 'aplicados', 'impacto', 'impactos'},
+    'cerimonias': {'cerimonia', 'cerimonias', 'reuniao', 'reunioes', 'daily', 'dailies', 'planning', 'review',
+                   'retro', 'retrospectiva', 'presenca'},
+    'documentos': {'documento', 'documentos', 'documentacao', 'story', 'stories', 'especificacao', 'especificacoes',
+                   'template', 'templates', 'criterio', 'criterios'}
+}
+
+# Ordem de exibição no relatório
+SECOES_RELATORIO = {
+    'produtividade': _secao_produtividade,
+    'qualidade': _secao_qualidade,
+    'priorizacao': _secao_priorizacao,
+    'melhorias': _secao_melhorias,
+    'cerimonias': _secao_cerimonias,
+    'documentos': _secao_documentos,
+    'resumo': _secao_resumo
+}
+
+_POOL_SECOES = None
+_LOCK_POOL = threading.Lock()
+
+def secoes_relevantes(pergunta):
+    """Nomes das seções do relatório que a pergunta torna relevantes, na ordem de exibição"""
+    termos = set(tokenizar(pergunta))
+    citadas = {
+        nome for palavras_secoes in (PALAVRAS_SECOES_TEMATICAS, PALAVRAS_SECOES_CATEGORIA)
+        for nome, palavras in palavras_secoes.items() if termos & palavras
+    }
+    if not citadas:
+        citadas = set(PALAVRAS_SECOES_CATEGORIA)
+    return [nome for nome in SECOES_RELATORIO if nome in citadas or nome == 'resumo']
+
+def _pool_secoes():
+    """Pool criado no primeiro uso (depois de um fork, cada processo cria o seu)"""
+    global _POOL_SECOES
+    with _LOCK_POOL:
+        if _POOL_SECOES is None:
+            _POOL_SECOES = ThreadPoolExecutor(max_workers=8, thread_name_prefix='relatorio')
+        return _POOL_SECOES
+
+def _executar_parte(nome, funcao):
+    with span(f"relatorio.{nome}"):
+        return funcao()
+
+# ==================== PREPARAÇÃO ESPECULATIVA ====================
+# Seções que entram em qualquer pergunta sem foco (e o resumo, que entra sempre):
+# calculadas assim que a página abre ou o período muda, enquanto o usuário digita
+SECOES_ESPECULATIVAS = ['melhorias', 'cerimonias', 'documentos', 'resumo']
+MAX_PARTES_PREPARADAS = 64
+
+_PARTES_PREPARADAS = OrderedDict()  # (assinatura dos dados, parte) -> Future, do menos ao mais recente
+_LOCK_PREPARADAS = threading.Lock()
+
+def assinatura_dados(dados_disponiveis):
+    """Identifica o conteúdo dos frames (versão da leitura, espaço e linhas); None se algum não tiver versão"""
+    assinatura = []
+    for categoria, df in sorted(dados_disponiveis.items()):
+        if df.empty:
+            assinatura.append((categoria, 0))
+            continue
+        if df.attrs.get('versao') is None:
+            return None
+        linhas = int(pd.util.hash_pandas_object(df.index, index=False).to_numpy().sum())
+        assinatura.append((categoria, df.attrs['versao'], df.attrs.get('espaco'), len(df), linhas))
+    return tuple(assinatura)
+
+def _disparar(pool, assinatura, nome, funcao):
+    """Future da parte: reaproveita a já preparada para os mesmos dados ou dispara uma nova"""
+    if assinatura is None:
+        return pool.submit(executar_no_contexto(_executar_parte), nome, funcao)
+    with _LOCK_PREPARADAS:
+        futuro = _PARTES_PREPARADAS.get((assinatura, nome))
+        if futuro is None or (futuro.done() and futuro.exception() is not None):
+            futuro = pool.submit(executar_no_contexto(_executar_parte), nome, funcao)
+            _PARTES_PREPARADAS[(assinatura, nome)] = futuro
+            while len(_PARTES_PREPARADAS) > MAX_PARTES_PREPARADAS:
+                _PARTES_PREPARADAS.popitem(last=False)
+        else:
+            _PARTES_PREPARADAS.move_to_end((assinatura, nome))
+        return futuro
+
+def preparar_relatorio_po(dados_disponiveis, secoes=SECOES_ESPECULATIVAS):
+    """Dispara em segundo plano as seções que independem da pergunta e a indexação da busca.
+
+    Chamadas repetidas com os mesmos dados não recalculam nada; a consulta seguinte
+    reaproveita o que já terminou (ou espera o que ainda está rodando).
+    """
+    assinatura = assinatura_dados(dados_disponiveis)
+    if assinatura is None or all(df.empty for df in dados_disponiveis.values()):
+        return False
+    pool = _pool_secoes()
+    for nome in secoes:
+        _disparar(pool, assinatura, nome, partial(SECOES_RELATORIO[nome], dados_disponiveis))
+    _disparar(pool, assinatura, 'busca.indexacao', partial(sincronizar_frames, dados_disponiveis))
+    return True
+
+def iniciar_relatorio_po(dados_disponiveis, pergunta, pesos_produtividade=None, secoes=None):
+    """Dispara as seções relevantes (ou as `secoes` pedidas) no pool e devolve a função que espera por elas e monta o relatório.
+
+    As seções só leem os frames, então rodam em paralelo sobre os mesmos dados; a de
+    produtividade, a mais cara, vira uma tarefa por parte. Quem chama segue trabalhando
+    (busca, provedor) e só espera ao montar o texto, na ordem original das seções.
+    """
+    pool = _pool_secoes()
+    assinatura = assinatura_dados(dados_disponiveis)
+    def disparar(nome, funcao):
+        # Pesos personalizados mudam o ranking: essa parte não reaproveita a preparada
+        chave = assinatura if pesos_produtividade is None or nome != 'produtividade.geral' else None
+        return _disparar(pool, chave, nome, funcao)
+
+    partes = []
+    for nome in secoes or secoes_relevantes(pergunta):
+        if nome == 'produtividade':
+            partes.append("📅 ANÁLISE DIÁRIA DETALHADA (Produtividade):\n")
+            partes += [disparar(f"produtividade.{parte}", funcao) for parte, funcao in _partes_produtividade(dados_disponiveis, pesos_produtividade)]
+            partes.append("\n")
+        else:
+            partes.append(disparar(nome, partial(SECOES_RELATORIO[nome], dados_disponiveis)))
+
+    def montar():
+        return "=== ANÁLISE COMPLETA DE DADOS DE PRODUCT OWNERSHIP ===\n\n" + "".join(
+            parte if isinstance(parte, str) else parte.result() for parte in partes
+        )
+    return montar
+
+@rastrear("analise_local")
 def analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=False):
     """
     Fallback para análise local dos dados de PO
@@ -494,7 +729,7 @@ def analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=False):
                     resposta += f"  - {status}: {count}\n"
             
             if 'melhoria_aplicada' in df.columns:
-                aplicadas = len(df[df['melhoria_aplicada'] == 'SIM'])
+                aplicadas = int((df['melhoria_aplicada'] == 'SIM').sum())
                 taxa = (aplicadas / len(df) * 100) if len(df) > 0 else 0
                 resposta += f"• Taxa de aplicação: {taxa:.1f}%\n"
             resposta += "\n"
@@ -510,7 +745,7 @@ def analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=False):
                     resposta += f"• Cerimônia mais frequente: {tipo_principal.index[0]} ({tipo_principal.iloc[0]}x)\n"
             
             if 'presente' in df.columns:
-                presentes = len(df[df['presente'] == 'SIM'])
+                presentes = int((df['presente'] == 'SIM').sum())
                 taxa = (presentes / len(df) * 100) if len(df) > 0 else 0
                 resposta += f"• Taxa de presença: {taxa:.1f}%\n"
             
@@ -549,7 +784,7 @@ def analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=False):
                 resposta += f"• Tempo médio por documento: {tempo_medio:.1f} min\n"
             
             if 'critérios_aceite' in df.columns:
-                com_criterios = len(df[df['critérios_aceite'] == 'SIM'])
+                com_criterios = int((df['critérios_aceite'] == 'SIM').sum())
                 taxa = (com_criterios / len(df) * 100) if len(df) > 0 else 0
                 resposta += f"• Docs com critérios claros: {taxa:.1f}%\n"
             resposta += "\n"
@@ -560,7 +795,7 @@ def analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=False):
         if 'melhorias' in dados_disponiveis and not dados_disponiveis['melhorias'].empty:
             df_melhorias = dados_disponiveis['melhorias']
             if 'melhoria_aplicada' in df_melhorias.columns:
-                aplicadas = len(df_melhorias[df_melhorias['melhoria_aplicada'] == 'SIM'])
+                aplicadas = int((df_melhorias['melhoria_aplicada'] == 'SIM').sum())
                 if aplicadas < len(df_melhorias) * 0.5:
                     resposta += "• **Atenção:** Menos de 50% das melhorias foram aplicadas. Reveja o processo de implementação.\n"
         
@@ -596,20 +831,16 @@ def testar_api_gemini():
             print("❌ Chave não encontrada")
             return False
         
-        # Configura a API
-        genai.configure(api_key=chave)
-        print("✅ API configurada")
-        
         # 🆕 MODELOS CORRETOS BASEADO NA SUA LISTA:
-        modelo = "gemini-2.0-flash"  # Modelo estável e rápido
+        provedor_nome, modelo = MODELOS["Gemini Flash"]  # Modelo estável e rápido
         
         print(f"🔧 Tentando modelo: {modelo}")
-        model = genai.GenerativeModel(modelo)
-        print("✅ Modelo carregado")
+        provedor = obter_provedor(provedor_nome, modelo, chave)
+        print("✅ API configurada e modelo carregado")
         
         # Faz uma pergunta simples
-        response = model.generate_content("Responda em UMA única palavra: OK")
-        print(f"✅ Resposta recebida: {response.text}")
+        resposta = provedor.gerar("Responda em UMA única palavra: OK")
+        print(f"✅ Resposta recebida: {resposta.texto}")
         
         print("🎉 TESTE DA API BEM-SUCEDIDO!")
         return True
@@ -620,4 +851,5 @@ def testar_api_gemini():
 
 # Executa os testes
 if __name__ == "__main__":
+    testar_chave()
     testar_api_gemini()
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Adaptador do assistente para o app Streamlit.
+
+O núcleo de análise (assistente_po: relatório, análise local e cliente do LLM)
+não importa o Streamlit e pode rodar em workers, lotes e testes. Aqui ficam só
+as partes de interface: a chave lida dos secrets, os avisos exibidos na tela e
+a conversa de cada sessão, guardada no session_state entre os reruns.
+"""
+import os
+
+import streamlit as st
+
+from assistente_po import consultar_assistente_po
+from conversa_po import ConversaPO, conversar_assistente_po
+
+def chave_gemini_secrets():
+    """Chave do Gemini nos secrets ([gemini] api_key ou GEMINI_API_KEY); None se ausente"""
+    try:
+        if 'gemini' in st.secrets:
+            return st.secrets['gemini']['api_key']
+        return st.secrets.get('GEMINI_API_KEY')
+    except Exception:
+        return None
+
+def _chave_com_aviso():
+    gemini_key = chave_gemini_secrets()
+    if not gemini_key and not os.getenv('GEMINI_API_KEY'):
+        st.warning("⚠️ Chave Gemini não encontrada nos secrets")
+    return gemini_key
+
+def consultar_assistente(pergunta, dados_disponiveis, tipo_modelo):
+    """Consulta o assistente com a chave dos secrets, exibindo os avisos no app"""
+    gemini_key = _chave_com_aviso()
+    return consultar_assistente_po(pergunta, dados_disponiveis, tipo_modelo=tipo_modelo, gemini_key=gemini_key, avisar=st.warning)
+
+def conversa_da_sessao():
+    """Conversa da sessão, criada na primeira pergunta e mantida entre os reruns"""
+    if 'conversa_ia' not in st.session_state:
+        st.session_state.conversa_ia = ConversaPO()
+    return st.session_state.conversa_ia
+
+def conversar_assistente(pergunta, dados_disponiveis, tipo_modelo):
+    """Próximo turno da conversa da sessão, com a chave dos secrets e os avisos no app"""
+    gemini_key = _chave_com_aviso()
+    return conversar_assistente_po(
+        pergunta, dados_disponiveis, conversa_da_sessao(), tipo_modelo=tipo_modelo, gemini_key=gemini_key, avisar=st.warning
+    )
@@ -0,0 +1,281 @@
+"""Teste de carga: muitas sessões simultâneas do app contra a planilha e o Gemini falsos.
+
+Cada sessão é um AppTest próprio (session_state próprio) rodando o app inteiro
+(`main()`) numa thread; todas dividem o processo, como num servidor Streamlit:
+armazém dos espaços, conexões, cotas e provedores. A planilha e o Gemini falsos
+respondem com latência configurável, para que leituras e consultas simultâneas
+de fato se sobreponham. Fases, cada uma com todas as sessões partindo juntas:
+
+    partida_fria   todas abrem o app com o cache vazio
+    navegacao      cada uma faz N reruns: troca de página, grava uma melhoria ou consulta o assistente
+    ttl_vencido    o relógio do cache passa do TTL e todas rodam de novo
+
+Relata vazão (reruns/s), latência por rerun (p50/p95/p99), pico de memória do
+processo e as chamadas feitas à planilha (leituras, gravações, autorizações) e
+ao Gemini. Verificação de stampede: nas fases de cache frio ou vencido, cada aba
+deve ser lida no máximo `--max-leituras` vezes, por mais sessões que peçam;
+acima disso o comando sai com código 1. A mesma verificação, sem AppTest e em
+segundos, é `verificar_stampede_abas` (usada por tests/test_carga.py).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_carga --sessoes 50 --reruns 5 --saida carga.json
+    python -m benchmarks.bench_carga --sessoes 20 --reruns 0        # só a verificação de stampede
+"""
+import argparse
+import contextlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+import espacos
+from benchmarks.bench_memoria import CAMINHO_APP, memoria_processo_mb, zerar_pico_rss
+from benchmarks.bench_po import metadados
+from benchmarks.dados_sinteticos import gerar_planilha
+from benchmarks.falsos import ContadorChamadas, ambiente_falso
+
+SESSOES_PADRAO = 20
+RERUNS_PADRAO = 5
+LINHAS_PADRAO = 5_000
+LATENCIA_PLANILHA_S = 0.3
+LATENCIA_LLM_S = 1.0
+ABAS = ['melhorias', 'cerimonias_reunioes', 'documentos_criterios', 'demandas']
+FASES_STAMPEDE = ['partida_fria', 'ttl_vencido']
+# Peso de cada ação de um usuário na fase de navegação
+ACOES = {'navegar': 0.8, 'gravar': 0.1, 'perguntar': 0.1}
+PERGUNTA = "Como está a taxa de aplicação das melhorias e a presença nas cerimônias?"
+
+# ==================== SESSÕES ====================
+class RelogioCache:
+    """Relógio monotônico do armazém dos espaços que o teste adianta para vencer o TTL sem esperar"""
+    def __init__(self):
+        self.deslocamento = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.deslocamento
+
+    def avancar(self, segundos):
+        self.deslocamento += segundos
+
+class Sessao:
+    """Um usuário simulado: um AppTest com session_state próprio e as medidas de cada rerun"""
+    def __init__(self, numero, semente):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.rng = random.Random(semente)
+        # Sem at.secrets: o AppTest troca st.secrets globalmente a cada run, o que não convive com
+        # sessões em paralelo; os secrets falsos já vêm do ambiente_falso
+        self.at = AppTest.from_file(CAMINHO_APP, default_timeout=600)
+        self.medidas = []
+        self.erros = []
+
+    def _rodar(self, fase, acao):
+        inicio = time.perf_counter()
+        self.at.run()
+        self.medidas.append({'fase': fase, 'acao': acao, 'ms': (time.perf_counter() - inicio) * 1000})
+        self.erros += [f"{acao}: {excecao.value}" for excecao in self.at.exception]
+
+    def _ir_para(self, fase, menu):
+        self.at.sidebar.selectbox(key="menu_principal").set_value(menu)
+        self._rodar(fase, 'navegar')
+
+    def abrir(self, fase):
+        self._rodar(fase, 'abrir')
+
+    def rerun(self, fase):
+        self._rodar(fase, 'rerun')
+
+    def agir(self, fase):
+        acao = self.rng.choices(list(ACOES), weights=list(ACOES.values()))[0]
+        if acao == 'navegar':
+            self._ir_para(fase, self.rng.choice(self.at.sidebar.selectbox(key="menu_principal").options))
+        elif acao == 'gravar':
+            self._ir_para(fase, "💡 Melhorias")
+            self.at.text_input(key="melhoria_id").input(f"CARGA-{self.numero}-{len(self.medidas)}")
+            self.at.text_input(key="melhoria_proposta").input("Melhoria registrada pelo teste de carga")
+            self.at.button(key="btn_salvar_melhoria").click()
+            self._rodar(fase, 'gravar')
+        else:
+            self._ir_para(fase, "🤖 Assistente IA")
+            self.at.text_area(key="pergunta_ia").input(PERGUNTA)
+            self.at.button(key="btn_analisar_ia").click()
+            self._rodar(fase, 'perguntar')
+
+@contextlib.contextmanager
+def apptest_em_paralelo():
+    """Deixa vários AppTest rodarem ao mesmo tempo no processo, como as sessões de um servidor.
+
+    O AppTest foi feito para um run por vez: liga opções globais e o Runtime falso no início
+    de cada run e os desfaz no fim, no meio do run das outras sessões.
+    """
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    ultimo_runtime = []
+
+    def instancia(cls):
+        # O fim do run de uma sessão zera o Runtime; as demais seguem com o último criado
+        if cls._instance is not None:
+            ultimo_runtime[:] = [cls._instance]
+        if not ultimo_runtime:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo_runtime[0]
+
+    with contextlib.ExitStack() as pilha:
+        pilha.enter_context(patch_config_options({'global.appTest': True}))
+        pilha.enter_context(mock.patch.object(Runtime, 'instance', classmethod(instancia)))
+        pilha.enter_context(mock.patch.object(Runtime, 'exists', classmethod(lambda cls: cls._instance is not None or bool(ultimo_runtime))))
+        # Como no servidor, o script é compilado uma vez para todas as sessões (o AppTest cria um cache
+        # por run, e compilações simultâneas do mesmo arquivo falham no Python 3.11)
+        script_cache = ScriptCache()
+        for modulo in (app_test, local_script_runner):
+            pilha.enter_context(mock.patch.object(modulo, 'ScriptCache', lambda: script_cache))
+        yield
+
+# ==================== MEDIÇÃO ====================
+def pico_rss_mb():
+    """Pico de RSS do processo desde o último zerar_pico_rss (Linux); None onde não há /proc"""
+    try:
+        return memoria_processo_mb('VmHWM')
+    except OSError:
+        return None
+
+def executar_fase(nome, pool, sessoes, passo, contador):
+    """Roda `passo(sessão)` em todas as sessões ao mesmo tempo e resume latências, vazão, memória e chamadas"""
+    barreira = threading.Barrier(len(sessoes))
+    antes = dict(contador.chamadas)
+    zerar_pico_rss()
+
+    def rodar(sessao):
+        barreira.wait()  # todas partem juntas: é o pior caso para caches vazios ou vencidos
+        passo(sessao)
+
+    inicio = time.perf_counter()
+    list(pool.map(rodar, sessoes))
+    duracao = time.perf_counter() - inicio
+
+    tempos = np.array([medida['ms'] for sessao in sessoes for medida in sessao.medidas if medida['fase'] == nome])
+    return {
+        'fase': nome,
+        'sessoes': len(sessoes),
+        'reruns': len(tempos),
+        'duracao_s': duracao,
+        'vazao_rps': len(tempos) / duracao if duracao > 0 else 0.0,
+        **{f'p{q}_ms': float(np.percentile(tempos, q)) if len(tempos) else None for q in (50, 95, 99)},
+        'max_ms': float(tempos.max()) if len(tempos) else None,
+        'pico_rss_mb': pico_rss_mb(),
+        'chamadas': {
+            f"{aba}.{operacao}": quantidade - antes.get((aba, operacao), 0)
+            for (aba, operacao), quantidade in sorted(contador.chamadas.items())
+            if quantidade - antes.get((aba, operacao), 0)
+        }
+    }
+
+# ==================== EXECUÇÃO ====================
+def executar(sessoes, reruns, linhas, latencia_planilha, latencia_llm, semente=42):
+    """Roda as fases com `sessoes` usuários simultâneos e devolve as medidas de cada uma"""
+    # Cada thread de sessão avisaria que roda fora de um ScriptRunContext
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    contador = ContadorChamadas()
+    relogio = RelogioCache()
+    fases = []
+    with contextlib.ExitStack() as pilha:
+        pilha.enter_context(ambiente_falso(gerar_planilha(linhas), latencia_planilha, latencia_llm, contador))
+        pilha.enter_context(mock.patch.object(espacos, 'time', relogio))
+        pilha.enter_context(apptest_em_paralelo())
+        grupo = [Sessao(numero, semente + numero) for numero in range(sessoes)]
+        with ThreadPoolExecutor(max_workers=sessoes, thread_name_prefix="sessao") as pool:
+            fases.append(executar_fase('partida_fria', pool, grupo, lambda sessao: sessao.abrir('partida_fria'), contador))
+            if reruns:
+                fases.append(executar_fase(
+                    'navegacao', pool, grupo, lambda sessao: [sessao.agir('navegacao') for _ in range(reruns)], contador
+                ))
+            relogio.avancar(espacos.TTL_CACHE_S + 1)
+            fases.append(executar_fase('ttl_vencido', pool, grupo, lambda sessao: sessao.rerun('ttl_vencido'), contador))
+    erros = [erro for sessao in grupo for erro in sessao.erros]
+    return {'fases': fases, 'erros': erros[:20], 'total_erros': len(erros)}
+
+def verificar_stampede(resultado, max_leituras):
+    """Abas lidas mais de `max_leituras` vezes numa fase de cache frio ou vencido"""
+    falhas = []
+    for fase in resultado['fases']:
+        if fase['fase'] not in FASES_STAMPEDE:
+            continue
+        for aba in ABAS:
+            leituras = fase['chamadas'].get(f"{aba}.get_all_records", 0)
+            if leituras > max_leituras:
+                falhas.append({'fase': fase['fase'], 'aba': aba, 'leituras': leituras})
+    return falhas
+
+def verificar_stampede_abas(sessoes=8, linhas=200, latencia_planilha=0.05, max_leituras=1):
+    """Verificação de stampede em segundos, sem AppTest: as sessões pedem as abas juntas, com o cache frio e vencido.
+
+    Cada sessão é só uma thread chamando `carregar_aba_em_cache` do app; devolve as falhas como `verificar_stampede`.
+    """
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    contador = ContadorChamadas()
+    relogio = RelogioCache()
+    fases = []
+    with contextlib.ExitStack() as pilha:
+        pilha.enter_context(ambiente_falso(gerar_planilha(linhas), latencia_planilha, contador=contador))
+        pilha.enter_context(mock.patch.object(espacos, 'time', relogio))
+        import app
+        app.obter_cache_espacos().limpar()
+        barreira = threading.Barrier(sessoes)
+
+        def abrir(sessao):
+            barreira.wait()
+            for aba in ABAS:
+                app.carregar_aba_em_cache(aba, espacos.ESPACO_PADRAO)
+
+        with ThreadPoolExecutor(max_workers=sessoes, thread_name_prefix="sessao") as pool:
+            for fase in FASES_STAMPEDE:
+                antes = dict(contador.chamadas)
+                list(pool.map(abrir, range(sessoes)))
+                fases.append({'fase': fase, 'chamadas': {
+                    f"{aba}.{operacao}": quantidade - antes.get((aba, operacao), 0)
+                    for (aba, operacao), quantidade in contador.chamadas.items()
+                }})
+                relogio.avancar(espacos.TTL_CACHE_S + 1)
+        app.obter_cache_espacos().limpar()
+    return verificar_stampede({'fases': fases}, max_leituras)
+
+def imprimir(resultado):
+    for fase in resultado['fases']:
+        rss = f"{fase['pico_rss_mb']:7.0f} MB" if fase['pico_rss_mb'] is not None else "    n/d"
+        print(f"{fase['fase']:<13} {fase['reruns']:>5} reruns em {fase['duracao_s']:6.1f}s | {fase['vazao_rps']:6.2f} reruns/s | "
+              f"p50 {fase['p50_ms']:7.0f} ms  p95 {fase['p95_ms']:7.0f} ms  p99 {fase['p99_ms']:7.0f} ms | pico RSS {rss}")
+        print("              " + ", ".join(f"{chave}={quantidade}" for chave, quantidade in fase['chamadas'].items()))
+    if resultado['total_erros']:
+        print(f"⚠️ {resultado['total_erros']} exceções nas sessões, por exemplo: {resultado['erros'][0]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessoes', type=int, default=SESSOES_PADRAO, help="sessões simultâneas")
+    parser.add_argument('--reruns', type=int, default=RERUNS_PADRAO, help="ações por sessão na fase de navegação (0 pula a fase)")
+    parser.add_argument('--linhas', type=int, default=LINHAS_PADRAO, help="linhas por aba da planilha falsa")
+    parser.add_argument('--latencia-planilha', type=float, default=LATENCIA_PLANILHA_S, help="segundos por chamada à planilha falsa")
+    parser.add_argument('--latencia-llm', type=float, default=LATENCIA_LLM_S, help="segundos por resposta do Gemini falso")
+    parser.add_argument('--max-leituras', type=int, default=1, help="leituras de cada aba aceitas numa fase de cache frio ou vencido")
+    parser.add_argument('--saida', default='bench_carga.json', help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    resultado = executar(args.sessoes, args.reruns, args.linhas, args.latencia_planilha, args.latencia_llm)
+    imprimir(resultado)
+    falhas = verificar_stampede(resultado, args.max_leituras)
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump({'meta': {**metadados(), **vars(args)}, **resultado, 'stampede': falhas}, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados gravados em {args.saida}")
+
+    for falha in falhas:
+        print(f"❌ Stampede em {falha['fase']}: {falha['aba']} lida {falha['leituras']} vezes (máximo {args.max_leituras})")
+    sys.exit(1 if falhas else 0)
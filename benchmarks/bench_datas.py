@@ -0,0 +1,56 @@
+"""Benchmark do custo de conversão das colunas de data em abas grandes.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_datas
+    python -m benchmarks.bench_datas --linhas 100000 1000000 --repeticoes 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from datas import converter_datas
+
+def gerar_coluna_datas(linhas, fracao_vazias=0.1, fracao_iso=0.0, semente=42):
+    """Coluna de texto no formato da planilha (dd/mm/aaaa), com vazios e opcionalmente ISO"""
+    rng = np.random.default_rng(semente)
+    dias = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, linhas), unit='D')
+    texto = pd.Series(dias.strftime('%d/%m/%Y'), dtype=object)
+    sorteio = rng.random(linhas)
+    texto[sorteio < fracao_vazias] = ''
+    iso = (sorteio >= fracao_vazias) & (sorteio < fracao_vazias + fracao_iso)
+    texto[iso] = dias[iso].strftime('%Y-%m-%d')
+    return texto
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def executar(linhas_lista, repeticoes):
+    resultados = []
+    for linhas in linhas_lista:
+        for fracao_iso in (0.0, 0.01):
+            coluna = gerar_coluna_datas(linhas, fracao_iso=fracao_iso)
+            tipada = converter_datas(coluna)
+            casos = {
+                'dayfirst_inferido': lambda: pd.to_datetime(coluna, dayfirst=True, errors='coerce'),
+                'converter_datas': lambda: converter_datas(coluna),
+                'ja_tipada': lambda: converter_datas(tipada)
+            }
+            for nome, funcao in casos.items():
+                segundos = cronometrar(funcao, repeticoes)
+                resultados.append({'linhas': linhas, 'fracao_iso': fracao_iso, 'caso': nome, 'segundos': segundos})
+                print(f"{linhas:>9} linhas | ISO {fracao_iso:>4.0%} | {nome:<18} {segundos * 1000:9.1f} ms")
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+    executar(args.linhas, args.repeticoes)
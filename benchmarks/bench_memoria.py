@@ -0,0 +1,128 @@
+"""Benchmark de memória por rerun do app sobre dados sintéticos.
+
+Roda o app pelo AppTest (sem servidor), contra a planilha falsa, passando por
+todas as páginas do menu. Em cada rerun mede o pico de memória alocada
+(tracemalloc, que também enxerga os buffers do numpy/pandas) e, no Linux, o
+acréscimo de RSS do processo (VmHWM, zerado antes de cada rerun, menos o RSS
+de partida). Cada rerun desloca em um dia o início do período, para que os
+filtros e figuras sejam de fato recalculados em vez de saírem dos caches.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_memoria --tamanhos 100000 --saida memoria.json
+    python -m benchmarks.bench_memoria --tamanhos 100000 --saida nova.json --comparar memoria.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.bench_po import metadados
+from benchmarks.dados_sinteticos import gerar_planilha
+from benchmarks.falsos import SECRETS_FALSOS, ambiente_falso
+
+TAMANHOS_PADRAO = [100_000]
+DIAS_PERIODO = 730  # dois dos três anos de histórico sintético
+CAMINHO_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+MB = 1024 ** 2
+
+# ==================== MEDIÇÃO ====================
+def zerar_pico_rss():
+    """Zera o VmHWM do processo (Linux); False onde não há /proc"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+def memoria_processo_mb(campo):
+    with open('/proc/self/status') as arquivo:
+        return int(re.search(campo + r':\s+(\d+)', arquivo.read()).group(1)) / 1024
+
+def medir_rerun(rodar):
+    """Executa um rerun e devolve (pico alocado em MB, acréscimo de RSS no pico em MB ou None)"""
+    com_rss = zerar_pico_rss()
+    rss_inicial = memoria_processo_mb('VmRSS') if com_rss else None
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    rodar()
+    _, pico = tracemalloc.get_traced_memory()
+    return (pico - base) / MB, (memoria_processo_mb('VmHWM') - rss_inicial if com_rss else None)
+
+# ==================== EXECUÇÃO ====================
+def executar(tamanhos, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    resultados = []
+    tracemalloc.start()
+    try:
+        for linhas in tamanhos:
+            with ambiente_falso(gerar_planilha(linhas)):
+                at = AppTest.from_file(CAMINHO_APP, default_timeout=600)
+                for chave, valor in SECRETS_FALSOS.items():
+                    at.secrets[chave] = valor
+                at.run()
+                for menu in at.sidebar.selectbox(key="menu_principal").options:
+                    at.sidebar.selectbox(key="menu_principal").set_value(menu)
+                    medidas = []
+                    for rerun in range(reruns):
+                        at.sidebar.date_input(key="data_inicio_input").set_value(date.today() - timedelta(days=DIAS_PERIODO + rerun))
+                        medidas.append(medir_rerun(at.run))
+                    if at.exception:
+                        print(f"⚠️ {menu}: {at.exception[0].value}")
+                    resultado = {
+                        'pagina': menu,
+                        'linhas': linhas,
+                        'reruns': reruns,
+                        'pico_mb': statistics.median(m[0] for m in medidas),
+                        'pico_mb_max': max(m[0] for m in medidas),
+                        'rss_mb': statistics.median(m[1] for m in medidas) if medidas[0][1] is not None else None
+                    }
+                    resultados.append(resultado)
+                    rss = f"+{resultado['rss_mb']:7.1f} MB" if resultado['rss_mb'] is not None else "      n/d"
+                    print(f"{linhas:>9} linhas | {menu:<20} pico por rerun {resultado['pico_mb']:8.1f} MB "
+                          f"(máx {resultado['pico_mb_max']:8.1f}) | RSS {rss}")
+    finally:
+        tracemalloc.stop()
+    return resultados
+
+# ==================== COMPARAÇÃO ====================
+def comparar(atual, anterior, limite):
+    """Compara o pico por rerun de cada (página, linhas) e devolve as que cresceram além do limite"""
+    base = {(r['pagina'], r['linhas']): r for r in anterior['resultados']}
+    regressoes = []
+    print(f"\nComparação com {anterior['meta'].get('commit')} (limite {limite:.2f}x):")
+    for resultado in atual['resultados']:
+        chave = (resultado['pagina'], resultado['linhas'])
+        if chave not in base:
+            continue
+        razao = resultado['pico_mb'] / base[chave]['pico_mb'] if base[chave]['pico_mb'] > 0 else float('inf')
+        marcador = "⚠️" if razao > limite else "  "
+        print(f"{marcador} {resultado['linhas']:>9} linhas | {resultado['pagina']:<20} "
+              f"{base[chave]['pico_mb']:8.1f} -> {resultado['pico_mb']:8.1f} MB ({razao:5.2f}x)")
+        if razao > limite:
+            regressoes.append({**resultado, 'razao': razao})
+    return regressoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO, help="linhas por aba (ex.: 10000 100000)")
+    parser.add_argument('--reruns', type=int, default=3, help="reruns medidos por página")
+    parser.add_argument('--saida', default='bench_memoria.json', help="arquivo JSON de saída")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--limite', type=float, default=1.25, help="razão de pico considerada regressão")
+    args = parser.parse_args()
+
+    relatorio = {'meta': metadados(), 'resultados': executar(args.tamanhos, args.reruns)}
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.limite)
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,202 @@
+"""Benchmark dos caminhos quentes do app e do assistente sobre dados sintéticos.
+
+Gera as abas em vários tamanhos, roda cada caso contra a planilha falsa e o
+Gemini falso e grava os tempos em JSON para comparar entre commits.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_po --tamanhos 1000 100000 --saida resultados.json
+    python -m benchmarks.bench_po --tamanhos 1000 --saida nova.json --comparar resultados.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_planilha
+from benchmarks.falsos import ambiente_falso
+
+TAMANHOS_PADRAO = [1_000, 100_000]
+PERGUNTA_COMPLETA = "Qual meu dia mais produtivo e como está a qualidade dos critérios e a priorização das demandas?"
+
+# ==================== MEDIÇÃO ====================
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+def metadados():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform()
+    }
+
+# ==================== CASOS ====================
+def montar_casos(app, assistente):
+    """Casos de benchmark: nome -> função(contexto). O contexto guarda os frames já carregados"""
+    hoje = datetime.now()
+    inicio, fim = hoje - timedelta(days=90), hoje
+
+    def carregar(contexto):
+        contexto['melhorias'] = app.carregar_dados_aba("melhorias")
+        contexto['cerimonias'] = app.carregar_dados_aba("cerimonias_reunioes")
+        contexto['documentos'] = app.carregar_dados_aba("documentos_criterios")
+        contexto['demandas'] = app.carregar_dados_aba("demandas")
+
+    def filtrar_datas(contexto):
+        contexto['filtrados'] = {
+            'melhorias': app.aplicar_filtro_data(contexto['melhorias'], 'data_proposta', inicio, fim),
+            'cerimonias': app.aplicar_filtro_data(contexto['cerimonias'], 'data', inicio, fim),
+            'documentos': app.aplicar_filtro_data(contexto['documentos'], 'data', inicio, fim),
+            'demandas': app.aplicar_filtro_data(contexto['demandas'], 'data_avaliacao', inicio, fim)
+        }
+
+    def filtros_pagina(contexto):
+        app.filtrar_melhorias(contexto['melhorias'], ["Aprovada", "Implementada"], ["Alto"], "SIM")
+        app.filtrar_cerimonias(contexto['cerimonias'], ["Cerimônia"], "SIM", "plan")
+        app.filtrar_documentos(contexto['documentos'], ["User Story"], ["Entregue"])
+        app.filtrar_demandas(contexto['demandas'], ["Concluída"])
+
+    def figuras_dashboards(contexto):
+        filtrados = contexto['filtrados']
+        app.figuras_melhorias(filtrados['melhorias'])
+        app.figuras_cerimonias(filtrados['cerimonias'])
+        app.figuras_documentos(filtrados['documentos'])
+        app.figuras_demandas(filtrados['demandas'])
+
+    def agregados_diarios(contexto):
+        from tendencias import AGREGADORES_DIARIOS, combinar_agregados
+        contexto['diario'] = combinar_agregados([
+            AGREGADORES_DIARIOS[categoria](contexto[categoria]) for categoria in AGREGADORES_DIARIOS
+        ])
+
+    def tendencias(contexto):
+        app.figuras_tendencias(contexto['diario'], 30, "Janela móvel", inicio, fim, 'documentos')
+
+    def produtividade(contexto):
+        from produtividade import analisar_produtividade
+        analisar_produtividade(contexto['diario'])
+
+    def relatorio(contexto):
+        assistente.criar_relatorio_po_completo(contexto['filtrados'], PERGUNTA_COMPLETA)
+
+    def busca_registros(contexto):
+        from busca_texto import registros_relevantes
+        registros_relevantes(PERGUNTA_COMPLETA, contexto['filtrados'])
+
+    def busca_global(contexto):
+        from busca_texto import tabela_resultados
+        frames = {categoria: contexto[categoria] for categoria in ('melhorias', 'cerimonias', 'documentos', 'demandas')}
+        tabela_resultados("planning pagam", frames)
+
+    def analise_local(contexto):
+        assistente.analise_local_po(PERGUNTA_COMPLETA, contexto['filtrados'])
+
+    def assistente_completo(contexto):
+        assistente.consultar_assistente_po(PERGUNTA_COMPLETA, contexto['filtrados'], gemini_key='chave-falsa')
+
+    def assistente_preparado(contexto):
+        # Página aberta com os dados já preparados: o clique só paga o que depende da pergunta
+        assistente.preparar_relatorio_po(contexto['filtrados'])
+        assistente.consultar_assistente_po(PERGUNTA_COMPLETA, contexto['filtrados'], gemini_key='chave-falsa')
+
+    def assistente_local(contexto):
+        assistente.consultar_assistente_po(PERGUNTA_COMPLETA, contexto['filtrados'], tipo_modelo="Local (offline)")
+
+    return {
+        'carregar_abas': carregar,
+        'aplicar_filtro_data': filtrar_datas,
+        'filtros_pagina': filtros_pagina,
+        'figuras_dashboards': figuras_dashboards,
+        'agregados_diarios': agregados_diarios,
+        'tendencias': tendencias,
+        'produtividade': produtividade,
+        'criar_relatorio_po_completo': relatorio,
+        'registros_relevantes': busca_registros,
+        'busca_global': busca_global,
+        'analise_local_po': analise_local,
+        'consultar_assistente_po': assistente_completo,
+        'consultar_apos_preparar': assistente_preparado,
+        'consultar_assistente_local': assistente_local
+    }
+
+def executar(tamanhos, repeticoes, casos_selecionados=None):
+    import app
+    import assistente_po
+
+    resultados = []
+    for linhas in tamanhos:
+        tabelas = gerar_planilha(linhas)
+        contexto = {}
+        with ambiente_falso(tabelas):
+            for nome, funcao in montar_casos(app, assistente_po).items():
+                # Casos não selecionados ainda rodam uma vez: os seguintes dependem do contexto
+                if casos_selecionados and nome not in casos_selecionados:
+                    funcao(contexto)
+                    continue
+                tempos = cronometrar(lambda: funcao(contexto), repeticoes)
+                resultado = {
+                    'caso': nome,
+                    'linhas': linhas,
+                    'repeticoes': repeticoes,
+                    'min_s': min(tempos),
+                    'mediana_s': statistics.median(tempos),
+                    'media_s': statistics.fmean(tempos)
+                }
+                resultados.append(resultado)
+                print(f"{linhas:>9} linhas | {nome:<28} mediana {resultado['mediana_s'] * 1000:10.1f} ms")
+    return resultados
+
+# ==================== COMPARAÇÃO ====================
+def comparar(atual, anterior, limite):
+    """Compara medianas por (caso, linhas) e devolve os casos que pioraram além do limite"""
+    base = {(r['caso'], r['linhas']): r for r in anterior['resultados']}
+    regressoes = []
+    print(f"\nComparação com {anterior['meta'].get('commit')} (limite {limite:.2f}x):")
+    for resultado in atual['resultados']:
+        chave = (resultado['caso'], resultado['linhas'])
+        if chave not in base:
+            continue
+        razao = resultado['mediana_s'] / base[chave]['mediana_s'] if base[chave]['mediana_s'] > 0 else float('inf')
+        marcador = "⚠️" if razao > limite else "  "
+        print(f"{marcador} {resultado['linhas']:>9} linhas | {resultado['caso']:<28} {razao:6.2f}x")
+        if razao > limite:
+            regressoes.append({**resultado, 'razao': razao})
+    return regressoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO, help="linhas por aba (ex.: 1000 100000 1000000)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--casos', nargs='+', help="mede só estes casos")
+    parser.add_argument('--saida', default='bench_resultados.json', help="arquivo JSON de saída")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--limite', type=float, default=1.25, help="razão de mediana considerada regressão")
+    args = parser.parse_args()
+
+    relatorio = {'meta': metadados(), 'resultados': executar(args.tamanhos, args.repeticoes, args.casos)}
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.limite)
+        sys.exit(1 if regressoes else 0)
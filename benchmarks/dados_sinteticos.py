@@ -0,0 +1,105 @@
+"""Geração de abas sintéticas com o mesmo formato da planilha do PO.
+
+Os valores saem como texto/números exatamente como o `get_all_records` do
+gspread os devolve (datas 'dd/mm/aaaa', flags 'SIM'/'NÃO', células vazias '').
+"""
+import numpy as np
+import pandas as pd
+
+# ==================== VOCABULÁRIO ====================
+MELHORIAS = [
+    "Automatizar deploy de homologação", "Refinamento semanal do backlog", "Checklist de Definition of Ready",
+    "Template único de user story", "Dashboard de métricas da sprint", "Revisão de critérios de aceite com QA",
+    "Reduzir duração da daily", "Mapa de dependências entre squads", "Roadmap trimestral compartilhado"
+]
+BENEFICIOS = [
+    "Menos retrabalho na homologação", "Mais previsibilidade nas entregas", "Redução de dúvidas do time",
+    "Alinhamento com stakeholders", "Menor lead time", "Histórias mais claras para o desenvolvimento"
+]
+NOMES_CERIMONIAS = ["Daily", "Planning", "Review", "Retrospectiva", "Refinamento", "Alinhamento com stakeholders", "1:1 com tech lead"]
+DECISOES = ["Priorizar fluxo de login", "Adiar relatório financeiro", "Quebrar épico de pagamentos", "Incluir QA no refinamento", ""]
+RESULTADOS = ["Sprint planejada", "Impedimentos removidos", "Backlog priorizado", "Ações de melhoria definidas", ""]
+TIPOS_DOCUMENTO = ["User Story", "Especificação", "Layout", "Processo", "Relatório", "Critérios de Aceite"]
+ASSUNTOS = ["Login", "Fluxo de Pagamento", "Cadastro de Clientes", "Relatório Gerencial", "Notificações", "Checkout", "Perfil do Usuário"]
+OBSERVACOES = ["", "", "Aguardando validação do cliente", "Dúvidas sobre regra de negócio", "Feedback positivo do time"]
+
+# ==================== GERAÇÃO ====================
+def _datas(rng, linhas, dias_historico, fim=None):
+    fim = pd.Timestamp(fim or pd.Timestamp.today().normalize())
+    deslocamentos = rng.integers(0, dias_historico, linhas)
+    return fim - pd.to_timedelta(deslocamentos, unit='D')
+
+def _texto_datas(datas):
+    return np.asarray(datas.strftime('%d/%m/%Y'), dtype=object)
+
+def _sim_nao(rng, linhas, probabilidade_sim):
+    return np.where(rng.random(linhas) < probabilidade_sim, "SIM", "NÃO")
+
+def gerar_melhorias(linhas, rng, dias_historico=1095):
+    propostas = _datas(rng, linhas, dias_historico)
+    aplicada = rng.random(linhas) < 0.45
+    aplicacao = propostas + pd.to_timedelta(rng.integers(1, 60, linhas), unit='D')
+    return pd.DataFrame({
+        'melhoria_id': [f"MEL-{i:07d}" for i in range(1, linhas + 1)],
+        'data_proposta': _texto_datas(propostas),
+        'melhoria_proposta': rng.choice(MELHORIAS, linhas),
+        'descricao_detalhada': rng.choice(MELHORIAS, linhas) + " para o time de " + rng.choice(ASSUNTOS, linhas),
+        'beneficio_esperado': rng.choice(BENEFICIOS, linhas),
+        'melhoria_aplicada': np.where(aplicada, "SIM", "NÃO"),
+        'data_aplicacao': np.where(aplicada, _texto_datas(aplicacao), ""),
+        'status': rng.choice(["Proposta", "Em análise", "Aprovada", "Implementada"], linhas, p=[0.3, 0.2, 0.15, 0.35]),
+        'impacto': rng.choice(["Alto", "Médio", "Baixo"], linhas, p=[0.25, 0.5, 0.25])
+    })
+
+def gerar_cerimonias(linhas, rng, dias_historico=1095):
+    nomes = rng.choice(NOMES_CERIMONIAS, linhas, p=[0.45, 0.1, 0.1, 0.1, 0.1, 0.1, 0.05])
+    duracao_base = pd.Series(nomes).map({
+        "Daily": 15, "Planning": 120, "Review": 60, "Retrospectiva": 60,
+        "Refinamento": 90, "Alinhamento com stakeholders": 45, "1:1 com tech lead": 30
+    }).to_numpy()
+    return pd.DataFrame({
+        'data': _texto_datas(_datas(rng, linhas, dias_historico)),
+        'tipo': np.where(np.isin(nomes, ["Alinhamento com stakeholders", "1:1 com tech lead"]), "Reunião", "Cerimônia"),
+        'nome': nomes,
+        'presente': _sim_nao(rng, linhas, 0.85),
+        'duracao_minutos': duracao_base + rng.integers(-5, 16, linhas),
+        'participantes': rng.choice(["PO, Devs", "PO, Devs, QA", "PO, Stakeholders", "PO, Tech Lead"], linhas),
+        'objetivo': rng.choice(["Alinhar prioridades", "Planejar sprint", "Apresentar entregas", "Refinar histórias"], linhas),
+        'decisoes_acoes': rng.choice(DECISOES, linhas),
+        'resultado': rng.choice(RESULTADOS, linhas)
+    })
+
+def gerar_documentos(linhas, rng, dias_historico=1095):
+    tipos = rng.choice(TIPOS_DOCUMENTO, linhas, p=[0.4, 0.15, 0.1, 0.1, 0.1, 0.15])
+    return pd.DataFrame({
+        'data': _texto_datas(_datas(rng, linhas, dias_historico)),
+        'tipo_documento': tipos,
+        'nome_documento': [f"US-{i:07d}" for i in range(1, linhas + 1)] + pd.Series(rng.choice(ASSUNTOS, linhas)).radd(" - ").to_numpy(),
+        'tempo_minutos': rng.integers(15, 240, linhas),
+        'critérios_aceite': _sim_nao(rng, linhas, 0.7),
+        'template_padronizado': _sim_nao(rng, linhas, 0.6),
+        'status': rng.choice(["Rascunho", "Revisão", "Aprovado", "Entregue"], linhas, p=[0.15, 0.15, 0.2, 0.5]),
+        'observacoes': rng.choice(OBSERVACOES, linhas)
+    })
+
+def gerar_demandas(linhas, rng, dias_historico=1095):
+    total = rng.integers(5, 40, linhas)
+    return pd.DataFrame({
+        'data_avaliacao': _texto_datas(_datas(rng, linhas, dias_historico)),
+        'periodo': [f"Sprint {i}" for i in range(1, linhas + 1)],
+        'total_historias': total,
+        'historias_prioridade_definida': (total * rng.uniform(0.4, 1.0, linhas)).astype(int),
+        'historias_criterio_aceite': (total * rng.uniform(0.3, 1.0, linhas)).astype(int),
+        'status': rng.choice(["Em andamento", "Concluída"], linhas, p=[0.2, 0.8]),
+        'observacoes': rng.choice(OBSERVACOES, linhas)
+    })
+
+def gerar_planilha(linhas, semente=42):
+    """Gera as quatro abas com `linhas` registros (demandas, que é avaliação por período, recebe 1/10)"""
+    rng = np.random.default_rng(semente)
+    return {
+        'melhorias': gerar_melhorias(linhas, rng),
+        'cerimonias_reunioes': gerar_cerimonias(linhas, rng),
+        'documentos_criterios': gerar_documentos(linhas, rng),
+        'demandas': gerar_demandas(max(linhas // 10, 1), rng)
+    }
@@ -0,0 +1,174 @@
+"""Backends falsos para rodar o app e o assistente sem rede.
+
+`ambiente_falso` troca, enquanto o bloco `with` estiver ativo, a autenticação
+do gspread e os secrets do Streamlit por uma planilha em memória e o cliente
+do Gemini por um modelo determinístico. Para medir sem nem o Gemini falso, o
+provedor local (`provedores_llm.ProvedorLocal`) já roda offline.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import google.generativeai as genai
+import gspread
+import streamlit as st
+from google.oauth2.service_account import Credentials
+
+from alertas import aguardar_verificacoes
+from espacos import limpar_conexoes
+from provedores_llm import limpar_provedores
+
+SECRETS_FALSOS = {
+    'gcp_service_account': {'type': 'service_account', 'project_id': 'benchmark'},
+    'gemini': {'api_key': 'chave-falsa'}
+}
+
+# ==================== PLANILHA FALSA ====================
+class AbaFalsa:
+    def __init__(self, nome, registros, latencia=0.0, contador=None):
+        self.nome = nome
+        self.registros = registros
+        self.cabecalho = list(registros[0]) if registros else []
+        self.latencia = latencia
+        self.contador = contador
+        self._lock = threading.Lock()
+
+    def get_all_records(self):
+        if self.contador is not None:
+            self.contador.registrar(self.nome, 'get_all_records')
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            return [dict(registro) for registro in self.registros]
+
+    def append_row(self, linha):
+        if self.contador is not None:
+            self.contador.registrar(self.nome, 'append_row')
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            self.registros.append(dict(zip(self.cabecalho, linha)))
+
+class PlanilhaFalsa:
+    def __init__(self, abas):
+        self.abas = abas
+
+    def worksheet(self, nome):
+        if nome not in self.abas:
+            raise gspread.exceptions.WorksheetNotFound(nome)
+        return self.abas[nome]
+
+class ClienteFalso:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def set_timeout(self, timeout=None):
+        self.timeout = timeout
+
+    def open_by_url(self, url):
+        return self.planilha
+
+class ContadorChamadas:
+    """Conta as chamadas feitas ao backend falso, por aba e operação"""
+    def __init__(self):
+        self.chamadas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, aba, operacao):
+        with self._lock:
+            chave = (aba, operacao)
+            self.chamadas[chave] = self.chamadas.get(chave, 0) + 1
+
+    def total(self, aba=None, operacao=None):
+        return sum(
+            quantidade for (nome, op), quantidade in self.chamadas.items()
+            if (aba is None or nome == aba) and (operacao is None or op == operacao)
+        )
+
+def criar_planilha_falsa(tabelas, latencia=0.0, contador=None):
+    """Monta a planilha em memória a partir de {nome_aba: DataFrame}"""
+    return PlanilhaFalsa({
+        nome: AbaFalsa(nome, df.to_dict('records'), latencia, contador)
+        for nome, df in tabelas.items()
+    })
+
+# ==================== GEMINI FALSO ====================
+class ModeloFalso:
+    """Substituto determinístico do genai.GenerativeModel (com ou sem cache de contexto)"""
+    def __init__(self, model_name, latencia=0.0, tokens_cache=0, contador=None):
+        self.model_name = model_name
+        self.latencia = latencia
+        self.tokens_cache = tokens_cache
+        self.contador = contador
+
+    def generate_content(self, prompt, **kwargs):
+        if self.contador is not None:
+            self.contador.registrar('gemini', 'generate_content')
+        if self.latencia:
+            time.sleep(self.latencia)
+        texto = f"## 🎯 Resposta Direta\nResposta simulada ({self.model_name}) para um prompt de {len(str(prompt))} caracteres."
+        return SimpleNamespace(
+            text=texto,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(str(prompt)) // 4 + self.tokens_cache,
+                candidates_token_count=len(texto) // 4,
+                cached_content_token_count=self.tokens_cache,
+                total_token_count=(len(str(prompt)) + len(texto)) // 4 + self.tokens_cache
+            )
+        )
+
+class FabricaModelosFalsos:
+    """Faz as vezes da classe genai.GenerativeModel, inclusive do `from_cached_content`"""
+    def __init__(self, latencia=0.0, contador=None):
+        self.latencia = latencia
+        self.contador = contador
+
+    def __call__(self, model_name, **kwargs):
+        return ModeloFalso(model_name, self.latencia, contador=self.contador)
+
+    def from_cached_content(self, cached_content, **kwargs):
+        return ModeloFalso(cached_content.model, self.latencia, cached_content.tokens, self.contador)
+
+def criar_cache_falso(model, contents, ttl=None, **kwargs):
+    """Substituto do genai.caching.CachedContent.create"""
+    return SimpleNamespace(model=model, tokens=sum(len(str(parte)) for item in contents for parte in item['parts']) // 4, delete=lambda: None)
+
+# ==================== AMBIENTE ====================
+@contextlib.contextmanager
+def ambiente_falso(tabelas, latencia_planilha=0.0, latencia_llm=0.0, contador=None):
+    """Ativa a planilha falsa, os secrets falsos e o Gemini falso dentro do bloco"""
+    planilha = criar_planilha_falsa(tabelas, latencia_planilha, contador)
+
+    def autorizar(creds):
+        if contador is not None:
+            contador.registrar('cliente', 'authorize')
+        return ClienteFalso(planilha)
+
+    with contextlib.ExitStack() as pilha:
+        pilha.enter_context(mock.patch.object(st, 'secrets', SECRETS_FALSOS))
+        # A planilha falsa não tem cota; sem isso o benchmark mediria os snapshots
+        pilha.enter_context(mock.patch.dict(os.environ, {'PO_SHEETS_COTA_MINUTO': '1000000'}))
+        # Telemetria do assistente e alertas em bancos temporários, fora do diretório do projeto
+        diretorio = pilha.enter_context(tempfile.TemporaryDirectory())
+        # A verificação de alertas roda em segundo plano: termina antes de o diretório ser apagado
+        pilha.callback(aguardar_verificacoes)
+        pilha.enter_context(mock.patch.dict(os.environ, {
+            'PO_TELEMETRIA_ARQUIVO': os.path.join(diretorio, 'telemetria.sqlite3'),
+            'PO_ALERTAS_ARQUIVO': os.path.join(diretorio, 'alertas.sqlite3')
+        }))
+        pilha.enter_context(mock.patch.object(gspread, 'authorize', autorizar))
+        pilha.enter_context(mock.patch.object(Credentials, 'from_service_account_info', lambda info, scopes=None: object()))
+        pilha.enter_context(mock.patch.object(genai, 'configure', lambda **kwargs: None))
+        pilha.enter_context(mock.patch.object(genai, 'GenerativeModel', FabricaModelosFalsos(latencia_llm, contador)))
+        pilha.enter_context(mock.patch.object(genai.caching.CachedContent, 'create', criar_cache_falso))
+        # Provedores são de longa duração: nenhum cliente real entra no bloco nem falso sai dele
+        limpar_provedores()
+        pilha.callback(limpar_provedores)
+        # O mesmo vale para as conexões ao Sheets de cada espaço
+        limpar_conexoes()
+        pilha.callback(limpar_conexoes)
+        yield planilha
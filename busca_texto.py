@@ -0,0 +1,389 @@
+"""Busca textual (BM25) sobre os campos livres das abas.
+
+O sinal mais útil para o assistente está nos textos livres (descrição, benefício,
+decisões, resultado, observações). Um índice invertido único, por processo, guarda
+esses textos; a cada pergunta só as linhas novas ou editadas são (re)indexadas,
+comparando um hash do texto de cada registro. O assistente então manda ao modelo
+apenas os k registros mais relevantes, com o prompt de tamanho limitado.
+
+O mesmo índice atende a busca global do app: sem acentos, com prefixo
+("pag" encontra "pagamento") e ranqueada, sem varrer as linhas a cada tecla.
+Com várias planilhas (ver `espacos`), cada espaço tem o seu índice, escolhido
+por `df.attrs['espaco']`.
+"""
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# ==================== CONSTANTES ====================
+# Campos indexados por categoria: o título ajuda a identificar o registro no prompt
+CAMPOS_TEXTO = {
+    'melhorias': ['melhoria_proposta', 'descricao_detalhada', 'beneficio_esperado'],
+    'cerimonias': ['nome', 'objetivo', 'decisoes_acoes', 'resultado'],
+    'documentos': ['nome_documento', 'observacoes'],
+    'demandas': ['periodo', 'observacoes']
+}
+
+# Colunas mostradas ao modelo para cada registro encontrado
+COLUNAS_CONTEXTO = {
+    'melhorias': ['data_proposta', 'status', 'impacto'],
+    'cerimonias': ['data', 'tipo', 'presente'],
+    'documentos': ['data', 'tipo_documento', 'status'],
+    'demandas': ['data_avaliacao', 'status']
+}
+
+STOPWORDS = {
+    'a', 'ao', 'aos', 'as', 'com', 'como', 'da', 'das', 'de', 'do', 'dos', 'e', 'em', 'entre', 'esta', 'este',
+    'isso', 'mais', 'mas', 'me', 'meu', 'meus', 'minha', 'minhas', 'na', 'nas', 'no', 'nos', 'o', 'os', 'ou',
+    'para', 'pela', 'pelas', 'pelo', 'pelos', 'por', 'qual', 'quais', 'quando', 'que', 'se', 'sem', 'ser',
+    'sobre', 'sua', 'suas', 'seu', 'seus', 'um', 'uma', 'umas', 'uns', 'foi', 'sao', 'tem', 'ter', 'esta', 'estao'
+}
+
+# Título e data de cada categoria, para listar os resultados da busca
+CAMPO_TITULO = {'melhorias': 'melhoria_proposta', 'cerimonias': 'nome', 'documentos': 'nome_documento', 'demandas': 'periodo'}
+CAMPO_DATA = {'melhorias': 'data_proposta', 'cerimonias': 'data', 'documentos': 'data', 'demandas': 'data_avaliacao'}
+
+K_REGISTROS = 8
+LIMITE_EXPANSAO_PREFIXO = 50  # termos do vocabulário considerados por prefixo digitado
+PESO_PREFIXO = 0.7  # um termo que só começa com o digitado vale menos que o termo exato
+MAX_CARACTERES_CAMPO = 300
+
+# ==================== TOKENIZAÇÃO ====================
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Decisões' e 'decisoes' viram o mesmo termo"""
+    decomposto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+def normalizar_serie(textos):
+    """`normalizar` vetorizado para uma Series inteira"""
+    return textos.str.lower().str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+
+def termos_normalizados(texto):
+    return [termo for termo in re.findall(r"[a-z0-9]+", texto) if len(termo) > 1 and termo not in STOPWORDS]
+
+def tokenizar(texto):
+    return termos_normalizados(normalizar(texto))
+
+def termos_consulta(consulta, prefixo=False):
+    """Termos distintos da consulta; com prefixo, o último digitado fica mesmo curto ou stopword ("da" -> daily)"""
+    brutos = re.findall(r"[a-z0-9]+", normalizar(consulta))
+    termos = termos_normalizados(" ".join(brutos))
+    if prefixo and brutos and brutos[-1] not in termos:
+        termos.append(brutos[-1])
+    return list(dict.fromkeys(termos))
+
+# ==================== ÍNDICE BM25 ====================
+class IndiceBM25:
+    """Índice invertido com pontuação BM25 e inserção/remoção incremental.
+
+    Cada documento é um registro (categoria, rótulo). As postings ficam em dicts
+    para a atualização incremental e são materializadas em arrays numpy, por termo,
+    só quando consultadas (o cache do termo cai quando ele muda); a pontuação é
+    então vetorizada sobre um vetor denso com uma posição por documento.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._ids = {}
+        self._codigos = {}
+        self._categorias = np.zeros(1024, dtype=np.int16)
+        self._rotulos = np.empty(1024, dtype=object)
+        self._comprimentos = np.zeros(1024)
+        self._termos_doc = {}
+        self._postings = {}
+        self._arrays = {}
+        self._vocabulario = []  # termos em ordem, para expandir prefixos com bisect
+        self._comprimento_total = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._termos_doc)
+
+    def __contains__(self, doc):
+        return self._ids.get(doc) in self._termos_doc
+
+    def _id(self, categoria, rotulo):
+        id_doc = self._ids.get((categoria, rotulo))
+        if id_doc is None:
+            id_doc = len(self._ids)
+            if id_doc == len(self._comprimentos):
+                capacidade = 2 * id_doc
+                self._categorias = np.resize(self._categorias, capacidade)
+                self._rotulos = np.resize(self._rotulos, capacidade)
+                self._comprimentos = np.concatenate([self._comprimentos, np.zeros(capacidade - id_doc)])
+            self._ids[(categoria, rotulo)] = id_doc
+            self._categorias[id_doc] = self._codigos.setdefault(categoria, len(self._codigos))
+            self._rotulos[id_doc] = rotulo
+        return id_doc
+
+    def _remover_id(self, id_doc):
+        termos = self._termos_doc.pop(id_doc, None)
+        if termos is None:
+            return
+        for termo in termos:
+            postings = self._postings[termo]
+            del postings[id_doc]
+            self._arrays.pop(termo, None)
+            if not postings:
+                del self._postings[termo]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, termo)]
+        self._comprimento_total -= self._comprimentos[id_doc]
+        self._comprimentos[id_doc] = 0
+
+    def remover(self, categoria, rotulo):
+        with self._lock:
+            id_doc = self._ids.get((categoria, rotulo))
+            if id_doc is not None:
+                self._remover_id(id_doc)
+
+    def adicionar(self, categoria, rotulo, texto):
+        """Indexa (ou reindexa) o registro"""
+        self.adicionar_termos(categoria, rotulo, Counter(tokenizar(texto)))
+
+    def adicionar_termos(self, categoria, rotulo, termos):
+        """Indexa o registro a partir da contagem de termos já calculada (o Counter não é alterado)"""
+        with self._lock:
+            id_doc = self._id(categoria, rotulo)
+            self._remover_id(id_doc)
+            for termo, frequencia in termos.items():
+                postings = self._postings.get(termo)
+                if postings is None:
+                    postings = self._postings[termo] = {}
+                    bisect.insort(self._vocabulario, termo)
+                postings[id_doc] = frequencia
+                self._arrays.pop(termo, None)
+            self._termos_doc[id_doc] = termos
+            comprimento = sum(termos.values())
+            self._comprimentos[id_doc] = comprimento
+            self._comprimento_total += comprimento
+
+    def termos_com_prefixo(self, prefixo, limite=LIMITE_EXPANSAO_PREFIXO):
+        """Termos do vocabulário que começam com `prefixo` (o próprio termo incluído)"""
+        with self._lock:
+            inicio = bisect.bisect_left(self._vocabulario, prefixo)
+            termos = []
+            for termo in self._vocabulario[inicio:inicio + limite]:
+                if not termo.startswith(prefixo):
+                    break
+                termos.append(termo)
+            return termos
+
+    def _arrays_termo(self, termo):
+        arrays = self._arrays.get(termo)
+        if arrays is None:
+            postings = self._postings[termo]
+            arrays = self._arrays[termo] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            )
+        return arrays
+
+    def pontuar(self, consulta, prefixo=False):
+        """Pontuação BM25 de todos os registros que casam: arrays (ids, pontuações).
+
+        Com `prefixo`, cada termo digitado também casa com os termos que começam
+        com ele; por termo digitado vale a melhor das expansões, não a soma.
+        """
+        termos = termos_consulta(consulta, prefixo)
+        with self._lock:
+            total_docs = len(self._termos_doc)
+            if not termos or not total_docs:
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            fixo = self.k1 * (1 - self.b)
+            escala = self.k1 * self.b / (self._comprimento_total / total_docs or 1)
+            pontuacao = np.zeros(len(self._ids))
+            for termo in termos:
+                expansoes = self.termos_com_prefixo(termo) if prefixo else [termo]
+                melhor = np.zeros(len(self._ids))
+                for expandido in expansoes:
+                    if expandido not in self._postings:
+                        continue
+                    ids, frequencias = self._arrays_termo(expandido)
+                    peso = 1.0 if expandido == termo else PESO_PREFIXO
+                    idf = peso * math.log(1 + (total_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                    valores = idf * frequencias * (self.k1 + 1) / (frequencias + fixo + escala * self._comprimentos[ids])
+                    # Dentro de um termo os ids são únicos: o máximo entre expansões sai sem ufunc.at
+                    melhor[ids] = np.maximum(melhor[ids], valores)
+                pontuacao += melhor
+            ids = np.flatnonzero(pontuacao)
+            return ids, pontuacao[ids]
+
+    def filtrar_categoria(self, ids, categoria):
+        """Máscara dos ids que pertencem à categoria e os rótulos correspondentes"""
+        codigo = self._codigos.get(categoria, -1)
+        mascara = self._categorias[ids] == codigo
+        return mascara, self._rotulos[ids[mascara]]
+
+    def buscar(self, consulta, k=10, prefixo=False):
+        """[((categoria, rótulo), pontuação)] dos k registros de maior pontuação"""
+        ids, pontuacao = self.pontuar(consulta, prefixo)
+        ordem = np.argsort(-pontuacao, kind='stable')[:k]
+        categorias = {codigo: categoria for categoria, codigo in self._codigos.items()}
+        return [((categorias[self._categorias[ids[i]]], self._rotulos[ids[i]]), pontuacao[i]) for i in ordem]
+
+# ==================== ÍNDICE DO PROCESSO ====================
+_INDICE = IndiceBM25()
+_INDICES_ESPACOS = {}
+_HASHES = {}
+_VERSOES = {}
+_LOCK_SINCRONIZACAO = threading.Lock()
+
+def textos_registros(df, campos):
+    """Concatena os campos de texto de cada registro (vetorizado, sem apply por linha)"""
+    presentes = [campo for campo in campos if campo in df.columns]
+    if not presentes or df.empty:
+        return pd.Series(dtype=str)
+    textos = df[presentes[0]].fillna('').astype(str)
+    for campo in presentes[1:]:
+        textos = textos + " " + df[campo].fillna('').astype(str)
+    return textos
+
+def carga_completa(df):
+    """A aba inteira como lida da planilha, e não um recorte (filtros herdam os attrs, mas não o número de linhas)"""
+    return 'versao' in df.attrs and df.attrs.get('linhas_carregadas') == len(df)
+
+def sincronizar_indice(categoria, df, indice=None):
+    """Indexa só os registros novos ou com texto alterado desde a última sincronização.
+
+    Numa carga completa, os registros que sumiram da planilha também saem do índice.
+    """
+    indice = _INDICE if indice is None else indice
+    chave = (id(indice), categoria)
+    # Mesmo frame da última sincronização (mesma versão de leitura, mesmas linhas): nada a fazer
+    assinatura = (df.attrs.get('versao'), len(df), df.index[0] if len(df) else None, df.index[-1] if len(df) else None)
+    if assinatura[0] is not None and _VERSOES.get(chave) == assinatura:
+        return 0
+    textos = textos_registros(df, CAMPOS_TEXTO.get(categoria, []))
+    if textos.empty:
+        return 0
+    hashes = pd.util.hash_pandas_object(textos, index=False)
+    with _LOCK_SINCRONIZACAO:
+        anteriores = _HASHES.get(chave, pd.Series(dtype='uint64'))
+        # Compara só os rótulos já vistos: reindexar um uint64 viraria float e perderia precisão
+        conhecidos = hashes.index.isin(anteriores.index)
+        mudou = ~conhecidos
+        if conhecidos.any():
+            rotulos = hashes.index[conhecidos]
+            mudou[conhecidos] = hashes.loc[rotulos].to_numpy() != anteriores.loc[rotulos].to_numpy()
+        alterados = hashes.index[mudou]
+        if len(alterados):
+            # Textos repetidos são comuns (benefícios, resultados): tokeniza cada texto distinto uma vez
+            codigos, unicos = pd.factorize(normalizar_serie(textos.loc[alterados]))
+            termos_unicos = [Counter(termos_normalizados(texto)) for texto in unicos]
+            for rotulo, codigo in zip(alterados, codigos):
+                indice.adicionar_termos(categoria, rotulo, termos_unicos[codigo])
+        ausentes = ~anteriores.index.isin(hashes.index)
+        removidos = carga_completa(df) and ausentes.any()
+        if removidos:
+            # Linhas apagadas da planilha distorceriam o IDF e o comprimento médio, e ocupariam memória
+            for rotulo in anteriores.index[ausentes]:
+                indice.remover(categoria, rotulo)
+            ausentes[:] = False
+        if len(alterados) or removidos:
+            _HASHES[chave] = pd.concat([anteriores[ausentes], hashes])
+        _VERSOES[chave] = assinatura
+    return len(alterados)
+
+def indice_dos_frames(frames):
+    """Índice do espaço dos frames (df.attrs['espaco']); o índice do processo quando não há espaço"""
+    for df in frames.values():
+        espaco = df.attrs.get('espaco')
+        if espaco is not None:
+            with _LOCK_SINCRONIZACAO:
+                return _INDICES_ESPACOS.setdefault(espaco, IndiceBM25())
+    return _INDICE
+
+def sincronizar_frames(frames, indice=None):
+    """Sincroniza o índice com todos os frames indexáveis; devolve (índice, frames indexáveis)"""
+    indice = indice_dos_frames(frames) if indice is None else indice
+    frames = {categoria: df for categoria, df in frames.items() if categoria in CAMPOS_TEXTO and not df.empty}
+    for categoria, df in frames.items():
+        sincronizar_indice(categoria, df, indice)
+    return indice, frames
+
+def buscar_nos_frames(consulta, frames, k=None, prefixo=False, indice=None):
+    """Resultados da consulta restritos às linhas dos frames: DataFrame (categoria, rotulo, pontuacao)"""
+    indice, frames = sincronizar_frames(frames, indice)
+
+    ids, pontuacao = indice.pontuar(consulta, prefixo)
+    # Só as linhas presentes nos frames recebidos (filtros de data, status...), de forma vetorizada
+    categorias, rotulos, valores = [], [], []
+    for categoria, df in frames.items():
+        mascara, da_categoria = indice.filtrar_categoria(ids, categoria)
+        if not len(da_categoria):
+            continue
+        if pd.api.types.is_integer_dtype(df.index.dtype):
+            da_categoria = da_categoria.astype(np.int64)
+        presentes = pd.Index(da_categoria).isin(df.index)
+        categorias.append(np.full(presentes.sum(), categoria, dtype=object))
+        rotulos.append(da_categoria[presentes])
+        valores.append(pontuacao[mascara][presentes])
+    if not valores or not sum(map(len, valores)):
+        return pd.DataFrame(columns=['categoria', 'rotulo', 'pontuacao'])
+
+    valores = np.concatenate(valores)
+    # Ordena só os k primeiros (argpartition) em vez de todos os registros que casaram
+    if k is not None and k < len(valores):
+        ordem = np.argpartition(-valores, k - 1)[:k]
+        ordem = ordem[np.argsort(-valores[ordem], kind='stable')]
+    else:
+        ordem = np.argsort(-valores, kind='stable')
+    return pd.DataFrame({
+        'categoria': np.concatenate(categorias)[ordem],
+        'rotulo': np.concatenate(rotulos)[ordem],
+        'pontuacao': valores[ordem]
+    })
+
+def registros_relevantes(pergunta, dados_disponiveis, k=K_REGISTROS, indice=None):
+    """[(categoria, rótulo, pontuação)] dos registros mais relevantes entre os frames recebidos"""
+    resultados = buscar_nos_frames(pergunta, dados_disponiveis, k, indice=indice)
+    return list(resultados.itertuples(index=False, name=None))
+
+def rotulos_correspondentes(categoria, df, consulta, indice=None):
+    """Rótulos das linhas de `df` que casam com a consulta (com prefixo), em ordem de relevância"""
+    resultados = buscar_nos_frames(consulta, {categoria: df}, prefixo=True, indice=indice)
+    return pd.Index(resultados['rotulo'])
+
+def tabela_resultados(consulta, frames, k=50, indice=None):
+    """Resultados da busca global prontos para exibir: categoria, data, título, trecho e relevância"""
+    resultados = buscar_nos_frames(consulta, frames, k, prefixo=True, indice=indice)
+    if resultados.empty:
+        return pd.DataFrame(columns=['categoria', 'data', 'título', 'trecho', 'relevância'])
+    partes = []
+    for categoria, grupo in resultados.groupby('categoria', sort=False):
+        # Um .loc por categoria em vez de um por resultado
+        registros = frames[categoria].loc[grupo['rotulo']]
+        campos_trecho = [campo for campo in CAMPOS_TEXTO[categoria][1:] if campo in registros.columns]
+        trecho = textos_registros(registros, campos_trecho).str.strip() if campos_trecho else pd.Series("", index=registros.index)
+        data = registros[CAMPO_DATA[categoria]] if CAMPO_DATA[categoria] in registros.columns else pd.Series(pd.NaT, index=registros.index)
+        partes.append(pd.DataFrame({
+            'categoria': categoria,
+            'data': data.dt.strftime('%d/%m/%Y').to_numpy() if pd.api.types.is_datetime64_any_dtype(data) else data.to_numpy(),
+            'título': registros[CAMPO_TITULO[categoria]].to_numpy() if CAMPO_TITULO[categoria] in registros.columns else None,
+            'trecho': trecho.str.slice(0, 160).to_numpy(),
+            'relevância': grupo['pontuacao'].round(2).to_numpy()
+        }))
+    return pd.concat(partes, ignore_index=True).sort_values('relevância', ascending=False, kind='stable').reset_index(drop=True)
+
+def formatar_registros(resultados, dados_disponiveis, max_caracteres=MAX_CARACTERES_CAMPO):
+    """Texto compacto dos registros encontrados, para entrar no prompt"""
+    linhas = []
+    for categoria, rotulo, pontuacao in resultados:
+        registro = dados_disponiveis[categoria].loc[rotulo]
+        partes = []
+        for campo in COLUNAS_CONTEXTO.get(categoria, []) + CAMPOS_TEXTO[categoria]:
+            valor = registro.get(campo)
+            if valor is None or pd.isna(valor) or str(valor).strip() == "":
+                continue
+            if isinstance(valor, pd.Timestamp):
+                valor = valor.strftime('%d/%m/%Y')
+            partes.append(f"{campo}: {str(valor)[:max_caracteres]}")
+        linhas.append(f"- [{categoria}] " + " | ".join(partes))
+    return "\n".join(linhas)
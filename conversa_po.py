@@ -0,0 +1,176 @@
+"""Modo conversa do assistente: perguntas encadeadas sobre os mesmos dados.
+
+O contexto de dados (instruções e relatório com todas as seções) é montado uma
+vez por versão dos dados e vai ao provedor como contexto reaproveitável (ver
+`provedores_llm`); a cada pergunta só saem o histórico e a pergunta nova com os
+seus registros relevantes. Quando o histórico passa do orçamento de tokens, os
+turnos mais antigos viram um resumo curto e só os recentes seguem na íntegra.
+
+Como o restante do núcleo do assistente, não depende do Streamlit: a sessão do
+app guarda a `ConversaPO` e a tela só exibe os turnos.
+
+    PO_CONVERSA_ORCAMENTO_TOKENS=4000   tokens de histórico antes de resumir
+"""
+import os
+import re
+import time
+from collections import namedtuple
+
+from assistente_po import (
+    CONTEXTO_AREAS_PO, FORMATO_RESPOSTA_PO, INSTRUCOES_PO, PAPEL_PO, SECOES_RELATORIO,
+    analise_local_po, assinatura_dados, iniciar_relatorio_po, mensagem_pergunta
+)
+from busca_texto import formatar_registros, registros_relevantes
+from provedores_llm import PROVEDORES, estimar_tokens, obter_provedor, resolver_modelo
+from rastreamento import span
+from telemetria_llm import estimar_custo, registrar_chamada
+
+ORCAMENTO_TOKENS = 4000
+TURNOS_RECENTES = 2
+MAX_CARACTERES_RESUMO_TURNO = 280
+AVISO_DADOS_ATUALIZADOS = "OBS.: os dados foram atualizados (período, filtros ou planilha) desde a resposta anterior; use o contexto atual."
+
+# `local`: resposta da análise local (sem chave ou falha do modelo), só para exibir; não vai ao modelo
+Turno = namedtuple('Turno', ['pergunta', 'resposta', 'local'], defaults=(False,))
+
+# ==================== CONTEXTO ====================
+def montar_contexto_conversa(relatorio):
+    """Parte fixa da conversa: papel, relatório completo, instruções e formato da resposta"""
+    return f"""{PAPEL_PO}
+
+DADOS COMPLETOS DISPONÍVEIS:
+{relatorio}
+
+{CONTEXTO_AREAS_PO}
+{INSTRUCOES_PO}- Esta é uma conversa: cada mensagem traz uma pergunta e os registros relevantes para ela; leve em conta as respostas anteriores
+
+{FORMATO_RESPOSTA_PO}"""
+
+def resumir_turno(turno):
+    """Uma linha por turno: a pergunta e a primeira frase útil da resposta"""
+    linhas = [linha.strip() for linha in turno.resposta.splitlines()]
+    essencial = next((linha for linha in linhas if linha and not linha.startswith('#')), "")
+    essencial = re.sub(r"\s+", " ", essencial)[:MAX_CARACTERES_RESUMO_TURNO]
+    return f"- Pergunta: {turno.pergunta.strip()} → {essencial}"
+
+# ==================== CONVERSA ====================
+class ConversaPO:
+    """Histórico de uma conversa com o assistente (uma por sessão)"""
+    def __init__(self, orcamento_tokens=None, turnos_recentes=TURNOS_RECENTES):
+        self.orcamento_tokens = orcamento_tokens or int(os.getenv('PO_CONVERSA_ORCAMENTO_TOKENS', ORCAMENTO_TOKENS))
+        self.turnos_recentes = turnos_recentes
+        self.limpar()
+
+    def limpar(self):
+        self.turnos = []
+        self.resumidos = 0  # turnos do início já condensados em `resumo`
+        self.resumo = ""
+        self.assinatura = None
+        self.contexto = None
+        self.tokens = {'prompt': 0, 'cache': 0, 'resposta': 0}
+
+    def mensagens(self):
+        """Histórico a enviar, como (papel, texto): o resumo dos turnos antigos e os recentes na íntegra"""
+        mensagens = []
+        if self.resumo:
+            mensagens += [('user', f"RESUMO DA CONVERSA ATÉ AQUI:\n{self.resumo}"), ('model', "Certo, vou considerar esse histórico.")]
+        for turno in self.turnos[self.resumidos:]:
+            if not turno.local:
+                mensagens += [('user', turno.pergunta), ('model', turno.resposta)]
+        return mensagens
+
+    def tokens_historico(self):
+        return sum(estimar_tokens(texto) for _, texto in self.mensagens())
+
+    def adicionar(self, pergunta, resposta, local=False):
+        """Registra o turno e, se o histórico passou do orçamento, resume os turnos mais antigos"""
+        self.turnos.append(Turno(pergunta, resposta, local))
+        while self.tokens_historico() > self.orcamento_tokens and len(self.turnos) - self.resumidos > self.turnos_recentes:
+            if not self.turnos[self.resumidos].local:
+                self.resumo += resumir_turno(self.turnos[self.resumidos]) + "\n"
+            self.resumidos += 1
+        # O resumo também tem teto: ficam as linhas mais recentes
+        linhas = self.resumo.splitlines()
+        while len(linhas) > 1 and estimar_tokens("\n".join(linhas)) > self.orcamento_tokens // 2:
+            linhas.pop(0)
+        self.resumo = "\n".join(linhas) + "\n" if linhas else ""
+
+    def atualizar_contexto(self, dados_disponiveis):
+        """Remonta o contexto só quando os dados mudaram; True se mudou no meio da conversa"""
+        assinatura = assinatura_dados(dados_disponiveis)
+        if assinatura is not None and assinatura == self.assinatura and self.contexto is not None:
+            return False
+        with span("conversa.montar_contexto"):
+            relatorio = iniciar_relatorio_po(dados_disponiveis, "", secoes=list(SECOES_RELATORIO))()
+            contexto = montar_contexto_conversa(relatorio)
+        mudou = self.contexto is not None and contexto != self.contexto
+        self.assinatura, self.contexto = assinatura, contexto
+        return mudou
+
+def conversar_assistente_po(pergunta, dados_disponiveis, conversa, tipo_modelo="Gemini Pro", gemini_key=None, avisar=print):
+    """Responde a uma pergunta da conversa enviando só o histórico e a pergunta nova (o contexto é reaproveitado)"""
+    inicio = time.perf_counter()
+    provedor_nome, modelo = resolver_modelo(tipo_modelo)
+    if not gemini_key:
+        gemini_key = os.getenv('GEMINI_API_KEY')
+
+    if not dados_disponiveis or all(df.empty for df in dados_disponiveis.values()):
+        return "❌ Não há dados disponíveis para análise com os filtros atuais."
+
+    if not gemini_key and PROVEDORES[provedor_nome].requer_chave:
+        print("❌ Chave da API Gemini não encontrada. Verifique seu arquivo .env ou configurações.")
+        avisar("Modo fallback ativado - usando análise local sem IA")
+        resposta = analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        conversa.adicionar(pergunta, resposta, local=True)
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, fallback=True, motivo_fallback="sem chave",
+            latencia_total_ms=(time.perf_counter() - inicio) * 1000
+        )
+        return resposta
+
+    try:
+        print(f"💬 Conversa com {provedor_nome} ({modelo}), turno {len(conversa.turnos) + 1}: {pergunta}")
+        dados_mudaram = conversa.atualizar_contexto(dados_disponiveis)
+
+        with span("busca.registros_relevantes") as atributos:
+            encontrados = registros_relevantes(pergunta, dados_disponiveis)
+            registros_texto = formatar_registros(encontrados, dados_disponiveis)
+            atributos['registros'] = len(encontrados)
+
+        with span("llm.obter_provedor", provedor=provedor_nome, modelo=modelo):
+            provedor = obter_provedor(provedor_nome, modelo, gemini_key if PROVEDORES[provedor_nome].requer_chave else None)
+
+        nova = mensagem_pergunta(pergunta, registros_texto)
+        if dados_mudaram:
+            nova = f"{AVISO_DADOS_ATUALIZADOS}\n\n{nova}"
+        mensagens = conversa.mensagens() + [('user', nova)]
+
+        bytes_prompt = sum(len(texto.encode('utf-8')) for _, texto in mensagens)
+        with span("llm.conversar", modelo=modelo, bytes_prompt=bytes_prompt, turno=len(conversa.turnos) + 1) as atributos:
+            inicio_llm = time.perf_counter()
+            resposta = provedor.conversar(conversa.contexto, mensagens)
+            latencia_llm_ms = (time.perf_counter() - inicio_llm) * 1000
+            atributos['bytes_resposta'] = len(resposta.texto.encode('utf-8'))
+
+        conversa.adicionar(pergunta, resposta.texto)
+        conversa.tokens['prompt'] += resposta.tokens_prompt
+        conversa.tokens['cache'] += resposta.tokens_cache
+        conversa.tokens['resposta'] += resposta.tokens_resposta
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, bytes_prompt=bytes_prompt,
+            latencia_llm_ms=latencia_llm_ms, latencia_total_ms=(time.perf_counter() - inicio) * 1000,
+            tokens_prompt=resposta.tokens_prompt, tokens_resposta=resposta.tokens_resposta, tokens_cache=resposta.tokens_cache,
+            custo_usd=estimar_custo(modelo, resposta.tokens_prompt, resposta.tokens_resposta, resposta.tokens_cache),
+            cache_hit=resposta.tokens_cache > 0
+        )
+        return resposta.texto
+
+    except Exception as e:
+        print(f"❌ Erro na conversa com a IA: {str(e)}")
+        resposta = analise_local_po(pergunta, dados_disponiveis, is_fallback_mode=True)
+        conversa.adicionar(pergunta, resposta, local=True)
+        registrar_chamada(
+            modelo=modelo, pergunta=pergunta, fallback=True, motivo_fallback=type(e).__name__,
+            latencia_total_ms=(time.perf_counter() - inicio) * 1000
+        )
+        return resposta
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# ==================== CONSTANTES ====================
+FORMATO_DATA = '%d/%m/%Y'
+
+# Colunas de data de cada aba da planilha, convertidas uma única vez no carregamento
+COLUNAS_DATA = {
+    'melhorias': ['data_proposta', 'data_aplicacao'],
+    'cerimonias_reunioes': ['data'],
+    'documentos_criterios': ['data'],
+    'demandas': ['data_avaliacao']
+}
+
+# Coluna de data que define o período de cada categoria usada nas análises
+COLUNAS_PERIODO = {
+    'melhorias': 'data_proposta',
+    'cerimonias': 'data',
+    'documentos': 'data',
+    'demandas': 'data_avaliacao'
+}
+
+# Colunas numéricas de cada aba: células vazias viram NaN em vez de quebrar somas
+COLUNAS_NUMERICAS = {
+    'cerimonias_reunioes': ['duracao_minutos'],
+    'documentos_criterios': ['tempo_minutos'],
+    'demandas': ['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']
+}
+
+# ==================== COPY-ON-WRITE ====================
+def ativar_copy_on_write():
+    """Liga o copy-on-write no pandas 2.x; no 3.x ele é sempre ativo (e a opção, obsoleta)"""
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+# Frames em cache são compartilhados entre reruns e sessões: filtros e colunas derivadas
+# só copiam o que de fato escrevem, e nenhuma escrita chega ao frame original
+ativar_copy_on_write()
+
+# ==================== CONVERSÃO ====================
+def _converter_valores(valores):
+    """Converte valores de texto: formato fixo, depois ISO 8601, depois parser flexível com dayfirst"""
+    convertidas = pd.to_datetime(valores, format=FORMATO_DATA, errors='coerce')
+
+    nulas = convertidas.isna()
+    if not nulas.any():
+        return convertidas
+
+    resto = valores[nulas].astype('string').str.strip()
+    resto = resto[resto.notna() & (resto != '')]
+    if not resto.empty:
+        # ISO primeiro: com dayfirst=True o parser flexível inverteria dia e mês de 'aaaa-mm-dd'
+        recuperadas = pd.to_datetime(resto, format='ISO8601', errors='coerce')
+        pendentes = recuperadas.isna()
+        if pendentes.any():
+            recuperadas.loc[pendentes] = pd.to_datetime(resto[pendentes], dayfirst=True, format='mixed', errors='coerce')
+        convertidas.loc[resto.index] = recuperadas
+    return convertidas
+
+def converter_datas(serie):
+    """Converte uma coluna de datas dd/mm/aaaa para datetime64.
+
+    Colunas já tipadas são devolvidas sem custo. Como uma aba tem poucas datas
+    distintas e muitas linhas, cada valor distinto é convertido uma única vez
+    (formato fixo da planilha, com fallback para ISO 8601 e dayfirst=True) e o
+    resultado é espalhado de volta pelos códigos do factorize.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    codigos, distintos = pd.factorize(serie)
+    convertidos = _converter_valores(pd.Series(distintos, dtype=object))
+    # Código -1 (valor ausente) cai na posição extra NaT
+    valores = np.append(convertidos.to_numpy(), np.datetime64('NaT')).astype(convertidos.dtype)
+    return pd.Series(valores[codigos], index=serie.index, name=serie.name)
+
+def tipar_datas(df, colunas):
+    """Converte as colunas de data presentes no DataFrame (as ausentes são ignoradas)"""
+    for coluna in colunas:
+        if coluna in df.columns:
+            df[coluna] = converter_datas(df[coluna])
+    return df
+
+def tipar_aba(df, nome_aba, colunas_data=None):
+    """Tipa as colunas de data e as numéricas de uma aba recém-lida da planilha"""
+    tipar_datas(df, COLUNAS_DATA.get(nome_aba, []) if colunas_data is None else colunas_data)
+    for coluna in COLUNAS_NUMERICAS.get(nome_aba, []):
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+    return df
@@ -0,0 +1,308 @@
+"""Vários POs/squads no mesmo processo: cada espaço é uma planilha própria.
+
+Cada espaço tem a sua conexão autorizada ao Google (uma sessão HTTP por
+espaço), o seu `ClientePlanilhas` com cota e métricas próprias e o seu
+namespace no `CacheEspacos`, que limita a memória por espaço e no total e
+descarta as abas usadas há mais tempo (LRU) entre todos os espaços.
+
+O `CacheEspacos` é o armazém de dados do processo: abas tipadas, recortes e
+agregados ficam numa única cópia, lida por todas as sessões sem serialização.
+Cada versão guardada conta as leituras (reruns) em andamento que a usam; uma
+versão em uso não é descartada pelo LRU e, se for substituída no meio de um
+rerun, continua na conta de memória até a última leitura terminar.
+
+Cada chave tem no máximo uma carga em andamento (single-flight): quando o TTL
+vence ou o cache está frio, só a primeira sessão chama o Sheets; as demais
+recebem a versão vencida enquanto a atualização não termina ou, sem versão
+alguma, esperam por ela. Uma carga que passa do prazo de atualização deixa de
+segurar a chave e a próxima sessão tenta de novo.
+
+Configuração, em ordem de prioridade:
+    secrets.toml, tabela [planilhas]: "Squad A" = "https://docs.google.com/..."
+    PO_PLANILHAS="Squad A=https://...;Squad B=https://..."
+    PO_CACHE_MB=1024           memória total das abas em cache
+    PO_CACHE_ESPACO_MB=256     memória máxima de um único espaço
+    PO_CACHE_PRAZO_S=60        prazo de uma carga em andamento antes de outra sessão assumir
+"""
+import contextlib
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ESPACO_PADRAO = "Principal"
+LIMITE_CACHE_MB = 1024
+LIMITE_ESPACO_MB = 256
+TTL_CACHE_S = 300
+PRAZO_ATUALIZACAO_S = 60  # leitura com novas tentativas (ver planilhas.TIMEOUT_S) ainda cabe no prazo
+CONTADORES = ('acertos', 'faltas', 'remocoes', 'expiradas', 'vencidas_servidas', 'esperas')
+
+# ==================== CONFIGURAÇÃO ====================
+def ler_espacos(configuracao=None, url_padrao=None):
+    """{nome do espaço: url da planilha} a partir dos secrets, do ambiente ou da planilha padrão"""
+    if configuracao:
+        return {str(nome): str(url) for nome, url in dict(configuracao).items()}
+    espacos = {}
+    for item in os.getenv('PO_PLANILHAS', '').split(';'):
+        nome, separador, url = item.partition('=')
+        if separador and nome.strip() and url.strip():
+            espacos[nome.strip()] = url.strip()
+    if espacos:
+        return espacos
+    return {ESPACO_PADRAO: url_padrao} if url_padrao else {}
+
+# ==================== CONEXÕES ====================
+_CONEXOES = {}
+_LOCK_CONEXOES = threading.Lock()
+
+def obter_conexao(espaco, autorizar):
+    """Cliente gspread autorizado do espaço, criado uma vez e reaproveitado (falhas não ficam em cache)"""
+    with _LOCK_CONEXOES:
+        conexao = _CONEXOES.get(espaco)
+    if conexao is not None:
+        return conexao
+    conexao = autorizar()
+    if conexao is not None:
+        with _LOCK_CONEXOES:
+            conexao = _CONEXOES.setdefault(espaco, conexao)
+    return conexao
+
+def limpar_conexoes(espaco=None):
+    """Descarta as conexões (troca de credenciais, testes e benchmarks)"""
+    with _LOCK_CONEXOES:
+        if espaco is None:
+            _CONEXOES.clear()
+        else:
+            _CONEXOES.pop(espaco, None)
+
+# ==================== CACHE ====================
+def tamanho_bytes(valor):
+    """Memória ocupada por um DataFrame (strings incluídas) ou por um objeto com `nbytes`; 0 para os demais"""
+    uso = getattr(valor, 'memory_usage', None)
+    if uso is None:
+        return int(getattr(valor, 'nbytes', 0))
+    return int(uso(deep=True, index=True).sum())
+
+class _Leitura:
+    """Versões lidas por um rerun; depois de encerrada não referencia mais nada"""
+    def __init__(self):
+        self.versoes = set()
+        self.ativa = True
+
+class _Carga:
+    """Carga em andamento de uma chave: quem chega depois espera por ela até o prazo"""
+    def __init__(self, prazo, epoca):
+        self.prazo = prazo
+        self.epoca = epoca
+        self.pronta = threading.Event()
+        self.valor = None
+        self.entrada = None
+        self.erro = None
+        self.substituida = False  # outra sessão assumiu depois do prazo: o resultado desta não é guardado
+
+    def terminar(self, valor=None, entrada=None, erro=None):
+        self.valor, self.entrada, self.erro = valor, entrada, erro
+        self.pronta.set()
+
+class CacheEspacos:
+    """Cache de abas por espaço com TTL, limite de memória por espaço e LRU global.
+
+    Os frames devolvidos são compartilhados entre as sessões: trate-os como somente leitura.
+    """
+    def __init__(self, limite_mb=None, limite_espaco_mb=None, ttl=TTL_CACHE_S, prazo_atualizacao=None):
+        self.limite_bytes = int((limite_mb or float(os.getenv('PO_CACHE_MB', LIMITE_CACHE_MB))) * 1024 ** 2)
+        self.limite_espaco_bytes = int((limite_espaco_mb or float(os.getenv('PO_CACHE_ESPACO_MB', LIMITE_ESPACO_MB))) * 1024 ** 2)
+        self.ttl = ttl
+        self.prazo_atualizacao = prazo_atualizacao or float(os.getenv('PO_CACHE_PRAZO_S', PRAZO_ATUALIZACAO_S))
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # (espaço, chave) -> (momento, valor, bytes, geração), do menos ao mais recente
+        self._bytes_espaco = {}
+        self._contadores = {}
+        self._geracoes = itertools.count(1)
+        self._referencias = {}  # (espaço, chave, geração) -> leituras em andamento que usam a versão
+        self._retidas = {}  # (espaço, chave, geração) -> bytes: fora do cache, mas ainda em uso
+        self._leitura_atual = contextvars.ContextVar(f'leitura_cache_{id(self)}', default=None)
+        self._cargas = {}  # (espaço, chave) -> _Carga em andamento
+        self._epocas = {}  # espaço -> limpezas; carga iniciada antes de um limpar() não é guardada
+
+    def _contar(self, espaco, evento):
+        contadores = self._contadores.setdefault(espaco, dict.fromkeys(CONTADORES, 0))
+        contadores[evento] += 1
+
+    def _em_uso(self, chave):
+        return bool(self._referencias.get((*chave, self._entradas[chave][3])))
+
+    def _retirar(self, chave):
+        _, _, tamanho, geracao = self._entradas.pop(chave)
+        versao = (*chave, geracao)
+        if self._referencias.get(versao):
+            # Um rerun ainda usa esta versão: a memória só volta quando a última leitura terminar
+            self._retidas[versao] = tamanho
+        else:
+            self._bytes_espaco[chave[0]] -= tamanho
+
+    def _referenciar(self, chave, entrada):
+        leitura = self._leitura_atual.get()
+        versao = (*chave, entrada[3])
+        if leitura is None or not leitura.ativa or versao in leitura.versoes:
+            return
+        leitura.versoes.add(versao)
+        self._referencias[versao] = self._referencias.get(versao, 0) + 1
+
+    def _liberar(self, versao):
+        restantes = self._referencias.pop(versao) - 1
+        if restantes:
+            self._referencias[versao] = restantes
+        elif versao in self._retidas:
+            self._bytes_espaco[versao[0]] -= self._retidas.pop(versao)
+
+    def _buscar(self, espaco, chave):
+        """(entrada, vencida); a vencida fica no cache para ser servida enquanto a atualização não chega"""
+        entrada = self._entradas.get((espaco, chave))
+        if entrada is None:
+            return None, False
+        self._entradas.move_to_end((espaco, chave))
+        return entrada, time.monotonic() - entrada[0] > self.ttl
+
+    def _guardar(self, espaco, chave, valor):
+        tamanho = tamanho_bytes(valor)
+        if tamanho > self.limite_espaco_bytes:
+            return None  # sozinho já estoura o limite do espaço: serve sem guardar
+        if (espaco, chave) in self._entradas:
+            self._retirar((espaco, chave))
+        entrada = self._entradas[(espaco, chave)] = (time.monotonic(), valor, tamanho, next(self._geracoes))
+        self._bytes_espaco[espaco] = self._bytes_espaco.get(espaco, 0) + tamanho
+        # Primeiro o espaço volta ao seu limite, depois o processo volta ao total, sempre pelo LRU.
+        # Versões em uso ficam: descartá-las não liberaria memória enquanto o rerun as segura
+        for limite, do_espaco in ((self.limite_espaco_bytes, True), (self.limite_bytes, False)):
+            for antiga in list(self._entradas):
+                if (self._bytes_espaco[espaco] if do_espaco else self.bytes_total()) <= limite:
+                    break
+                if antiga == (espaco, chave) or (do_espaco and antiga[0] != espaco) or self._em_uso(antiga):
+                    continue
+                self._retirar(antiga)
+                self._contar(antiga[0], 'remocoes')
+        return entrada
+
+    def obter(self, espaco, chave, carregar, guardar=None):
+        """Valor em cache de (espaço, chave) ou o resultado de `carregar()`, guardado para as próximas sessões.
+
+        `guardar(valor)` decide se o resultado entra no cache (ex.: falhas de leitura não entram).
+        Só uma sessão por vez carrega a mesma chave; as outras recebem a versão vencida ou esperam a carga.
+        Dentro de `leitura()`, a versão devolvida fica marcada como em uso até o fim do bloco.
+        """
+        while True:
+            with self._lock:
+                entrada, vencida = self._buscar(espaco, chave)
+                if entrada and not vencida:
+                    self._contar(espaco, 'acertos')
+                    self._referenciar((espaco, chave), entrada)
+                    return entrada[1]
+                carga = self._cargas.get((espaco, chave))
+                if carga is None or time.monotonic() > carga.prazo:
+                    # Ninguém carregando (ou a carga passou do prazo): esta sessão assume a chave
+                    if carga is not None:
+                        carga.substituida = True
+                    carga = self._cargas[(espaco, chave)] = _Carga(time.monotonic() + self.prazo_atualizacao, self._epocas.get(espaco, 0))
+                    self._contar(espaco, 'faltas')
+                    if vencida:
+                        self._contar(espaco, 'expiradas')
+                    break
+                if entrada:
+                    # Outra sessão já está atualizando: serve a versão vencida sem esperar
+                    self._contar(espaco, 'vencidas_servidas')
+                    self._referenciar((espaco, chave), entrada)
+                    return entrada[1]
+                self._contar(espaco, 'esperas')
+            if carga.pronta.wait(max(carga.prazo - time.monotonic(), 0)):
+                if carga.erro is not None:
+                    raise carga.erro
+                with self._lock:
+                    if carga.entrada:
+                        self._referenciar((espaco, chave), carga.entrada)
+                return carga.valor
+            # Prazo vencido sem resposta: volta ao início e, se ninguém assumiu, assume a carga
+
+        try:
+            valor = carregar()
+        except BaseException as erro:
+            with self._lock:
+                if self._cargas.get((espaco, chave)) is carga:
+                    del self._cargas[(espaco, chave)]
+            carga.terminar(erro=erro)
+            raise
+        entrada = None
+        with self._lock:
+            if self._cargas.get((espaco, chave)) is carga:
+                del self._cargas[(espaco, chave)]
+            # Um limpar() no meio da carga (ex.: gravação na planilha) torna o valor lido antigo demais para guardar
+            if (guardar is None or guardar(valor)) and carga.epoca == self._epocas.get(espaco, 0) and not carga.substituida:
+                entrada = self._guardar(espaco, chave, valor)
+                if entrada:
+                    self._referenciar((espaco, chave), entrada)
+        carga.terminar(valor, entrada)
+        return valor
+
+    def ultima_versao(self, espaco, chave):
+        """Última versão guardada de (espaço, chave), mesmo vencida, ou None; serve de snapshot quando a fonte falha"""
+        with self._lock:
+            entrada = self._entradas.get((espaco, chave))
+            if entrada is None:
+                return None
+            self._referenciar((espaco, chave), entrada)
+            return entrada[1]
+
+    @contextlib.contextmanager
+    def leitura(self):
+        """Bloco de leitura (um rerun): as versões obtidas nele ficam em uso até o bloco terminar.
+
+        Tarefas disparadas no pool com o contexto copiado entram na mesma leitura; o que
+        elas obtiverem depois do fim do bloco não fica referenciado.
+        """
+        if self._leitura_atual.get() is not None:
+            yield  # bloco aninhado: a leitura de fora já segura as versões
+            return
+        leitura = _Leitura()
+        token = self._leitura_atual.set(leitura)
+        try:
+            yield
+        finally:
+            self._leitura_atual.reset(token)
+            with self._lock:
+                leitura.ativa = False
+                for versao in leitura.versoes:
+                    self._liberar(versao)
+
+    def limpar(self, espaco=None):
+        """Esvazia o namespace de um espaço (ou o cache inteiro); versões em uso seguem retidas até liberadas"""
+        with self._lock:
+            for chave in [c for c in self._entradas if espaco is None or c[0] == espaco]:
+                self._retirar(chave)
+            for nome in ({c[0] for c in self._cargas} | set(self._epocas) if espaco is None else {espaco}):
+                self._epocas[nome] = self._epocas.get(nome, 0) + 1
+
+    def bytes_total(self):
+        return sum(self._bytes_espaco.values())
+
+    def metricas(self):
+        """Por espaço: entradas, memória, versões em uso/retidas, cargas em andamento e os contadores"""
+        with self._lock:
+            espacos = set(self._contadores) | set(self._bytes_espaco)
+            return {
+                'limite_mb': self.limite_bytes / 1024 ** 2,
+                'limite_espaco_mb': self.limite_espaco_bytes / 1024 ** 2,
+                'total_mb': self.bytes_total() / 1024 ** 2,
+                'espacos': {
+                    espaco: {
+                        'entradas': sum(1 for e, _ in self._entradas if e == espaco),
+                        'mb': self._bytes_espaco.get(espaco, 0) / 1024 ** 2,
+                        'versoes_em_uso': sum(1 for versao in self._referencias if versao[0] == espaco),
+                        'retidas': sum(1 for versao in self._retidas if versao[0] == espaco),
+                        'cargas': sum(1 for e, _ in self._cargas if e == espaco),
+                        **self._contadores.get(espaco, dict.fromkeys(CONTADORES, 0))
+                    }
+                    for espaco in sorted(espacos)
+                }
+            }
@@ -0,0 +1,75 @@
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+from rastreamento import span
+
+# ==================== CONSTANTES ====================
+MAX_PONTOS_SERIE = 500
+
+# ==================== CACHE DE FIGURAS ====================
+def versao_dados(df):
+    """Retorna o token de versão gravado no DataFrame no momento do carregamento"""
+    return df.attrs.get('versao')
+
+def obter_figuras(chave, construtor, dados):
+    """Figuras de uma aba memoizadas pela chave (aba, filtros, versão dos dados)"""
+    with span(f"graficos.{chave[0]}"):
+        return _figuras_em_cache(chave, construtor, dados)
+
+@st.cache_resource(max_entries=64, ttl=300, show_spinner=False)
+def _figuras_em_cache(chave, _construtor, _dados):
+    # Os argumentos com prefixo `_` não entram no hash do Streamlit: a chave
+    # já identifica unicamente o recorte de dados usado pelo construtor.
+    with span("graficos.construir", linhas=len(_dados)):
+        return _construtor(_dados)
+
+# ==================== CONSTRUTORES (graph_objects) ====================
+def figura_pizza(rotulos, valores, titulo):
+    """Gráfico de pizza montado direto com go.Pie a partir de valores agregados"""
+    fig = go.Figure(go.Pie(labels=list(rotulos), values=list(valores), sort=False))
+    fig.update_layout(title=titulo, legend_title_text=None)
+    return fig
+
+def figura_barras(categorias, valores, titulo, rotulo_x=None, rotulo_y=None):
+    """Gráfico de barras montado direto com go.Bar a partir de valores agregados"""
+    fig = go.Figure(go.Bar(x=list(categorias), y=list(valores)))
+    fig.update_layout(title=titulo, xaxis_title=rotulo_x, yaxis_title=rotulo_y)
+    return fig
+
+def figura_linhas(x, series, titulo, rotulo_y=None, max_pontos=MAX_PONTOS_SERIE):
+    """Gráfico de linhas com uma trace por série, reduzindo séries longas antes de desenhar"""
+    fig = go.Figure()
+    for nome, y in series.items():
+        x_red, y_red = reduzir_serie(x, y, max_pontos)
+        fig.add_trace(go.Scatter(x=x_red, y=y_red, mode='lines', name=nome))
+    fig.update_layout(title=titulo, yaxis_title=rotulo_y, hovermode='x unified')
+    return fig
+
+def figura_mapa_calor(matriz, titulo, rotulo_cor=None):
+    """Mapa de calor (go.Heatmap) a partir de uma matriz já pivotada"""
+    fig = go.Figure(go.Heatmap(
+        z=matriz.to_numpy(), x=list(matriz.columns), y=list(matriz.index),
+        colorscale='Blues', colorbar=dict(title=rotulo_cor), hoverongaps=False
+    ))
+    fig.update_layout(title=titulo, yaxis=dict(autorange='reversed'))
+    return fig
+
+def reduzir_serie(x, y, max_pontos=MAX_PONTOS_SERIE):
+    """Reduz uma série temporal para no máximo `max_pontos` pela média de blocos contíguos.
+
+    Valores ausentes (NaN) são ignorados na média de cada bloco; um bloco só
+    com NaN continua NaN, preservando as lacunas da série.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_pontos:
+        return x, y
+
+    inicios = np.linspace(0, n, max_pontos, endpoint=False).astype(int)
+    validos = ~np.isnan(y)
+    somas = np.add.reduceat(np.where(validos, y, 0.0), inicios)
+    contagens = np.add.reduceat(validos.astype(int), inicios)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = somas / contagens
+    return x[inicios], medias
@@ -0,0 +1,215 @@
+"""Cliente do Google Sheets com contabilidade de cota, latência e backoff.
+
+Toda chamada à API passa por `ClientePlanilhas.executar`, que:
+- conta as requisições da janela do último minuto contra a cota do projeto;
+- registra a latência num histograma por operação;
+- repete erros transitórios (429/5xx/rede/timeout) com backoff exponencial e jitter;
+- ao receber 429, pausa as chamadas seguintes do processo pelo tempo de backoff.
+
+Quando a leitura falha por cota ou indisponibilidade, `ler_registros` devolve a
+última leitura boa guardada por quem chama (no app, o frame tipado que continua
+no `CacheEspacos`, dentro do limite de memória) em vez de deixar a tela vazia;
+o cliente não guarda cópia dos registros.
+
+A cota pode ser ajustada pela variável de ambiente PO_SHEETS_COTA_MINUTO.
+"""
+import bisect
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import gspread
+import requests
+
+from rastreamento import span
+
+# ==================== CONSTANTES ====================
+ESCOPOS = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+COTA_POR_MINUTO = 60  # leituras por minuto por usuário na API do Sheets
+LIMITES_LATENCIA_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+LIMITE_LENTO_MS = 5000  # acima disso a resposta conta como lenta
+TIMEOUT_S = 30  # leitura que passa disso vira Timeout e entra no backoff
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+ERROS_REDE = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class CotaEsgotada(Exception):
+    """A janela do último minuto já usou toda a cota e a espera passaria do limite"""
+
+def status_http(erro):
+    """Status HTTP de um erro do gspread (None para erros sem resposta)"""
+    resposta = getattr(erro, 'response', None)
+    if resposta is not None and getattr(resposta, 'status_code', None):
+        return resposta.status_code
+    return getattr(erro, 'code', None)
+
+# ==================== CLIENTE ====================
+class ClientePlanilhas:
+    def __init__(self, cota_por_minuto=None, max_tentativas=4, espera_base=0.5,
+                 espera_maxima=16.0, espera_maxima_cota=5.0, dormir=time.sleep):
+        self.cota_por_minuto = cota_por_minuto or int(os.getenv('PO_SHEETS_COTA_MINUTO', COTA_POR_MINUTO))
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.espera_maxima_cota = espera_maxima_cota
+        self._dormir = dormir
+        self._lock = threading.Lock()
+        self._janela = deque()
+        self._pausa_ate = 0.0
+        self._leituras = {}  # aba -> momento da última leitura boa
+        self._operacoes = {}
+        self._eventos = deque(maxlen=50)
+        self._totais = {'requisicoes': 0, 'tentativas_repetidas': 0, 'erros_429': 0, 'erros': 0, 'respostas_lentas': 0, 'snapshots_servidos': 0}
+
+    # ---------- cota ----------
+    def _limpar_janela(self, agora):
+        while self._janela and agora - self._janela[0] >= 60:
+            self._janela.popleft()
+
+    def _reservar_cota(self):
+        """Reserva uma requisição na janela, esperando se a cota ou uma pausa por 429 exigirem"""
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._limpar_janela(agora)
+                espera = max(self._pausa_ate - agora, 0.0)
+                if not espera and len(self._janela) >= self.cota_por_minuto:
+                    espera = 60 - (agora - self._janela[0])
+                if not espera:
+                    self._janela.append(agora)
+                    self._totais['requisicoes'] += 1
+                    return
+            if espera > self.espera_maxima_cota:
+                raise CotaEsgotada(f"cota de {self.cota_por_minuto} req/min esgotada; próxima vaga em {espera:.0f}s")
+            self._dormir(espera)
+
+    def requisicoes_ultimo_minuto(self):
+        with self._lock:
+            self._limpar_janela(time.monotonic())
+            return len(self._janela)
+
+    # ---------- métricas ----------
+    def _registrar_latencia(self, operacao, milissegundos, erro=None):
+        with self._lock:
+            estatisticas = self._operacoes.setdefault(operacao, {
+                'chamadas': 0, 'erros': 0, 'histograma': [0] * (len(LIMITES_LATENCIA_MS) + 1),
+                'amostras': deque(maxlen=500)
+            })
+            estatisticas['chamadas'] += 1
+            estatisticas['histograma'][bisect.bisect_left(LIMITES_LATENCIA_MS, milissegundos)] += 1
+            estatisticas['amostras'].append(milissegundos)
+            if milissegundos > LIMITE_LENTO_MS:
+                self._totais['respostas_lentas'] += 1
+            if erro is not None:
+                estatisticas['erros'] += 1
+
+    def _registrar_evento(self, tipo, operacao, aba, detalhe):
+        with self._lock:
+            self._eventos.append({'quando': datetime.now(), 'tipo': tipo, 'operacao': operacao, 'aba': aba, 'detalhe': detalhe})
+
+    def metricas(self):
+        """Fotografia das métricas para a página de administração"""
+        with self._lock:
+            self._limpar_janela(time.monotonic())
+            operacoes = {}
+            for nome, estatisticas in self._operacoes.items():
+                amostras = sorted(estatisticas['amostras'])
+                percentil = lambda p: amostras[min(int(p * len(amostras)), len(amostras) - 1)] if amostras else None
+                operacoes[nome] = {
+                    'chamadas': estatisticas['chamadas'],
+                    'erros': estatisticas['erros'],
+                    'p50_ms': percentil(0.50),
+                    'p95_ms': percentil(0.95),
+                    'max_ms': amostras[-1] if amostras else None,
+                    'histograma': list(estatisticas['histograma'])
+                }
+            return {
+                'cota_por_minuto': self.cota_por_minuto,
+                'requisicoes_ultimo_minuto': len(self._janela),
+                'pausado_por_s': max(self._pausa_ate - time.monotonic(), 0.0),
+                'totais': dict(self._totais),
+                'operacoes': operacoes,
+                'eventos': list(self._eventos),
+                'leituras': dict(self._leituras)
+            }
+
+    # ---------- execução ----------
+    def _espera_backoff(self, tentativa):
+        """Backoff exponencial com jitter completo: uniforme entre 0 e base·2^tentativa (limitado)"""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+
+    def executar(self, operacao, funcao, aba=None, repetir_status=STATUS_TRANSITORIOS, repetir_rede=True):
+        """Executa uma chamada à API com cota, métricas e repetição de erros transitórios.
+
+        Chamadas que não são idempotentes passam `repetir_rede=False`: um timeout ou
+        uma conexão caída depois de o pedido chegar ao Google pode já ter gravado.
+        """
+        for tentativa in range(self.max_tentativas):
+            self._reservar_cota()
+            inicio = time.perf_counter()
+            with span(f"sheets.{operacao}", aba=aba, tentativa=tentativa) as atributos:
+                try:
+                    resultado = funcao()
+                except (gspread.exceptions.APIError, *ERROS_REDE) as e:
+                    milissegundos = (time.perf_counter() - inicio) * 1000
+                    self._registrar_latencia(operacao, milissegundos, erro=e)
+                    codigo = status_http(e)
+                    atributos['status'] = codigo
+                    transitorio = codigo in repetir_status if codigo is not None else repetir_rede and isinstance(e, ERROS_REDE)
+                    with self._lock:
+                        self._totais['erros'] += 1
+                        if codigo == 429:
+                            self._totais['erros_429'] += 1
+                    if not transitorio or tentativa == self.max_tentativas - 1:
+                        self._registrar_evento('erro', operacao, aba, f"{codigo or type(e).__name__}: {e}")
+                        raise
+                    espera = self._espera_backoff(tentativa)
+                    if codigo == 429:
+                        # Pausa adaptativa: as outras chamadas do processo também esperam
+                        with self._lock:
+                            self._pausa_ate = max(self._pausa_ate, time.monotonic() + espera)
+                    with self._lock:
+                        self._totais['tentativas_repetidas'] += 1
+                    self._registrar_evento('nova tentativa', operacao, aba, f"{codigo or type(e).__name__}; aguardando {espera:.1f}s")
+                    self._dormir(espera)
+                    continue
+            self._registrar_latencia(operacao, (time.perf_counter() - inicio) * 1000)
+            return resultado
+
+    def ler_registros(self, abrir_planilha, nome_aba, ultima_boa=None):
+        """Lê todos os registros da aba; se a API falhar, devolve o snapshot de `ultima_boa()`.
+
+        `ultima_boa` devolve a última leitura boa guardada por quem chama (ou None;
+        sem ela o erro sobe). Retorna (registros, momento_snapshot): momento_snapshot
+        é None para dados frescos ou o datetime da última leitura boa quando veio do snapshot.
+        """
+        try:
+            spreadsheet = self.executar('open_by_url', abrir_planilha, aba=nome_aba)
+            if spreadsheet is None:
+                return [], None
+            aba = self.executar('worksheet', lambda: spreadsheet.worksheet(nome_aba), aba=nome_aba)
+            registros = self.executar('get_all_records', aba.get_all_records, aba=nome_aba)
+        except (CotaEsgotada, gspread.exceptions.APIError, *ERROS_REDE) as e:
+            snapshot = ultima_boa() if ultima_boa is not None else None
+            if snapshot is None:
+                raise
+            with self._lock:
+                self._totais['snapshots_servidos'] += 1
+                quando = self._leituras.get(nome_aba, datetime.now())
+            self._registrar_evento('snapshot', 'get_all_records', nome_aba, str(e))
+            return snapshot, quando
+
+        with self._lock:
+            self._leituras[nome_aba] = datetime.now()
+        return registros, None
+
+    def acrescentar_linha(self, abrir_planilha, nome_aba, linha):
+        """Acrescenta uma linha; só repete em 429, pois um 5xx ou um erro de rede pode ter gravado a linha"""
+        spreadsheet = self.executar('open_by_url', abrir_planilha, aba=nome_aba)
+        if spreadsheet is None:
+            return False
+        aba = self.executar('worksheet', lambda: spreadsheet.worksheet(nome_aba), aba=nome_aba)
+        self.executar('append_row', lambda: aba.append_row(linha), aba=nome_aba, repetir_status={429}, repetir_rede=False)
+        return True
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from tendencias import DIAS_SEMANA
+
+# ==================== CONSTANTES ====================
+# Pontos por unidade de cada componente: por documento, por minuto trabalhado
+# (documentação + reuniões), por cerimônia com presença e por melhoria proposta
+PESOS_PADRAO = {
+    'documentos': 2.0,
+    'minutos': 1 / 60,
+    'cerimonias': 1.0,
+    'melhorias': 1.0
+}
+
+# ==================== MOTOR DE PONTUAÇÃO ====================
+def componentes_diarios(diario):
+    """Extrai do agregado diário as quantidades que entram na pontuação de cada dia"""
+    return pd.DataFrame({
+        'documentos': diario['documentos'],
+        'minutos': diario['minutos_documentos'] + diario['minutos_reuniao'],
+        'cerimonias': diario['cerimonias_presentes'],
+        'melhorias': diario['melhorias_propostas']
+    }, index=diario.index)
+
+def pontuar_dias(diario, pesos=None):
+    """Calcula a pontuação de produtividade de todos os dias numa única multiplicação matriz × pesos"""
+    pesos = {**PESOS_PADRAO, **(pesos or {})}
+    componentes = componentes_diarios(diario)
+    vetor_pesos = np.array([pesos[coluna] for coluna in componentes.columns], dtype=float)
+    componentes['pontuacao'] = componentes.to_numpy(dtype=float) @ vetor_pesos
+    return componentes
+
+def top_dias(pontuacao, k=5):
+    """Os k dias com maior pontuação, ignorando dias sem nenhuma atividade"""
+    ativos = pontuacao[pontuacao['pontuacao'] > 0]
+    return ativos.nlargest(k, 'pontuacao')
+
+def padrao_dia_semana(pontuacao):
+    """Pontuação média, total e dias ativos por dia da semana (Seg..Dom)"""
+    if pontuacao.empty:
+        return pd.DataFrame(index=DIAS_SEMANA, columns=['media', 'total', 'dias_ativos'], dtype=float)
+
+    dias_semana = pontuacao.index.dayofweek
+    agrupado = pontuacao['pontuacao'].groupby(dias_semana).agg(
+        media='mean', total='sum', dias_ativos=lambda x: int((x > 0).sum())
+    )
+    agrupado = agrupado.reindex(range(7))
+    agrupado.index = DIAS_SEMANA
+    return agrupado
+
+def analisar_produtividade(diario, pesos=None, k=5):
+    """Pontua todos os dias e devolve pontuação completa, top-k e padrão semanal"""
+    pontuacao = pontuar_dias(diario, pesos)
+    return {
+        'dias': pontuacao,
+        'top': top_dias(pontuacao, k),
+        'dia_semana': padrao_dia_semana(pontuacao)
+    }
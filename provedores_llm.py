@@ -0,0 +1,258 @@
+"""Provedores de LLM do assistente atrás de uma interface única.
+
+Cada provedor expõe `gerar(prompt) -> RespostaLLM` e, para as conversas,
+`conversar(contexto, mensagens) -> RespostaLLM`. As instâncias são de longa
+duração: `obter_provedor` guarda um cliente por (provedor, modelo), então o
+`genai.configure` e a construção do `GenerativeModel` acontecem uma vez por
+processo, e não a cada pergunta. A chave do Gemini é global no SDK (vale para
+todos os clientes e caches de contexto): há uma por processo e, se ela mudar,
+os clientes são recriados com a nova.
+
+Nas conversas o contexto de dados (instruções e relatório) é o mesmo a cada
+turno. O Gemini o guarda num cache de contexto explícito (CachedContent), criado
+uma vez por texto de contexto e compartilhado por todas as sessões que conversam
+sobre os mesmos dados (e apagado na API quando sai do cache local e nenhum
+turno o usa mais); contextos abaixo do mínimo da API vão como primeiro turno
+do histórico, um prefixo estável que o cache implícito do Gemini reaproveita.
+
+O provedor local é determinístico e não usa rede: serve para rodar, testar
+carga e medir o assistente offline. PO_PROVEDOR_LLM=local força o seu uso.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+import google.generativeai as genai
+
+from telemetria_llm import tokens_da_resposta
+
+RespostaLLM = namedtuple('RespostaLLM', ['texto', 'tokens_prompt', 'tokens_resposta', 'tokens_cache'])
+
+# Opção exibida na tela -> (provedor, modelo)
+MODELOS = {
+    "Gemini Pro": ('gemini', 'gemini-2.5-pro'),
+    "Gemini Flash": ('gemini', 'gemini-2.0-flash'),
+    "Local (offline)": ('local', 'local-modelo')
+}
+
+# Cache de contexto das conversas
+MIN_TOKENS_CACHE_CONTEXTO = 1024  # menor mínimo aceito pela API; modelos que exigem mais recusam e a recusa fica guardada
+TTL_CACHE_CONTEXTO_S = 1800
+MAX_CONTEXTOS = 8
+ESPERA_CRIACAO_CONTEXTO_S = 30  # quem espera a criação do mesmo cache por outra sessão, antes de seguir pelo histórico
+CONFIRMACAO_CONTEXTO = "Entendido. Vou responder às perguntas com base nesses dados."
+
+def estimar_tokens(texto):
+    """Estimativa grosseira de tokens (4 caracteres por token)"""
+    return len(texto) // 4
+
+# ==================== PROVEDORES ====================
+class _Contexto:
+    """CachedContent de um contexto, com os turnos que o usam: só é apagado na API quando ninguém o usa"""
+    def __init__(self):
+        self.criado = time.monotonic()
+        self.cache = None
+        self.modelo = None  # modelo sobre o cache; None quando a criação falhou
+        self.usos = 0
+        self.descartado = False
+        self.pronto = threading.Event()
+
+class ProvedorGemini:
+    """Cliente Gemini construído uma única vez e reaproveitado entre perguntas.
+
+    A chave vem do `genai.configure` do processo, feito por `obter_provedor`.
+    """
+    requer_chave = True
+
+    def __init__(self, modelo, chave=None):
+        self.modelo = modelo
+        self._cliente = genai.GenerativeModel(modelo)
+        self._lock = threading.Lock()
+        self._contextos = OrderedDict()  # hash do contexto -> _Contexto
+
+    def gerar(self, prompt):
+        resposta = self._cliente.generate_content(prompt)
+        return RespostaLLM(resposta.text, **tokens_da_resposta(resposta))
+
+    def _reservar_contexto(self, contexto):
+        """_Contexto em uso do CachedContent do contexto (devolver com `_liberar`); None quando o contexto vai no histórico"""
+        if estimar_tokens(contexto) < MIN_TOKENS_CACHE_CONTEXTO:
+            return None
+        chave = hashlib.sha256(contexto.encode('utf-8')).hexdigest()
+        descartados = []
+        with self._lock:
+            item = self._contextos.get(chave)
+            # Renova um pouco antes do TTL da API para não mandar perguntas a um cache expirado
+            if item is not None and item.pronto.is_set() and time.monotonic() - item.criado >= TTL_CACHE_CONTEXTO_S * 0.9:
+                descartados.append(self._retirar(chave))
+                item = None
+            criar = item is None
+            if criar:
+                # Uma criação por contexto: quem chega durante ela espera o mesmo cache
+                item = self._contextos[chave] = _Contexto()
+            else:
+                self._contextos.move_to_end(chave)
+                reservado = item.pronto.is_set()
+                if reservado:
+                    item.usos += 1
+        _apagar_caches(descartados)
+        if not criar:
+            if reservado:
+                return item
+            if not item.pronto.wait(ESPERA_CRIACAO_CONTEXTO_S):
+                return None
+            with self._lock:
+                if item.modelo is not None and item.cache is None:
+                    return None  # descartado e já apagado enquanto esta sessão esperava
+                item.usos += 1
+            return item
+
+        cache = modelo = None
+        try:
+            cache = genai.caching.CachedContent.create(
+                model=f"models/{self.modelo}",
+                contents=[{'role': 'user', 'parts': [contexto]}],
+                ttl=timedelta(seconds=TTL_CACHE_CONTEXTO_S)
+            )
+            modelo = genai.GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            # Falha também fica guardada até o TTL: não tenta criar o cache a cada turno
+            print(f"⚠️ Cache de contexto indisponível ({type(e).__name__}: {e}); o contexto segue no histórico")
+        with self._lock:
+            item.criado, item.cache, item.modelo = time.monotonic(), cache, modelo
+            item.usos += 1
+            item.pronto.set()
+            # Um descartar_contextos() no meio da criação já retirou o item: o cache sai quando este turno terminar
+            while len(self._contextos) > MAX_CONTEXTOS:
+                antiga = next(iter(self._contextos))
+                descartados.append(self._retirar(antiga))
+        _apagar_caches(descartados)
+        return item
+
+    def _retirar(self, chave):
+        """Tira o contexto do cache local; devolve o CachedContent se ninguém o usa (senão sai no último `_liberar`)"""
+        item = self._contextos.pop(chave)
+        item.descartado = True
+        if item.usos or not item.pronto.is_set():
+            return None
+        cache, item.cache = item.cache, None
+        return cache
+
+    def _liberar(self, item):
+        with self._lock:
+            item.usos -= 1
+            if item.usos or not item.descartado:
+                return
+            cache, item.cache = item.cache, None
+        _apagar_caches([cache])
+
+    def descartar_contextos(self):
+        """Apaga na API os caches de contexto guardados (os em uso, quando o turno terminar)"""
+        with self._lock:
+            descartados = [self._retirar(chave) for chave in list(self._contextos)]
+        _apagar_caches(descartados)
+
+    def conversar(self, contexto, mensagens):
+        """Responde à última mensagem do histórico [(papel, texto)] com o contexto em cache"""
+        conteudos = [{'role': papel, 'parts': [texto]} for papel, texto in mensagens]
+        item = self._reservar_contexto(contexto)
+        try:
+            modelo = item.modelo if item is not None else None
+            if modelo is None:
+                modelo = self._cliente
+                conteudos = [{'role': 'user', 'parts': [contexto]}, {'role': 'model', 'parts': [CONFIRMACAO_CONTEXTO]}] + conteudos
+            resposta = modelo.generate_content(conteudos)
+        finally:
+            if item is not None:
+                self._liberar(item)
+        return RespostaLLM(resposta.text, **tokens_da_resposta(resposta))
+
+def _apagar_caches(caches):
+    """Apaga os CachedContent que saíram do cache local, em vez de deixá-los cobrando armazenamento até o TTL"""
+    for cache in caches:
+        if cache is None:
+            continue
+        try:
+            cache.delete()
+        except Exception as e:
+            print(f"⚠️ Cache de contexto não apagado ({type(e).__name__}: {e}); expira pelo TTL")
+
+class ProvedorLocal:
+    """Resposta determinística montada a partir do relatório contido no prompt, sem rede"""
+    requer_chave = False
+
+    def __init__(self, modelo='local-modelo', chave=None, latencia=0.0):
+        self.modelo = modelo
+        self.latencia = latencia
+        self._lock = threading.Lock()
+        self.chamadas = 0
+
+    def gerar(self, prompt):
+        with self._lock:
+            self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        pergunta = re.search(r"PERGUNTA DO USUÁRIO:\s*(.+)", prompt)
+        # Linhas do relatório com números são as métricas já calculadas
+        metricas = [linha.strip().lstrip("•-* ") for linha in prompt.splitlines() if re.search(r"\d", linha) and ":" in linha][:30]
+        texto = (
+            "## 🎯 Resposta Direta\n"
+            f"Resposta gerada localmente (sem LLM) para: **{pergunta.group(1).strip() if pergunta else 'pergunta'}**\n\n"
+            "## 📊 Análise Detalhada\n"
+            + "\n".join(f"- {linha}" for linha in metricas) +
+            "\n\n## 💡 Recomendações Práticas\n"
+            "- Configure um provedor de IA para obter insights e recomendações personalizadas\n"
+        )
+        return RespostaLLM(texto, len(prompt) // 4, len(texto) // 4, 0)
+
+    def conversar(self, contexto, mensagens):
+        """Sem histórico de fato: responde à última mensagem usando as métricas do contexto"""
+        return self.gerar(f"{contexto}\n\n{mensagens[-1][1]}")
+
+PROVEDORES = {
+    'gemini': ProvedorGemini,
+    'local': ProvedorLocal
+}
+
+# ==================== SELEÇÃO ====================
+def resolver_modelo(tipo_modelo):
+    """(provedor, modelo) para a opção escolhida; PO_PROVEDOR_LLM=local força o provedor local"""
+    if os.getenv('PO_PROVEDOR_LLM') == 'local':
+        return MODELOS["Local (offline)"]
+    return MODELOS.get(tipo_modelo, MODELOS["Gemini Pro"])
+
+_INSTANCIAS = {}  # (provedor, modelo) -> instância
+_CHAVE_CONFIGURADA = None
+_LOCK_PROVEDORES = threading.Lock()
+
+def obter_provedor(nome, modelo, chave=None):
+    """Instância de longa duração do provedor, uma por (provedor, modelo); a chave do Gemini vale para o processo"""
+    global _CHAVE_CONFIGURADA
+    classe = PROVEDORES[nome]
+    with _LOCK_PROVEDORES:
+        if classe.requer_chave and chave != _CHAVE_CONFIGURADA:
+            # genai.configure troca a chave de todos os clientes: os construídos com a anterior saem
+            _descartar_instancias()
+            genai.configure(api_key=chave)
+            _CHAVE_CONFIGURADA = chave
+        instancia = _INSTANCIAS.get((nome, modelo))
+        if instancia is None:
+            instancia = _INSTANCIAS[(nome, modelo)] = classe(modelo, chave)
+        return instancia
+
+def _descartar_instancias():
+    for instancia in _INSTANCIAS.values():
+        if hasattr(instancia, 'descartar_contextos'):
+            instancia.descartar_contextos()
+    _INSTANCIAS.clear()
+
+def limpar_provedores():
+    """Descarta os clientes em cache e os seus caches de contexto (testes e benchmarks)"""
+    global _CHAVE_CONFIGURADA
+    with _LOCK_PROVEDORES:
+        _descartar_instancias()
+        _CHAVE_CONFIGURADA = None
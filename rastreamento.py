@@ -0,0 +1,189 @@
+"""Rastreamento leve dos caminhos quentes (carregamento, filtros, agregações, relatório, LLM).
+
+Cada execução do script (rerun do Streamlit, uma pergunta no modo batch...) abre
+um trace com `iniciar_trace`; dentro dele, `span` e `@rastrear` registram
+duração, linhas e bytes de cada etapa. Fora de um trace os spans não custam nada.
+
+Exportação opcional, configurada por variáveis de ambiente:
+    PO_TRACE_ARQUIVO=traces.jsonl   arquivo de saída (sem ele nada é gravado)
+    PO_TRACE_FORMATO=jsonl|otlp     um span por linha, ou OTLP/JSON (um trace por linha)
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+_TRACE_ATUAL = contextvars.ContextVar('trace_atual', default=None)
+_SPAN_PAI = contextvars.ContextVar('span_pai', default=None)
+_LOCK_EXPORTACAO = threading.Lock()
+
+NOME_SERVICO = "sistema-po"
+
+# ==================== TRACES E SPANS ====================
+def iniciar_trace(nome="rerun"):
+    """Abre um novo trace no contexto atual e o devolve"""
+    trace = {
+        'id': uuid.uuid4().hex,
+        'nome': nome,
+        'inicio_ns': time.time_ns(),
+        'spans': []
+    }
+    _TRACE_ATUAL.set(trace)
+    _SPAN_PAI.set(None)
+    return trace
+
+def trace_atual():
+    return _TRACE_ATUAL.get()
+
+@contextlib.contextmanager
+def span(nome, **atributos):
+    """Mede o bloco como um span filho do span corrente; devolve o dict de atributos para enriquecer"""
+    trace = _TRACE_ATUAL.get()
+    if trace is None:
+        yield atributos
+        return
+
+    registro = {
+        'id': uuid.uuid4().hex[:16],
+        'pai': _SPAN_PAI.get(),
+        'nome': nome,
+        'inicio_ns': time.time_ns(),
+        'duracao_ms': None,
+        'atributos': atributos,
+        'erro': None
+    }
+    token = _SPAN_PAI.set(registro['id'])
+    inicio = time.perf_counter()
+    try:
+        yield atributos
+    except Exception as e:
+        registro['erro'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        registro['duracao_ms'] = (time.perf_counter() - inicio) * 1000
+        _SPAN_PAI.reset(token)
+        trace['spans'].append(registro)
+
+def medir(resultado):
+    """Atributos de volume de um resultado: linhas e bytes para DataFrames, bytes para texto"""
+    if hasattr(resultado, 'memory_usage') and hasattr(resultado, 'columns'):
+        return {'linhas': len(resultado), 'bytes': int(resultado.memory_usage(index=True, deep=False).sum())}
+    if isinstance(resultado, str):
+        return {'bytes': len(resultado.encode('utf-8'))}
+    return {}
+
+def rastrear(nome=None):
+    """Decorador: envolve a função num span e anota linhas/bytes do resultado"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _TRACE_ATUAL.get() is None:
+                return funcao(*args, **kwargs)
+            with span(nome or funcao.__name__) as atributos:
+                resultado = funcao(*args, **kwargs)
+                atributos.update(medir(resultado))
+                return resultado
+        return envolvida
+    return decorador
+
+def executar_no_contexto(funcao):
+    """Embrulha `funcao` para rodar em outra thread herdando o trace e o span pai atuais"""
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcao, *args, **kwargs)
+
+# ==================== RESUMO ====================
+def resumo_trace(trace):
+    """Spans em ordem de início, com profundidade na árvore, prontos para exibir em tabela"""
+    if not trace:
+        return []
+    por_id = {s['id']: s for s in trace['spans']}
+
+    def profundidade(registro):
+        nivel = 0
+        while registro['pai'] in por_id:
+            registro = por_id[registro['pai']]
+            nivel += 1
+        return nivel
+
+    linhas = []
+    for registro in sorted(trace['spans'], key=lambda s: s['inicio_ns']):
+        linhas.append({
+            'etapa': "  " * profundidade(registro) + registro['nome'],
+            'ms': round(registro['duracao_ms'], 1),
+            'linhas': registro['atributos'].get('linhas'),
+            'bytes': registro['atributos'].get('bytes'),
+            'erro': registro['erro']
+        })
+    return linhas
+
+def duracao_total_ms(trace):
+    """Soma das durações dos spans raiz (sem pai) do trace"""
+    if not trace:
+        return 0.0
+    return sum(s['duracao_ms'] for s in trace['spans'] if s['pai'] is None)
+
+# ==================== EXPORTAÇÃO ====================
+def _para_jsonl(trace):
+    for registro in trace['spans']:
+        yield {
+            'trace_id': trace['id'],
+            'trace': trace['nome'],
+            'span_id': registro['id'],
+            'pai': registro['pai'],
+            'nome': registro['nome'],
+            'inicio_ns': registro['inicio_ns'],
+            'duracao_ms': registro['duracao_ms'],
+            'atributos': registro['atributos'],
+            'erro': registro['erro']
+        }
+
+def _valor_otlp(valor):
+    if isinstance(valor, bool):
+        return {'boolValue': valor}
+    if isinstance(valor, int):
+        return {'intValue': str(valor)}
+    if isinstance(valor, float):
+        return {'doubleValue': valor}
+    return {'stringValue': str(valor)}
+
+def _para_otlp(trace):
+    """Trace no formato OTLP/JSON (ExportTraceServiceRequest), aceito por coletores OpenTelemetry"""
+    spans = []
+    for registro in trace['spans']:
+        fim_ns = registro['inicio_ns'] + int(registro['duracao_ms'] * 1_000_000)
+        span_otlp = {
+            'traceId': trace['id'],
+            'spanId': registro['id'],
+            'name': registro['nome'],
+            'kind': 1,
+            'startTimeUnixNano': str(registro['inicio_ns']),
+            'endTimeUnixNano': str(fim_ns),
+            'attributes': [{'key': chave, 'value': _valor_otlp(valor)} for chave, valor in registro['atributos'].items() if valor is not None],
+            'status': {'code': 2, 'message': registro['erro']} if registro['erro'] else {'code': 1}
+        }
+        if registro['pai']:
+            span_otlp['parentSpanId'] = registro['pai']
+        spans.append(span_otlp)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': NOME_SERVICO}}]},
+            'scopeSpans': [{'scope': {'name': 'rastreamento'}, 'spans': spans}]
+        }]
+    }
+
+def exportar_trace(trace, caminho=None, formato=None):
+    """Acrescenta o trace ao arquivo configurado; sem caminho configurado não faz nada"""
+    caminho = caminho or os.getenv('PO_TRACE_ARQUIVO')
+    if not caminho or not trace or not trace['spans']:
+        return False
+    formato = formato or os.getenv('PO_TRACE_FORMATO', 'jsonl')
+
+    registros = [_para_otlp(trace)] if formato == 'otlp' else list(_para_jsonl(trace))
+    with _LOCK_EXPORTACAO, open(caminho, 'a', encoding='utf-8') as arquivo:
+        for registro in registros:
+            arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    return True
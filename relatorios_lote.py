@@ -0,0 +1,286 @@
+"""Geração de relatórios em lote, sem o runtime do Streamlit.
+
+Carrega as abas uma única vez, roda as perguntas (avulsas ou de um modelo de
+relatório semanal/mensal) em paralelo num pool de workers e grava o resultado
+em Markdown e/ou HTML. Serve para pré-gerar os relatórios de madrugada em vez
+de deixar o usuário esperando na tela do assistente.
+
+Fontes de dados:
+    --arquivos DIR                   CSVs exportados da planilha, um por aba (melhorias.csv, ...)
+    --planilha URL --credenciais F   Google Sheets com o JSON da conta de serviço
+    --espaco NOME --credenciais F    planilha de um espaço configurado em PO_PLANILHAS
+
+Uso (a partir da raiz do repositório):
+    python relatorios_lote.py --arquivos exportacao/ --modelo semanal --formato md html
+    python relatorios_lote.py --planilha URL --credenciais conta.json --modelo mensal --modo ia --workers 4
+    python relatorios_lote.py --arquivos exportacao/ --pergunta "Qual meu dia mais produtivo?" --processos
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from datas import COLUNAS_PERIODO, converter_datas, tipar_aba
+
+try:
+    import markdown
+except ImportError:  # opcional: sem o pacote, usa o conversor simples abaixo
+    markdown = None
+
+# ==================== CONSTANTES ====================
+# Categoria usada pelo assistente -> aba da planilha
+ABAS = {
+    'melhorias': 'melhorias',
+    'cerimonias': 'cerimonias_reunioes',
+    'documentos': 'documentos_criterios',
+    'demandas': 'demandas'
+}
+
+MODELOS_RELATORIO = {
+    'semanal': {
+        'titulo': "Relatório Semanal de Product Ownership",
+        'dias': 7,
+        'perguntas': [
+            "Qual foi meu dia mais produtivo da semana?",
+            "Como está a qualidade dos critérios de aceite e o uso de templates?",
+            "Como está a priorização das demandas e histórias?",
+            "Quais melhorias foram propostas e aplicadas?"
+        ]
+    },
+    'mensal': {
+        'titulo': "Relatório Mensal de Product Ownership",
+        'dias': 30,
+        'perguntas': [
+            "Como foi minha produtividade diária no mês e quais dias se destacaram?",
+            "Como está a qualidade dos critérios de aceite e a padronização dos documentos?",
+            "Como evoluiu a priorização das demandas e histórias?",
+            "Qual o tempo investido em cerimônias e reuniões e qual a taxa de presença?",
+            "Quais melhorias trouxeram mais impacto e quantas foram aplicadas?"
+        ]
+    }
+}
+
+MODOS = ['relatorio', 'ia', 'local']
+# A análise local não depende da pergunta: entra uma única vez, como visão geral
+TITULO_VISAO_GERAL = "Visão geral dos indicadores"
+
+Tarefa = namedtuple('Tarefa', ['pergunta', 'modo', 'modelo_ia'])
+
+# ==================== CARREGAMENTO ====================
+def carregar_de_arquivos(diretorio):
+    """Abas exportadas em CSV (um arquivo por aba, com o nome da aba); abas ausentes ficam vazias"""
+    dados = {}
+    for categoria, aba in ABAS.items():
+        caminho = os.path.join(diretorio, f"{aba}.csv")
+        if not os.path.exists(caminho):
+            print(f"⚠️ {caminho} não encontrado: {categoria} fica vazia")
+            dados[categoria] = pd.DataFrame()
+            continue
+        # Células vazias chegam como '' (igual ao get_all_records); as numéricas viram NaN na tipagem
+        dados[categoria] = tipar_aba(pd.read_csv(caminho, keep_default_na=False), aba)
+    return dados
+
+def carregar_do_sheets(url, credenciais):
+    """Abas lidas do Google Sheets com a conta de serviço, passando pela cota e pelo backoff do ClientePlanilhas"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from planilhas import ESCOPOS, TIMEOUT_S, ClientePlanilhas
+
+    client = gspread.authorize(Credentials.from_service_account_file(credenciais, scopes=ESCOPOS))
+    client.set_timeout(TIMEOUT_S)
+    cliente = ClientePlanilhas()
+    dados = {}
+    for categoria, aba in ABAS.items():
+        registros, _ = cliente.ler_registros(lambda: client.open_by_url(url), aba)
+        dados[categoria] = tipar_aba(pd.DataFrame(registros), aba) if registros else pd.DataFrame()
+    return dados
+
+def filtrar_periodo(dados, data_inicio, data_fim):
+    """Restringe cada categoria ao período [data_inicio, data_fim] (dias inteiros)"""
+    inicio = pd.Timestamp(data_inicio).normalize()
+    fim = pd.Timestamp(data_fim).normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    filtrados = {}
+    for categoria, df in dados.items():
+        coluna = COLUNAS_PERIODO.get(categoria)
+        if df.empty or coluna not in df.columns:
+            filtrados[categoria] = df
+            continue
+        datas = converter_datas(df[coluna])
+        filtrados[categoria] = df[(datas >= inicio) & (datas <= fim)]
+    return filtrados
+
+# ==================== WORKERS ====================
+_DADOS = {}
+
+def _iniciar_worker(dados):
+    """Recebe os frames uma vez por worker (processos), em vez de uma vez por tarefa"""
+    global _DADOS
+    _DADOS = dados
+
+def executar_tarefa(tarefa):
+    """Gera o Markdown de uma pergunta sobre os frames do worker: (texto, segundos, erro)"""
+    from assistente_po import analise_local_po, consultar_assistente_po, criar_relatorio_po_completo
+
+    inicio = time.perf_counter()
+    try:
+        if tarefa.modo == 'ia':
+            texto = consultar_assistente_po(tarefa.pergunta, _DADOS, tipo_modelo=tarefa.modelo_ia)
+        elif tarefa.modo == 'relatorio':
+            texto = "### 🧾 Dados Calculados\n\n```\n" + criar_relatorio_po_completo(_DADOS, tarefa.pergunta) + "\n```\n"
+        else:
+            texto = analise_local_po(tarefa.pergunta, _DADOS)
+        return texto, time.perf_counter() - inicio, None
+    except Exception as e:
+        return f"❌ Erro ao gerar a resposta: {e}", time.perf_counter() - inicio, e
+
+def executar_lote(tarefas, dados, workers=4, processos=False):
+    """Roda as tarefas no pool e devolve os resultados na ordem das tarefas"""
+    if processos:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(dados,))
+    else:
+        _iniciar_worker(dados)
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        resultados = []
+        for posicao, (tarefa, resultado) in enumerate(zip(tarefas, executor.map(executar_tarefa, tarefas)), start=1):
+            texto, segundos, erro = resultado
+            print(f"{'❌' if erro else '✅'} [{posicao}/{len(tarefas)}] {tarefa.pergunta} ({segundos:.1f}s)")
+            resultados.append(resultado)
+        return resultados
+
+# ==================== SAÍDA ====================
+def montar_markdown(titulo, data_inicio, data_fim, tarefas, resultados):
+    """Documento único com uma seção por pergunta (os títulos das respostas descem um nível)"""
+    partes = [
+        f"# {titulo}\n",
+        f"Período: {data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y} · gerado em {datetime.now():%d/%m/%Y %H:%M}\n"
+    ]
+    for tarefa, (texto, segundos, _) in zip(tarefas, resultados):
+        partes.append(f"## {tarefa.pergunta}\n")
+        partes.append(re.sub(r"^(#+)", r"#\1", texto.strip(), flags=re.MULTILINE) + "\n")
+    return "\n".join(partes)
+
+def _inline_html(texto):
+    texto = html.escape(texto)
+    texto = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", texto)
+    return re.sub(r"`([^`]+)`", r"<code>\1</code>", texto)
+
+def markdown_para_html(texto):
+    """Markdown -> HTML; sem o pacote `markdown`, cobre títulos, listas, negrito e blocos de código"""
+    if markdown is not None:
+        corpo = markdown.markdown(texto, extensions=['fenced_code'])
+    else:
+        linhas, em_lista, em_codigo = [], False, False
+        for linha in texto.splitlines():
+            if linha.startswith("```"):
+                linhas.append("</pre>" if em_codigo else "<pre>")
+                em_codigo = not em_codigo
+                continue
+            if em_codigo:
+                linhas.append(html.escape(linha))
+                continue
+            item = re.match(r"^\s*(?:[-*•]|\d+\.)\s+(.*)", linha)
+            if em_lista and not item:
+                linhas.append("</ul>")
+                em_lista = False
+            titulo = re.match(r"^(#{1,6})\s+(.*)", linha)
+            if titulo:
+                nivel = len(titulo.group(1))
+                linhas.append(f"<h{nivel}>{_inline_html(titulo.group(2))}</h{nivel}>")
+            elif item:
+                if not em_lista:
+                    linhas.append("<ul>")
+                    em_lista = True
+                linhas.append(f"<li>{_inline_html(item.group(1))}</li>")
+            elif linha.strip():
+                linhas.append(f"<p>{_inline_html(linha)}</p>")
+        linhas.append("</ul>" if em_lista else "")
+        corpo = "\n".join(linhas)
+    return (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\">\n<head><meta charset=\"utf-8\"><title>Relatório PO</title>\n"
+        "<style>body{font-family:sans-serif;max-width:960px;margin:2rem auto;line-height:1.5}"
+        "pre{background:#f5f5f5;padding:1rem;overflow-x:auto}</style></head>\n"
+        f"<body>\n{corpo}\n</body>\n</html>\n"
+    )
+
+def gravar_saidas(texto, diretorio, nome_base, formatos):
+    """Grava o relatório nos formatos pedidos e devolve os caminhos"""
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = []
+    for formato in formatos:
+        caminho = os.path.join(diretorio, f"{nome_base}.{formato}")
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto if formato == 'md' else markdown_para_html(texto))
+        caminhos.append(caminho)
+    return caminhos
+
+# ==================== CLI ====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument('--arquivos', help="diretório com os CSVs exportados de cada aba")
+    fonte.add_argument('--planilha', help="URL da planilha no Google Sheets")
+    fonte.add_argument('--espaco', help="nome de um espaço configurado em PO_PLANILHAS")
+    parser.add_argument('--credenciais', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'), help="JSON da conta de serviço")
+    parser.add_argument('--modelo', choices=list(MODELOS_RELATORIO), help="modelo de relatório com perguntas e período padrão")
+    parser.add_argument('--pergunta', action='append', default=[], help="pergunta avulsa (pode repetir)")
+    parser.add_argument('--dias', type=int, help="período em dias até --fim (padrão: o do modelo ou 30)")
+    parser.add_argument('--fim', help="último dia do período, dd/mm/aaaa (padrão: hoje)")
+    parser.add_argument('--modo', choices=MODOS, default='relatorio',
+                        help="relatorio: visão geral + dados calculados por pergunta; ia: assistente; local: só a visão geral")
+    parser.add_argument('--modelo-ia', default="Gemini Flash", help="opção do assistente no modo ia (ex.: \"Gemini Pro\", \"Local (offline)\")")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--processos', action='store_true', help="pool de processos em vez de threads")
+    parser.add_argument('--formato', nargs='+', choices=['md', 'html'], default=['md'])
+    parser.add_argument('--saida', default='relatorios', help="diretório de saída")
+    args = parser.parse_args(argv)
+
+    modelo = MODELOS_RELATORIO.get(args.modelo, {})
+    perguntas = modelo.get('perguntas', []) + args.pergunta
+    if not perguntas:
+        parser.error("informe --modelo ou ao menos uma --pergunta")
+    if not args.arquivos and not args.credenciais:
+        parser.error("--credenciais (ou GOOGLE_APPLICATION_CREDENTIALS) é obrigatório para ler do Google Sheets")
+
+    data_fim = datetime.strptime(args.fim, '%d/%m/%Y') if args.fim else datetime.now()
+    data_inicio = data_fim - timedelta(days=(args.dias or modelo.get('dias', 30)) - 1)
+
+    inicio = time.perf_counter()
+    if args.arquivos:
+        dados = carregar_de_arquivos(args.arquivos)
+    else:
+        url = args.planilha
+        if args.espaco:
+            from espacos import ler_espacos
+            url = ler_espacos().get(args.espaco)
+            if not url:
+                parser.error(f"espaço {args.espaco!r} não está em PO_PLANILHAS")
+        dados = carregar_do_sheets(url, args.credenciais)
+    dados = filtrar_periodo(dados, data_inicio, data_fim)
+    print(f"📥 Dados carregados em {time.perf_counter() - inicio:.1f}s: " + ", ".join(f"{c} {len(df)}" for c, df in dados.items()))
+
+    # A análise local entra uma vez, como visão geral; no modo local ela é o relatório inteiro
+    tarefas = [Tarefa(TITULO_VISAO_GERAL, 'local', args.modelo_ia)] if args.modo != 'ia' else []
+    if args.modo != 'local':
+        tarefas += [Tarefa(pergunta, args.modo, args.modelo_ia) for pergunta in perguntas]
+    resultados = executar_lote(tarefas, dados, args.workers, args.processos)
+
+    titulo = modelo.get('titulo', "Relatório de Product Ownership")
+    if args.espaco:
+        titulo += f" · {args.espaco}"
+    nome_base = f"relatorio-{args.modelo or 'perguntas'}-{data_fim:%Y%m%d}"
+    caminhos = gravar_saidas(montar_markdown(titulo, data_inicio, data_fim, tarefas, resultados), args.saida, nome_base, args.formato)
+    for caminho in caminhos:
+        print(f"📄 {caminho}")
+    print(f"⏱️ Total: {time.perf_counter() - inicio:.1f}s")
+    return 1 if any(erro for _, _, erro in resultados) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
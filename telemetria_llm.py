@@ -0,0 +1,163 @@
+"""Telemetria das consultas ao assistente: latência, tokens, custo, cache e fallback.
+
+Cada pergunta vira uma linha num SQLite local (um arquivo, sem servidor), que a
+página de administração resume por modelo para ajustar tamanho de prompt e roteamento.
+
+Configuração por variável de ambiente:
+    PO_TELEMETRIA_ARQUIVO=telemetria_llm.sqlite3   arquivo do banco (vazio desliga a gravação); relativo a PO_DADOS_DIR
+    PO_DADOS_DIR=<diretório do app>                diretório dos arquivos de dados locais
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+ARQUIVO_PADRAO = 'telemetria_llm.sqlite3'
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Preço público em USD por 1 milhão de tokens (entrada, saída, entrada servida do cache)
+PRECOS_POR_MILHAO = {
+    'gemini-2.5-pro': (1.25, 10.00, 0.31),
+    'gemini-2.0-flash': (0.10, 0.40, 0.025),
+    'local-modelo': (0.0, 0.0, 0.0)
+}
+
+COLUNAS = [
+    'momento', 'modelo', 'pergunta', 'latencia_llm_ms', 'latencia_total_ms', 'bytes_prompt',
+    'tokens_prompt', 'tokens_resposta', 'tokens_cache', 'custo_usd', 'cache_hit', 'fallback', 'motivo_fallback'
+]
+
+COLUNAS_NUMERICAS = [
+    'latencia_llm_ms', 'latencia_total_ms', 'bytes_prompt', 'tokens_prompt', 'tokens_resposta', 'tokens_cache', 'custo_usd'
+]
+
+_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS chamadas (
+    momento TEXT NOT NULL,
+    modelo TEXT,
+    pergunta TEXT,
+    latencia_llm_ms REAL,
+    latencia_total_ms REAL,
+    bytes_prompt INTEGER,
+    tokens_prompt INTEGER,
+    tokens_resposta INTEGER,
+    tokens_cache INTEGER,
+    custo_usd REAL,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    fallback INTEGER NOT NULL DEFAULT 0,
+    motivo_fallback TEXT
+)
+"""
+_LOCK = threading.Lock()
+_INICIALIZADOS = set()
+
+# ==================== ARMAZENAMENTO ====================
+def caminho_banco(caminho=None):
+    """Arquivo do banco: parâmetro, variável de ambiente ou o padrão (None se desligado).
+
+    Como o dos alertas, o nome relativo vale a partir de PO_DADOS_DIR (ou do diretório do app).
+    """
+    if caminho is not None:
+        return caminho or None
+    arquivo = os.getenv('PO_TELEMETRIA_ARQUIVO', ARQUIVO_PADRAO)
+    return os.path.join(os.getenv('PO_DADOS_DIR') or DIRETORIO_APP, arquivo) if arquivo else None
+
+@contextlib.contextmanager
+def _conexao(caminho):
+    conexao = sqlite3.connect(caminho, timeout=5)
+    try:
+        # Telemetria tolera perder a última linha numa queda de energia: sem fsync por commit
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        with _LOCK:
+            if caminho not in _INICIALIZADOS:
+                conexao.execute("PRAGMA journal_mode=WAL")
+                conexao.execute(_CRIAR_TABELA)
+                conexao.execute("CREATE INDEX IF NOT EXISTS idx_chamadas_momento ON chamadas (momento)")
+                _INICIALIZADOS.add(caminho)
+        with conexao:
+            yield conexao
+    finally:
+        conexao.close()
+
+def registrar_chamada(caminho=None, **campos):
+    """Grava uma consulta; falhas de gravação só são avisadas, nunca derrubam a resposta"""
+    caminho = caminho_banco(caminho)
+    if not caminho:
+        return False
+    registro = {coluna: campos.get(coluna) for coluna in COLUNAS}
+    registro['momento'] = registro['momento'] or datetime.now().isoformat(timespec='seconds')
+    registro['cache_hit'] = int(bool(registro['cache_hit']))
+    registro['fallback'] = int(bool(registro['fallback']))
+    if registro['pergunta']:
+        registro['pergunta'] = registro['pergunta'][:500]
+    try:
+        with _conexao(caminho) as conexao:
+            conexao.execute(
+                f"INSERT INTO chamadas ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})",
+                [registro[coluna] for coluna in COLUNAS]
+            )
+        return True
+    except sqlite3.Error as e:
+        print(f"⚠️ Telemetria do assistente não gravada: {e}")
+        return False
+
+def carregar_chamadas(desde=None, caminho=None):
+    """Chamadas registradas (opcionalmente a partir de `desde`) como DataFrame"""
+    caminho = caminho_banco(caminho)
+    if not caminho or not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS)
+    consulta, parametros = "SELECT * FROM chamadas", []
+    if desde is not None:
+        consulta += " WHERE momento >= ?"
+        parametros.append(pd.Timestamp(desde).isoformat(timespec='seconds'))
+    with _conexao(caminho) as conexao:
+        df = pd.read_sql_query(consulta + " ORDER BY momento", conexao, params=parametros)
+    df['momento'] = pd.to_datetime(df['momento'])
+    # Colunas só com NULL (ex.: apenas fallbacks no período) chegariam como object
+    for coluna in COLUNAS_NUMERICAS:
+        df[coluna] = pd.to_numeric(df[coluna]).astype(float)
+    df['cache_hit'] = df['cache_hit'].astype(bool)
+    df['fallback'] = df['fallback'].astype(bool)
+    return df
+
+# ==================== TOKENS E CUSTO ====================
+def tokens_da_resposta(resposta):
+    """Contagem de tokens do `usage_metadata` do Gemini (zeros quando ausente)"""
+    uso = getattr(resposta, 'usage_metadata', None)
+    return {
+        'tokens_prompt': int(getattr(uso, 'prompt_token_count', 0) or 0),
+        'tokens_resposta': int(getattr(uso, 'candidates_token_count', 0) or 0),
+        'tokens_cache': int(getattr(uso, 'cached_content_token_count', 0) or 0)
+    }
+
+def estimar_custo(modelo, tokens_prompt, tokens_resposta, tokens_cache=0):
+    """Custo estimado em USD; None para modelos fora da tabela de preços"""
+    if modelo not in PRECOS_POR_MILHAO:
+        return None
+    entrada, saida, cache = PRECOS_POR_MILHAO[modelo]
+    tokens_cache = min(tokens_cache, tokens_prompt)
+    return ((tokens_prompt - tokens_cache) * entrada + tokens_cache * cache + tokens_resposta * saida) / 1_000_000
+
+# ==================== RESUMO ====================
+def resumo_por_modelo(chamadas):
+    """Por modelo: volume, p50/p95 de latência, tokens médios, custo e taxas de cache e fallback"""
+    if chamadas.empty:
+        return pd.DataFrame()
+    chamadas = chamadas.assign(modelo=chamadas['modelo'].fillna('(sem modelo)'))
+    grupos = chamadas.groupby('modelo')
+    resumo = pd.DataFrame({
+        'chamadas': grupos.size(),
+        'p50_ms': grupos['latencia_llm_ms'].quantile(0.50),
+        'p95_ms': grupos['latencia_llm_ms'].quantile(0.95),
+        'p95_total_ms': grupos['latencia_total_ms'].quantile(0.95),
+        'tokens_prompt_medio': grupos['tokens_prompt'].mean(),
+        'tokens_resposta_medio': grupos['tokens_resposta'].mean(),
+        'custo_total_usd': grupos['custo_usd'].sum(min_count=1),
+        'custo_medio_usd': grupos['custo_usd'].mean(),
+        'taxa_cache': grupos['cache_hit'].mean() * 100,
+        'taxa_fallback': grupos['fallback'].mean() * 100
+    })
+    return resumo.reset_index()
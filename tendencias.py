@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from datas import converter_datas
+
+# ==================== CONSTANTES ====================
+COLUNAS_DIARIAS = [
+    'melhorias_propostas', 'melhorias_aplicadas',
+    'cerimonias_total', 'cerimonias_presentes', 'minutos_reuniao',
+    'documentos', 'minutos_documentos', 'documentos_com_criterios', 'documentos_com_template',
+    'avaliacoes', 'total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite'
+]
+
+JANELAS_MOVEIS = [7, 30, 90]
+
+FREQUENCIAS = {
+    'Semanal': 'W-SUN',
+    'Mensal': 'MS'
+}
+
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+# ==================== AGREGADOS DIÁRIOS POR ABA ====================
+def _numerico(serie):
+    return pd.to_numeric(serie, errors='coerce').fillna(0)
+
+def _vazio(colunas):
+    return pd.DataFrame(columns=colunas, index=pd.DatetimeIndex([], name='dia'), dtype=float)
+
+def _agregar_por_dia(df, coluna_data, colunas):
+    """Soma as colunas derivadas de cada registro agrupando pelo dia da coluna de data"""
+    base = pd.DataFrame(colunas, index=df.index)
+    dias = converter_datas(df[coluna_data]).dt.normalize().rename('dia')
+    return base.groupby(dias).sum()
+
+def agregar_melhorias_por_dia(df):
+    if df.empty or 'data_proposta' not in df.columns:
+        return _vazio(['melhorias_propostas', 'melhorias_aplicadas'])
+    return _agregar_por_dia(df, 'data_proposta', {
+        'melhorias_propostas': 1,
+        'melhorias_aplicadas': (df['melhoria_aplicada'] == 'SIM').astype(int) if 'melhoria_aplicada' in df.columns else 0
+    })
+
+def agregar_cerimonias_por_dia(df):
+    if df.empty or 'data' not in df.columns:
+        return _vazio(['cerimonias_total', 'cerimonias_presentes', 'minutos_reuniao'])
+    return _agregar_por_dia(df, 'data', {
+        'cerimonias_total': 1,
+        'cerimonias_presentes': (df['presente'] == 'SIM').astype(int) if 'presente' in df.columns else 0,
+        'minutos_reuniao': _numerico(df['duracao_minutos']) if 'duracao_minutos' in df.columns else 0
+    })
+
+def agregar_documentos_por_dia(df):
+    if df.empty or 'data' not in df.columns:
+        return _vazio(['documentos', 'minutos_documentos', 'documentos_com_criterios', 'documentos_com_template'])
+    return _agregar_por_dia(df, 'data', {
+        'documentos': 1,
+        'minutos_documentos': _numerico(df['tempo_minutos']) if 'tempo_minutos' in df.columns else 0,
+        'documentos_com_criterios': (df['critérios_aceite'] == 'SIM').astype(int) if 'critérios_aceite' in df.columns else 0,
+        'documentos_com_template': (df['template_padronizado'] == 'SIM').astype(int) if 'template_padronizado' in df.columns else 0
+    })
+
+def combinar_agregados(partes):
+    """Junta os agregados diários das abas num índice diário contínuo (dias sem registro = 0)"""
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return _vazio(COLUNAS_DIARIAS)
+
+    diario = pd.concat(partes, axis=1)
+    indice = pd.date_range(diario.index.min(), diario.index.max(), freq='D', name='dia')
+    return diario.reindex(index=indice, columns=COLUNAS_DIARIAS).fillna(0)
+
+def agregar_demandas_por_dia(df):
+    colunas = ['total_historias', 'historias_prioridade_definida', 'historias_criterio_aceite']
+    if df.empty or 'data_avaliacao' not in df.columns:
+        return _vazio(['avaliacoes'] + colunas)
+    return _agregar_por_dia(df, 'data_avaliacao', {
+        'avaliacoes': 1,
+        **{coluna: _numerico(df[coluna]) if coluna in df.columns else 0 for coluna in colunas}
+    })
+
+def serie_priorizacao(diario):
+    """Taxas de priorização e de critério de aceite nos dias em que houve avaliação de demandas"""
+    avaliados = diario[diario['total_historias'] > 0]
+    return pd.DataFrame({
+        'total_historias': avaliados['total_historias'],
+        'taxa_priorizacao': avaliados['historias_prioridade_definida'] / avaliados['total_historias'] * 100,
+        'taxa_criterio': avaliados['historias_criterio_aceite'] / avaliados['total_historias'] * 100
+    }, index=avaliados.index)
+
+AGREGADORES_DIARIOS = {
+    'melhorias': agregar_melhorias_por_dia,
+    'cerimonias': agregar_cerimonias_por_dia,
+    'documentos': agregar_documentos_por_dia,
+    'demandas': agregar_demandas_por_dia
+}
+
+def agregados_diarios(dados_disponiveis):
+    """Agregado diário combinado a partir de um dicionário categoria -> DataFrame"""
+    return combinar_agregados([
+        AGREGADORES_DIARIOS[categoria](df)
+        for categoria, df in dados_disponiveis.items() if categoria in AGREGADORES_DIARIOS
+    ])
+
+# ==================== MÉTRICAS DE TENDÊNCIA ====================
+def _razao(numerador, denominador):
+    return numerador / denominador.where(denominador > 0)
+
+def metricas(somas):
+    """Converte somas de uma janela/período nos indicadores exibidos nos gráficos"""
+    return pd.DataFrame({
+        'taxa_aplicacao': _razao(somas['melhorias_aplicadas'], somas['melhorias_propostas']) * 100,
+        'taxa_presenca': _razao(somas['cerimonias_presentes'], somas['cerimonias_total']) * 100,
+        'horas_reuniao': somas['minutos_reuniao'] / 60,
+        'docs_por_hora': _razao(somas['documentos'], somas['minutos_documentos'] / 60),
+        'cobertura_criterios': _razao(somas['documentos_com_criterios'], somas['documentos']) * 100,
+        'cobertura_template': _razao(somas['documentos_com_template'], somas['documentos']) * 100,
+        'taxa_priorizacao': _razao(somas['historias_prioridade_definida'], somas['total_historias']) * 100,
+        'taxa_criterio_historias': _razao(somas['historias_criterio_aceite'], somas['total_historias']) * 100
+    }, index=somas.index)
+
+def metricas_moveis(diario, janela):
+    """Indicadores sobre janelas móveis de `janela` dias, calculados numa única passada de rolling"""
+    return metricas(diario.rolling(janela, min_periods=1).sum())
+
+def metricas_por_periodo(diario, frequencia):
+    """Indicadores reamostrados por semana ou mês"""
+    return metricas(diario.resample(frequencia).sum())
+
+def mapa_dia_semana(diario, coluna):
+    """Matriz dia da semana × semana com a soma de `coluna` (linhas Seg..Dom)"""
+    if diario.empty:
+        return pd.DataFrame(index=DIAS_SEMANA, dtype=float)
+
+    valores = diario[coluna].to_numpy()
+    dias_semana = diario.index.dayofweek.to_numpy()
+    semanas = diario.index.to_period('W-SUN').start_time
+    codigos, rotulos_semana = pd.factorize(semanas, sort=True)
+
+    matriz = np.full((7, len(rotulos_semana)), np.nan)
+    matriz[dias_semana, codigos] = valores
+    return pd.DataFrame(matriz, index=DIAS_SEMANA, columns=rotulos_semana)
+
+# ==================== COMPARATIVO ENTRE ESPAÇOS ====================
+def comparativo_espacos(diarios, data_inicio, data_fim):
+    """Totais e indicadores do período por espaço, a partir dos agregados diários de cada um"""
+    inicio, fim = pd.to_datetime(data_inicio).normalize(), pd.to_datetime(data_fim).normalize()
+    somas = pd.DataFrame(
+        {espaco: diario.loc[inicio:fim].sum().reindex(COLUNAS_DIARIAS, fill_value=0) for espaco, diario in diarios.items()}
+    ).T.reindex(columns=COLUNAS_DIARIAS).fillna(0)
+    somas.index.name = 'espaco'
+    return pd.concat([somas[['melhorias_propostas', 'cerimonias_total', 'documentos', 'total_historias']], metricas(somas)], axis=1)
+
+# ==================== COMPARAÇÃO ENTRE PERÍODOS ====================
+class SomasAcumuladas:
+    """Somas prefixadas do agregado diário: o total de qualquer intervalo de dias sai em O(1) por coluna"""
+    def __init__(self, diario):
+        colunas = diario.reindex(columns=COLUNAS_DIARIAS, fill_value=0)
+        # Dias com documentação também viram contagem somável, para a média diária de horas
+        colunas = colunas.assign(dias_documentacao=(colunas['documentos'] > 0).astype(float))
+        self.colunas = list(colunas.columns)
+        self.primeiro_dia = diario.index.min() if not diario.empty else None
+        # Linha de zeros na frente: o total de [i, j) é prefixos[j] - prefixos[i], sem caso especial no início
+        self.prefixos = np.vstack([np.zeros((1, len(self.colunas))), np.cumsum(colunas.to_numpy(dtype=float), axis=0)])
+
+    def _posicao(self, dia):
+        # O índice diário é contínuo (ver combinar_agregados): a posição é a distância em dias
+        return int(np.clip((dia - self.primeiro_dia).days, 0, len(self.prefixos) - 1))
+
+    @property
+    def nbytes(self):
+        return self.prefixos.nbytes
+
+    def somas(self, data_inicio, data_fim):
+        """Vetor com as somas de `colunas` entre as duas datas (inclusive): duas linhas lidas e uma subtração"""
+        if self.primeiro_dia is None:
+            return np.zeros(len(self.colunas))
+        inicio = self._posicao(pd.Timestamp(data_inicio).normalize())
+        fim = self._posicao(pd.Timestamp(data_fim).normalize() + pd.Timedelta(days=1))
+        return self.prefixos[max(fim, inicio)] - self.prefixos[inicio]
+
+def periodo_anterior(data_inicio, data_fim):
+    """Período equivalente imediatamente anterior: os mesmos meses antes, se o período é de meses inteiros; senão os mesmos dias"""
+    inicio, fim = pd.to_datetime(data_inicio).normalize(), pd.to_datetime(data_fim).normalize()
+    if inicio.day == 1 and fim.is_month_end:
+        meses = (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+        return inicio - pd.DateOffset(months=meses), inicio - pd.Timedelta(days=1)
+    dias = (fim - inicio).days + 1
+    return inicio - pd.Timedelta(days=dias), inicio - pd.Timedelta(days=1)
+
+def indicadores_periodo(somas):
+    """Totais e indicadores de cada linha de somas, incluindo os derivados dos cartões de documentos"""
+    return pd.concat([somas, metricas(somas), pd.DataFrame({
+        'horas_documentos': somas['minutos_documentos'] / 60,
+        'tempo_medio_documento': _razao(somas['minutos_documentos'], somas['documentos']),
+        'horas_por_dia_documentacao': _razao(somas['minutos_documentos'] / 60, somas['dias_documentacao'])
+    }, index=somas.index)], axis=1)
+
+def comparar_periodos(acumuladas, data_inicio, data_fim, anterior=None):
+    """Indicadores do período e do anterior equivalente, lado a lado (linhas 'atual' e 'anterior')"""
+    anterior = anterior or periodo_anterior(data_inicio, data_fim)
+    somas = pd.DataFrame(
+        [acumuladas.somas(data_inicio, data_fim), acumuladas.somas(*anterior)], index=['atual', 'anterior'], columns=acumuladas.colunas
+    )
+    comparacao = indicadores_periodo(somas)
+    comparacao.attrs['anterior'] = anterior
+    return comparacao
@@ -0,0 +1,5 @@
+"""Os testes importam os módulos do app a partir da raiz do repositório."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,6 @@
+"""Stampede de leituras da planilha com muitas sessões (versão rápida de benchmarks/bench_carga.py)."""
+from benchmarks.bench_carga import verificar_stampede_abas
+
+
+def test_cada_aba_e_lida_uma_vez_com_cache_frio_e_vencido():
+    assert verificar_stampede_abas(sessoes=8) == []
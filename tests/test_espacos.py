@@ -0,0 +1,184 @@
+"""CacheEspacos: carga única por chave, prazo de atualização, limpar() no meio da carga e versões em uso.
+
+O relógio do armazém é falso (o TTL e o prazo vencem quando o teste manda) e cada
+carga fica presa num Event até o teste liberá-la, então a ordem dos eventos não
+depende do escalonamento das threads.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import espacos
+from espacos import CacheEspacos
+
+ESPACO = "Squad A"
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+class CargaPresa:
+    """carregar() que conta as chamadas e só devolve `valor` quando o teste liberar"""
+    def __init__(self, valor, erro=None):
+        self.valor = valor
+        self.erro = erro
+        self.chamadas = 0
+        self.iniciada = threading.Event()
+        self.liberar = threading.Event()
+
+    def __call__(self):
+        self.chamadas += 1
+        self.iniciada.set()
+        assert self.liberar.wait(5), "carga não liberada pelo teste"
+        if self.erro is not None:
+            raise self.erro
+        return self.valor
+
+
+def esperar(condicao, limite_s=5):
+    fim = time.monotonic() + limite_s
+    while not condicao():
+        assert time.monotonic() < fim, "condição não atingida"
+        time.sleep(0.005)
+
+
+def contador(cache, nome):
+    return cache.metricas()['espacos'].get(ESPACO, {}).get(nome, 0)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(espacos, 'time', relogio)
+    return relogio
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        yield executor
+
+
+# ==================== CARGA ÚNICA ====================
+def test_uma_carga_enquanto_as_outras_sessoes_esperam(relogio, pool):
+    cache = CacheEspacos(ttl=300, prazo_atualizacao=60)
+    carga = CargaPresa("aba")
+    lider = pool.submit(cache.obter, ESPACO, 'melhorias', carga)
+    assert carga.iniciada.wait(5)
+    seguidores = [pool.submit(cache.obter, ESPACO, 'melhorias', CargaPresa("outra")) for _ in range(5)]
+    esperar(lambda: contador(cache, 'esperas') == 5)
+
+    carga.liberar.set()
+    assert lider.result(5) == "aba"
+    assert [futuro.result(5) for futuro in seguidores] == ["aba"] * 5
+    assert carga.chamadas == 1
+    assert contador(cache, 'faltas') == 1
+
+
+def test_versao_vencida_e_servida_enquanto_uma_sessao_atualiza(relogio, pool):
+    cache = CacheEspacos(ttl=300, prazo_atualizacao=60)
+    cache.obter(ESPACO, 'melhorias', lambda: "antiga")
+    relogio.avancar(301)
+
+    carga = CargaPresa("nova")
+    lider = pool.submit(cache.obter, ESPACO, 'melhorias', carga)
+    assert carga.iniciada.wait(5)
+    # Sem esperar pela atualização: a versão vencida sai na hora
+    assert cache.obter(ESPACO, 'melhorias', CargaPresa("outra")) == "antiga"
+    assert contador(cache, 'vencidas_servidas') == 1
+
+    carga.liberar.set()
+    assert lider.result(5) == "nova"
+    assert cache.obter(ESPACO, 'melhorias', CargaPresa("outra")) == "nova"
+    assert carga.chamadas == 1
+
+
+def test_erro_da_carga_chega_a_quem_espera(relogio, pool):
+    cache = CacheEspacos(ttl=300, prazo_atualizacao=60)
+    carga = CargaPresa(None, erro=RuntimeError("planilha fora"))
+    lider = pool.submit(cache.obter, ESPACO, 'melhorias', carga)
+    assert carga.iniciada.wait(5)
+    seguidor = pool.submit(cache.obter, ESPACO, 'melhorias', CargaPresa("outra"))
+    esperar(lambda: contador(cache, 'esperas') == 1)
+
+    carga.liberar.set()
+    for futuro in (lider, seguidor):
+        with pytest.raises(RuntimeError, match="planilha fora"):
+            futuro.result(5)
+    # Nada guardado: a próxima sessão tenta de novo
+    assert cache.obter(ESPACO, 'melhorias', lambda: "depois") == "depois"
+
+
+# ==================== PRAZO E LIMPEZA ====================
+def test_carga_que_passou_do_prazo_e_assumida_e_nao_e_guardada(relogio, pool):
+    cache = CacheEspacos(ttl=300, prazo_atualizacao=60)
+    presa = CargaPresa("atrasada")
+    lider = pool.submit(cache.obter, ESPACO, 'melhorias', presa)
+    assert presa.iniciada.wait(5)
+    relogio.avancar(61)
+
+    # Passado o prazo, a próxima sessão assume a chave e guarda o que leu
+    assert cache.obter(ESPACO, 'melhorias', lambda: "nova") == "nova"
+    presa.liberar.set()
+    assert lider.result(5) == "atrasada"
+    # A carga substituída não sobrescreve a mais nova
+    assert cache.obter(ESPACO, 'melhorias', CargaPresa("outra")) == "nova"
+    assert contador(cache, 'faltas') == 2
+
+
+def test_limpar_durante_a_carga_descarta_o_valor_lido(relogio, pool):
+    cache = CacheEspacos(ttl=300, prazo_atualizacao=60)
+    carga = CargaPresa("antes da gravação")
+    lider = pool.submit(cache.obter, ESPACO, 'melhorias', carga)
+    assert carga.iniciada.wait(5)
+    cache.limpar(ESPACO)  # ex.: uma gravação na planilha no meio da leitura
+
+    carga.liberar.set()
+    assert lider.result(5) == "antes da gravação"
+    assert cache.obter(ESPACO, 'melhorias', lambda: "depois da gravação") == "depois da gravação"
+
+
+# ==================== VERSÕES EM USO ====================
+def bloco_kb(kb):
+    return np.zeros(kb * 1024 // 8)
+
+
+def test_versao_em_uso_sobrevive_ao_lru_e_sai_no_fim_da_leitura(relogio):
+    cache = CacheEspacos(limite_mb=1, limite_espaco_mb=1, ttl=300)
+    with cache.leitura():
+        cache.obter(ESPACO, 'a', lambda: bloco_kb(600))
+        cache.obter(ESPACO, 'b', lambda: bloco_kb(600))
+        # 'a' passaria do limite, mas o rerun ainda a usa
+        assert cache.metricas()['espacos'][ESPACO]['entradas'] == 2
+        assert cache.metricas()['espacos'][ESPACO]['versoes_em_uso'] == 2
+    assert cache.metricas()['espacos'][ESPACO]['versoes_em_uso'] == 0
+
+    # Fora da leitura, a próxima entrada já pode tirar a mais antiga
+    cache.obter(ESPACO, 'c', lambda: bloco_kb(100))
+    metricas = cache.metricas()['espacos'][ESPACO]
+    assert metricas['entradas'] == 2
+    assert metricas['remocoes'] == 1
+    assert cache.bytes_total() <= cache.limite_bytes
+
+
+def test_versao_retirada_em_uso_fica_na_conta_ate_o_fim_da_leitura(relogio):
+    cache = CacheEspacos(ttl=300)
+    with cache.leitura():
+        valor = cache.obter(ESPACO, 'a', lambda: bloco_kb(100))
+        cache.limpar(ESPACO)
+        # Fora do cache, mas o rerun ainda segura o frame: a memória continua contada
+        assert cache.metricas()['espacos'][ESPACO]['retidas'] == 1
+        assert cache.bytes_total() == valor.nbytes
+    assert cache.metricas()['espacos'][ESPACO]['retidas'] == 0
+    assert cache.bytes_total() == 0